@@ -4,13 +4,21 @@
 
 from adhoccomputing.Experimentation.Topology import Event
 from adhoccomputing.GenericModel import GenericModel
-from adhoccomputing.Generics import Event, AHCTimer, MessageDestinationIdentifiers, EventTypes, logger
-from OLSR.message_types import HelloMessage, TCMessage, Message
-from OLSR.enums import OLSREventTypes, Willingness
+from adhoccomputing.Generics import Event, MessageDestinationIdentifiers, EventTypes, logger
+from collections import Counter
+import copy
+import logging
+from OLSR.message_types import HelloMessage, TCMessage, ResyncMessage
+from OLSR.enums import AdvertisementStatus, OLSREventTypes, Willingness
+from OLSR.advertisement import Advertiser, merge_advertisement
+from OLSR.compact_state import CompactNeighborSet, CompactRoutingEngine, CompactTopologySet, NodeIndex
 from OLSR.helpers import TopologyStateSaver
-import networkx as nx
-
-state_saver = TopologyStateSaver()
+from OLSR.duplicate_set import DuplicateSet
+from OLSR.mpr import MPRSelector
+from OLSR.routing import RoutingEngine
+from OLSR.simulation import RealTimeScheduler
+from OLSR.timer_wheel import TimerWheel
+from OLSR.wire_format import PackedMessage
 
 class OLSRComponent(GenericModel):
     def __init__(self, *args, **kwargs):
@@ -23,20 +31,52 @@ class OLSRComponent(GenericModel):
         """
         super().__init__(*args, **kwargs)
 
-        self.hello_timer = AHCTimer(2, self.send_hello)
-        self.tc_timer = AHCTimer(5, self.send_tc)
+        # Timers run in virtual time when the topology is simulated (see OLSR.simulation)
+        self.scheduler = getattr(self.topology, 'scheduler', None)
+        if self.scheduler is None:
+            self.scheduler = RealTimeScheduler()
+
+        self.hello_interval = 2
+        self.tc_interval = 5
+        self.hello_timer = None
+        self.tc_timer = None
+
+        # A single wheel expires all neighbor, two-hop and topology entries of the node
+        self.timer_wheel = TimerWheel(clock=self.scheduler.clock)
+        self.expiry_timer = None
+        self.eventhandlers[OLSREventTypes.EXPIRE] = self.on_expire
 
         self.willingness = Willingness.WILL_DEFAULT
+        self.packed_messages = False
+        self.delta_messages = False
+        self.hello_advertiser = Advertiser('neighbors', 'version')
+        self.tc_advertiser = Advertiser('mpr_selectors', 'ansn')
+        self._resync_requested = set()
 
+        self.compact_state = False
         self.neighbor_set = {}
+        # The advertised neighbors and the HELLO payload, rebuilt only when they change
+        self._hello_neighbors = None
+        self._hello_payload = None
         self.known_topology = {}
+        self.mpr_selector = MPRSelector(self.componentinstancenumber)
+        self.routing = RoutingEngine(self.componentinstancenumber)
 
+        # MPR and routing changes are recorded by the state saver of the topology
+        self.state_saver = TopologyStateSaver.for_topology(self.topology) if self.topology is not None else None
         self._selected_as_mpr = False
         self.routing_table = {}
+        self.routing_dirty = False
+        self.recompute_interval = 0.5
+        self._last_recompute = float('-inf')
+        self._recompute_scheduled = False
+        self.eventhandlers[OLSREventTypes.ROUTING_RECOMPUTE] = self.on_routing_recompute
 
         self.tc_counter = 1
+        self.duplicate_set = DuplicateSet(clock=self.scheduler.clock)
+        self.counters = Counter()
 
-    def set_parameters(self, hello_interval=None, tc_interval=None, willingness=None):
+    def set_parameters(self, hello_interval=None, tc_interval=None, willingness=None, duplicate_hold_time=None, recompute_interval=None, packed_messages=None, delta_messages=None, full_refresh_every=None, compact_state=None):
         """
         Sets the parameters for the OLSR component.
 
@@ -44,13 +84,85 @@ class OLSRComponent(GenericModel):
             hello_interval (int, optional): The interval for sending Hello messages. Defaults to None.
             tc_interval (int, optional): The interval for sending TC messages. Defaults to None.
             willingness (Willingness, optional): The willingness of the node. Defaults to None.
+            duplicate_hold_time (int, optional): The time a TC is remembered as already seen. Defaults to None.
+            recompute_interval (float, optional): The minimum time between two routing table calculations, 0 to calculate on every topology update. Defaults to None.
+            packed_messages (bool, optional): Whether to send HELLO and TC messages in the packed binary encoding. Defaults to None.
+            delta_messages (bool, optional): Whether HELLO and TC messages may carry only the changes since the previous one. Defaults to None.
+            full_refresh_every (int, optional): Every how many HELLO or TC messages a full one is sent in delta mode. Defaults to None.
+            compact_state (bool, optional): Whether to keep the neighbor set, known topology and routing table in compact arrays (see OLSR.compact_state). Defaults to None.
         """
         if hello_interval:
-            self.hello_timer.interval = hello_interval
+            self.hello_interval = hello_interval
         if tc_interval:
-            self.tc_timer.interval = tc_interval
+            self.tc_interval = tc_interval
         if willingness:
             self.willingness = willingness
+        if duplicate_hold_time:
+            self.duplicate_set.hold_time = duplicate_hold_time
+        if recompute_interval is not None:
+            self.recompute_interval = recompute_interval
+        if packed_messages is not None:
+            self.packed_messages = packed_messages
+        if delta_messages is not None:
+            self.delta_messages = delta_messages
+        if full_refresh_every:
+            self.hello_advertiser.full_refresh_every = full_refresh_every
+            self.tc_advertiser.full_refresh_every = full_refresh_every
+        if compact_state is not None and compact_state != self.compact_state:
+            self.use_compact_state(compact_state)
+
+    def use_compact_state(self, compact_state):
+        """
+        Moves the neighbor set, known topology and routing table to compact arrays or back to dicts.
+
+        In compact mode node identifiers are interned to dense indices shared by the topology, sets of nodes are kept
+        as bitsets and the routing table as an array of next hops. The three attributes remain mappings with the same
+        keys and entries, but their entries are copies: they are replaced as a whole, never modified in place. The MPR
+        selector and the routing engine, which keep their own view of the neighbor set and the known topology, are
+        rebuilt over the same indices.
+
+        Args:
+            compact_state (bool): Whether to use compact arrays.
+        """
+        self.compact_state = compact_state
+        if compact_state:
+            node_index = NodeIndex.for_topology(self.topology)
+            self.neighbor_set = CompactNeighborSet(node_index, self.neighbor_set)
+            self.known_topology = CompactTopologySet(node_index, self.known_topology)
+            self.mpr_selector = MPRSelector(self.componentinstancenumber, node_index.node_set)
+            self.routing = CompactRoutingEngine(self.componentinstancenumber, node_index)
+        else:
+            self.neighbor_set = dict(self.neighbor_set)
+            self.known_topology = dict(self.known_topology)
+            self.mpr_selector = MPRSelector(self.componentinstancenumber)
+            self.routing = RoutingEngine(self.componentinstancenumber)
+        # Both containers keep their insertion order, so neighbors and entries are replayed in their arrival order
+        for neighbor, entry in self.neighbor_set.items():
+            self.mpr_selector.update_neighbor(neighbor, entry['neighbors'], entry['willingness'])
+        for node, node_data in self.known_topology.items():
+            self.routing.update_entry(node, node_data)
+        self.routing_table = self.routing.compute()
+
+    @property
+    def neighbor_hold_time(self):
+        """
+        float: How long a neighbor and its two-hop neighbors stay valid without a HELLO (NEIGHB_HOLD_TIME in RFC 3626).
+        """
+        return 3 * self.hello_interval
+
+    @property
+    def topology_hold_time(self):
+        """
+        float: How long the advertised set of an originator stays valid without a TC (TOP_HOLD_TIME in RFC 3626).
+        """
+        return 3 * self.tc_interval
+
+    @property
+    def ansn(self):
+        """
+        int: The Advertised Neighbor Sequence Number of the last TC, increased whenever the advertised set changes.
+        """
+        return self.tc_advertiser.version
 
     def increase_tc_counter(self):
         self.tc_counter += 1
@@ -63,8 +175,13 @@ class OLSRComponent(GenericModel):
     def selected_as_mpr(self, value):
         if value != self._selected_as_mpr:
             self._selected_as_mpr = value
+            if self.state_saver is None:
+                return
             if value:
-                state_saver.save_state(self.topology, self.tc_counter)
+                self.state_saver.save_state(self.topology, self.tc_counter, {self.componentinstancenumber: value})
+            else:
+                self.state_saver.update_state({self.componentinstancenumber: value})
+                self.state_saver.check_convergence(self.topology, self.tc_counter)
                 
 
     def on_init(self, eventobj: Event):
@@ -77,9 +194,25 @@ class OLSRComponent(GenericModel):
         Returns:
         - None
         """
-        self.hello_timer.start()
-        self.tc_timer.start()
-    
+        self.hello_timer = self.scheduler.call_every(self.hello_interval, self.send_hello)
+        self.tc_timer = self.scheduler.call_every(self.tc_interval, self.send_tc)
+        self.expiry_timer = self.scheduler.call_every(self.timer_wheel.tick, self.tick_timer_wheel)
+
+    def on_exit(self, eventobj: Event):
+        """
+        Stops the timers of the component when it exits.
+
+        Parameters:
+        - eventobj: An instance of the Event class.
+
+        Returns:
+        - None
+        """
+        for timer in (self.hello_timer, self.tc_timer, self.expiry_timer):
+            if timer is not None:
+                timer.cancel()
+        super().on_exit(eventobj)
+
     def on_message_from_bottom(self, eventobj: Event):
         """
         Handles incoming messages from the bottom layer.
@@ -89,11 +222,19 @@ class OLSRComponent(GenericModel):
 
         Returns:
             None
-        """        
+        """
+        if isinstance(eventobj.eventcontent, PackedMessage):
+            eventobj.eventcontent = eventobj.eventcontent.unpack()
+
         if eventobj.eventcontent.header.messagetype == OLSREventTypes.HELLO:
             self.on_hello(eventobj)
         elif eventobj.eventcontent.header.messagetype == OLSREventTypes.TC:
             self.on_tc(eventobj)
+        elif eventobj.eventcontent.header.messagetype == OLSREventTypes.RESYNC:
+            self.on_resync(eventobj)
+        elif eventobj.eventcontent.header.messagetype == OLSREventTypes.BROADCAST:
+            # Relayed by the MPRBroadcastComponent next to us (see OLSR.broadcast)
+            return
         else:
             self.on_else(eventobj)
         
@@ -111,28 +252,82 @@ class OLSRComponent(GenericModel):
         Returns:
             None
         """
-        logger.debug(f"{self.componentname}-{self.componentinstancenumber} RECEIVED ELSE {str(eventobj)}")
-        data_packet = eventobj.eventcontent
-        destination = data_packet.header.messageto
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{self.componentname}-{self.componentinstancenumber} RECEIVED ELSE {str(eventobj)}")
+        header = eventobj.eventcontent.header
+        destination = header.messageto
+
+        if self.routing_dirty:
+            # Do not route on a stale table, calculate it now instead of waiting for the scheduled calculation
+            self.calculate_routing_table()
 
         if destination == self.componentinstancenumber:
             # If the current node is the destination, consume it somehow
             self.send_up(eventobj)
-        else:
-            # Forward the packet to the next hop according to the routing table
-            if destination in self.routing_table:
-                next_hop = self.routing_table[destination]
-                forwarded_packet = Message(
-                    message_from=data_packet.header.messagefrom,
-                    message_to=destination,
-                    payload=data_packet.payload,
-                    nexthop=next_hop,
-                    sequencenumber=data_packet.header.sequencenumber+1
-                )
-                self.send_down(Event(self, EventTypes.MFRT, forwarded_packet))
-            else:
-                # If no route is found, drop the packet (or implement error handling as needed)
-                logger.error(f"No route found for destination {destination}. Dropping packet.")
+            return
+
+        # Forward the packet to the next hop according to the routing table. Its header and the event carrying it are
+        # updated in place instead of copied, which is only safe while no other node holds the packet: GenericChannel
+        # hands the same message to every node on the channel, and GenericLinkLayer passes it up only at the next hop
+        # it was unicast to. A packet that was not unicast to us, e.g. broadcast, is copied first. A packet that was
+        # never sent, as injected by the application of the source, has no next hop yet.
+        next_hop = self.routing_table.get(destination)
+        if next_hop is None:
+            # If no route is found, drop the packet (or implement error handling as needed)
+            logger.error(f"No route found for destination {destination}. Dropping packet.")
+            return
+        if header.nexthop != self.componentinstancenumber and header.nexthop != float('inf'):
+            message = copy.copy(eventobj.eventcontent)
+            message.header = header = copy.copy(header)
+            eventobj = Event(self, EventTypes.MFRT, message)
+        header.nexthop = next_hop
+        header.sequencenumber += 1
+        eventobj.event = EventTypes.MFRT
+        self.send_down(eventobj)
+
+    def to_wire(self, message):
+        """
+        Packs a HELLO or TC message if the packed encoding is enabled.
+
+        Args:
+            message (HelloMessage | TCMessage): The message to send.
+
+        Returns:
+            GenericMessage: The message to hand to the link layer.
+        """
+        if self.packed_messages:
+            return PackedMessage.pack(message)
+        return message
+
+    def hello_neighbors(self):
+        """
+        Returns the one-hop neighbors to advertise in HELLOs.
+
+        Returns:
+            frozenset: The keys of the neighbor set. The same object is returned until a neighbor is added or expires.
+        """
+        if self._hello_neighbors is None:
+            self._hello_neighbors = frozenset(self.neighbor_set)
+        return self._hello_neighbors
+
+    def hello_payload(self):
+        """
+        Returns the payload of the next HELLO.
+
+        The payload is shared by consecutive HELLOs and receivers keep its neighbors by reference, so it is never
+        modified: a new one is built when the advertised neighbors, the willingness or the validity change, and for
+        every delta HELLO.
+
+        Returns:
+            dict: The payload.
+        """
+        fields = self.hello_advertiser.advertise(self.hello_neighbors(), self.delta_messages)
+        extra = (self.willingness, self.neighbor_hold_time)
+        cached = self._hello_payload
+        if cached is None or cached[0] is not fields or cached[1] != extra:
+            payload = {**fields, 'willingness': extra[0], 'validity': extra[1]}
+            self._hello_payload = cached = (fields, extra, payload)
+        return cached[2]
 
     def send_hello(self):
         """
@@ -141,27 +336,33 @@ class OLSRComponent(GenericModel):
         hello_message = HelloMessage(
             message_from=self.componentinstancenumber,
             message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
-            payload={
-                'neighbors': set(self.neighbor_set.keys()),
-                'willingness': self.willingness,
-            },
+            payload=self.hello_payload(),
             nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
         )
-        self.send_down(Event(self, EventTypes.MFRT, hello_message))
+        self.send_down(Event(self, EventTypes.MFRT, self.to_wire(hello_message)))
 
     def send_tc(self):
         """
         Sends a TC (Topology Control) message to the link layer broadcast address.
+
+        The TC carries the Advertised Neighbor Sequence Number (ANSN), which is increased only when the advertised
+        set differs from the previously advertised one, so receivers can skip TCs that bring nothing new. In delta
+        mode the TC only carries the changes since the previous ANSN (see OLSR.advertisement.Advertiser).
         """
         self.increase_tc_counter()
+        # Register our own TC so that copies relayed back to us are dropped as duplicates
+        self.duplicate_set.register(self.componentinstancenumber, self.tc_counter)
         tc_message = TCMessage(
             message_from=self.componentinstancenumber,
-            payload={'mpr_selectors': self.select_mpr()},
+            payload={
+                **self.tc_advertiser.advertise(self.select_mpr(), self.delta_messages),
+                'validity': self.topology_hold_time,
+            },
             message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
             sequencenumber=self.tc_counter,
             nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
         )
-        self.send_down(Event(self, EventTypes.MFRT, tc_message))
+        self.send_down(Event(self, EventTypes.MFRT, self.to_wire(tc_message)))
 
     def on_hello(self, eventobj: Event):
         """
@@ -174,16 +375,40 @@ class OLSRComponent(GenericModel):
             None
         """
         # if event_content.messagefrom != self.componentinstancenumber:
-        self.neighbor_set[eventobj.eventcontent.header.messagefrom] = {
-            "neighbors": eventobj.eventcontent.payload['neighbors'],
-            "willingness": eventobj.eventcontent.payload['willingness']
+        sender = eventobj.eventcontent.header.messagefrom
+        stored = self.neighbor_set.get(sender, {})
+        status, neighbors, version = merge_advertisement(
+            eventobj.eventcontent.payload, 'neighbors', 'version', stored.get('neighbors'), stored.get('version')
+        )
+        if status == AdvertisementStatus.GAP:
+            # The delta does not apply to what we know, keep the stored neighbors until a full HELLO arrives
+            self.request_resync(sender, OLSREventTypes.HELLO)
+            neighbors = frozenset() if neighbors is None else neighbors
+        elif 'neighbors' in eventobj.eventcontent.payload:
+            self._resync_requested.discard((sender, OLSREventTypes.HELLO))
+        if sender not in self.neighbor_set:
+            self._hello_neighbors = None
+        self.neighbor_set[sender] = {
+            "neighbors": neighbors,
+            "willingness": eventobj.eventcontent.payload['willingness'],
+            "version": version
         } #eventobj.eventcontent.payload['neighbors']
-        self.known_topology[eventobj.eventcontent.header.messagefrom] = {
-            "nexthop": eventobj.eventcontent.header.messagefrom,
+        self.mpr_selector.update_neighbor(sender, neighbors, eventobj.eventcontent.payload['willingness'])
+        # Keep the TC information of the neighbor, the HELLO only adds the direct link to it
+        node_data = {
+            **self.known_topology.get(sender, {}),
+            "nexthop": sender,
             "distance": 1
         }
+        self.known_topology[sender] = node_data
+        if self.routing.update_entry(sender, node_data):
+            self.mark_routing_dirty()
+        self.timer_wheel.schedule(
+            ('neighbor', eventobj.eventcontent.header.messagefrom),
+            eventobj.eventcontent.payload.get('validity', self.neighbor_hold_time)
+        )
 
-        logger.debug(f"{self.componentname}-{self.componentinstancenumber} RECEIVED HELLO FROM {eventobj.eventcontent.header.messagefrom} - NEIGHBORS: {eventobj.eventcontent.payload['neighbors']} - EVENT: {str(eventobj)}")
+        logger.debug(f"{self.componentname}-{self.componentinstancenumber} RECEIVED HELLO FROM {sender} - NEIGHBORS: {neighbors} - EVENT: {str(eventobj)}")
 
     def on_tc(self, eventobj: Event):
         """
@@ -196,100 +421,265 @@ class OLSRComponent(GenericModel):
             None
         """
         tc_message = eventobj.eventcontent
-        mpr_selectors = tc_message.payload['mpr_selectors']
-        if tc_message.header.messagefrom not in self.known_topology:
-            self.known_topology[tc_message.header.messagefrom] = {}
-        self.known_topology[tc_message.header.messagefrom].update({
-            "mpr_selectors": mpr_selectors
-        })
+        originator = tc_message.header.messagefrom
+        stored = self.known_topology.get(originator, {})
+        if not self.duplicate_set.register(originator, tc_message.header.sequencenumber):
+            # Already processed (or older than what we have), so neither process nor forward it again
+            self.counters['tc_duplicates_dropped'] += 1
+            if self.componentinstancenumber in self.advertised_relays(tc_message.payload, stored.get('mpr_selectors')):
+                self.counters['tc_forwards_suppressed'] += 1
+            return
+
+        # Apply the advertised set only if its ANSN advanced, TCs without one are always applied
+        status, mpr_selectors, ansn = merge_advertisement(
+            tc_message.payload, 'mpr_selectors', 'ansn', stored.get('mpr_selectors'), stored.get('ansn')
+        )
+        topology_changed = status == AdvertisementStatus.NEW
+        if topology_changed:
+            node_data = {
+                **stored,
+                "mpr_selectors": mpr_selectors,
+                "ansn": ansn
+            }
+            self.known_topology[originator] = node_data
+            # Mirror the entry as stored, the selectors of a compact topology iterate in another order than advertised
+            self.routing.update_entry(originator, self.known_topology[originator])
+        if status == AdvertisementStatus.GAP:
+            # Leave the stored set to expire unless the originator resends it in full
+            self.request_resync(originator, OLSREventTypes.TC)
+            mpr_selectors = self.advertised_relays(tc_message.payload, mpr_selectors)
+        else:
+            if 'mpr_selectors' in tc_message.payload:
+                self._resync_requested.discard((originator, OLSREventTypes.TC))
+            self.timer_wheel.schedule(
+                ('topology', originator),
+                tc_message.payload.get('validity', self.topology_hold_time)
+            )
         logger.debug(f"{self.componentname}-{self.componentinstancenumber} RECEIVED TC FROM {tc_message.header.messagefrom} - MPR SELECTOR - EVENT: {str(eventobj)}")
 
         if self.componentinstancenumber in mpr_selectors:
             logger.info(f"{self.componentname}-{self.componentinstancenumber} SELECTED AS MPR")
             self.selected_as_mpr = True
-            self.send_down(Event(self, EventTypes.MFRT, tc_message))
+            self.counters['tc_forwarded'] += 1
+            self.send_down(Event(self, EventTypes.MFRT, self.to_wire(tc_message)))
         else:
             self.selected_as_mpr = False
 
-        self.calculate_routing_table()
+        if topology_changed:
+            self.mark_routing_dirty()
+        else:
+            self.counters['routing_recomputations_skipped'] += 1
 
-    def select_mpr(self):
+    @staticmethod
+    def advertised_relays(payload, stored):
         """
-        Selects the Multi-Point Relays (MPRs) based on the OLSR protocol.
+        Returns the nodes a TC asks to relay it, completing a delta TC with the stored set as far as possible.
+
+        Args:
+            payload (dict): The payload of the TC.
+            stored (set | None): The stored set of the originator.
 
         Returns:
-            set: A set of selected MPRs.
+            set: The advertised set.
+        """
+        if 'mpr_selectors' in payload:
+            return payload['mpr_selectors']
+        return ((stored or set()) - payload['removed']) | payload['added']
 
-        Algorithm:
-            1. Create a dictionary to keep track of which one-hop neighbors cover which two-hop neighbors.
-            2. While there are still two-hop neighbors that are not covered:
-                a. Find the neighbors with the maximum number of unique uncovered two-hop neighbors.
-                b. Select the candidate with the highest willingness.
-                c. Update the set of covered two-hop neighbors.
-                d. Remove covered two-hop neighbors from all sets in the coverage map.
-            3. Return the set of selected MPRs.
-        """
-        covered_two_hop_neighbors = set()
-        mpr_set = set()
-
-        # Create a dictionary to keep track of which one-hop neighbors cover which two-hop neighbors
-        coverage_map = {}
-        for one_hop_neighbor, neighbor_data in self.neighbor_set.items():
-            two_hop_set = set(neighbor_data['neighbors']) - {self.componentinstancenumber} - set(self.neighbor_set.keys())
-            coverage_map[one_hop_neighbor] = {
-                'two_hop_set': two_hop_set,
-                'willingness': neighbor_data['willingness']
-            }
+    def request_resync(self, target, messagetype):
+        """
+        Asks a node to send its next HELLO or TC in full, at most once until a full one arrives.
+
+        HELLO resyncs go to the neighbor directly, TC resyncs are routed to the originator.
+
+        Args:
+            target (int): The node whose full message is requested.
+            messagetype (OLSREventTypes): OLSREventTypes.HELLO or OLSREventTypes.TC.
+        """
+        if (target, messagetype) in self._resync_requested:
+            return
+        next_hop = target if messagetype == OLSREventTypes.HELLO else self.routing_table.get(target)
+        if next_hop is None:
+            # Without a route the periodic full refresh has to do
+            return
+        self._resync_requested.add((target, messagetype))
+        self.counters['resync_requests_sent'] += 1
+        resync_message = ResyncMessage(
+            message_from=self.componentinstancenumber,
+            message_to=target,
+            payload={'messagetype': messagetype},
+            nexthop=next_hop
+        )
+        self.send_down(Event(self, EventTypes.MFRT, resync_message))
+
+    def on_resync(self, eventobj: Event):
+        """
+        Handles a request for a full HELLO or TC, forwarding it towards the requested node if needed.
 
-        # While there are still two-hop neighbors that are not covered
-        while any(data['two_hop_set'] for data in coverage_map.values()):
-            # Find the neighbors with the maximum number of unique uncovered two-hop neighbors
-            max_uncovered_count = max(len(data['two_hop_set'] - covered_two_hop_neighbors) for data in coverage_map.values())
-            candidates = [neighbor for neighbor, data in coverage_map.items() if len(data['two_hop_set'] - covered_two_hop_neighbors) == max_uncovered_count]
+        Args:
+            eventobj (Event): The event object containing the resync message.
 
-            # Select the candidate with the highest willingness
-            mpr_candidate = max(candidates, key=lambda x: coverage_map[x]['willingness'].value)
-            mpr_set.add(mpr_candidate)
+        Returns:
+            None
+        """
+        resync_message = eventobj.eventcontent
+        if resync_message.header.messageto == self.componentinstancenumber:
+            self.counters['resync_requests_received'] += 1
+            if resync_message.payload['messagetype'] == OLSREventTypes.HELLO:
+                self.hello_advertiser.full_pending = True
+            else:
+                self.tc_advertiser.full_pending = True
+        elif resync_message.header.nexthop == self.componentinstancenumber:
+            next_hop = self.routing_table.get(resync_message.header.messageto)
+            if next_hop is not None:
+                forwarded_message = ResyncMessage(
+                    message_from=resync_message.header.messagefrom,
+                    message_to=resync_message.header.messageto,
+                    payload=resync_message.payload,
+                    nexthop=next_hop
+                )
+                self.send_down(Event(self, EventTypes.MFRT, forwarded_message))
 
-            # Update the set of covered two-hop neighbors
-            covered_two_hop_neighbors.update(coverage_map[mpr_candidate]['two_hop_set'])
+    def tick_timer_wheel(self):
+        """
+        Asks the component to expire the entries whose holding time has passed.
 
-            # Remove covered two-hop neighbors from all sets in the coverage map
-            for neighbor_data in coverage_map.values():
-                neighbor_data['two_hop_set'].difference_update(covered_two_hop_neighbors)
+        Runs on the expiry timer, the entries themselves are expired on the event queue of the component.
+        """
+        self.send_self(Event(self, OLSREventTypes.EXPIRE, None))
 
-        return mpr_set
+    def on_expire(self, eventobj: Event):
+        """
+        Expires the neighbor, two-hop and topology entries whose holding time has passed.
+
+        Args:
+            eventobj (Event): The expiry event.
+
+        Returns:
+            None
+        """
+        for kind, node in self.timer_wheel.advance():
+            if kind == 'neighbor':
+                self.expire_neighbor(node)
+            else:
+                self.expire_topology(node)
+
+    def expire_neighbor(self, neighbor):
+        """
+        Forgets a neighbor that has not sent a HELLO within its holding time, together with its two-hop neighbors.
+
+        Args:
+            neighbor (int): The expired neighbor.
+        """
+        logger.debug(f"{self.componentname}-{self.componentinstancenumber} NEIGHBOR {neighbor} EXPIRED")
+        self.counters['neighbors_expired'] += 1
+        self.neighbor_set.pop(neighbor, None)
+        self._hello_neighbors = None
+        self.mpr_selector.remove_neighbor(neighbor)
+        node_data = self.known_topology.get(neighbor)
+        if node_data is not None:
+            node_data.pop('nexthop', None)
+            node_data.pop('distance', None)
+            self.update_topology_entry(neighbor, node_data)
+
+    def expire_topology(self, originator):
+        """
+        Forgets the advertised set of an originator that has not sent a TC within its holding time.
+
+        Args:
+            originator (int): The expired originator.
+        """
+        logger.debug(f"{self.componentname}-{self.componentinstancenumber} TOPOLOGY OF {originator} EXPIRED")
+        self.counters['topology_expired'] += 1
+        node_data = self.known_topology.get(originator)
+        if node_data is not None:
+            node_data.pop('mpr_selectors', None)
+            node_data.pop('ansn', None)
+            self.update_topology_entry(originator, node_data)
+
+    def update_topology_entry(self, node, node_data):
+        """
+        Stores a shrunk known_topology entry and propagates it to the routing engine, dropping the entry once it is
+        empty.
+
+        Args:
+            node (int): The key of the entry.
+            node_data (dict): The shrunk entry.
+        """
+        if 'nexthop' in node_data or 'mpr_selectors' in node_data:
+            self.known_topology[node] = node_data
+            changed = self.routing.update_entry(node, node_data)
+        else:
+            del self.known_topology[node]
+            changed = self.routing.remove_entry(node)
+        if changed:
+            self.mark_routing_dirty()
+
+    def select_mpr(self):
+        """
+        Selects the Multi-Point Relays (MPRs) based on the OLSR protocol.
+
+        Returns:
+            set: A set of selected MPRs.
+
+        Algorithm:
+            The greedy heuristic of OLSR: repeatedly pick the one-hop neighbor covering the most uncovered
+            two-hop neighbors, breaking ties by the highest willingness. The selection is maintained
+            incrementally by MPRSelector, so only the parts of the neighborhood changed by HELLOs since the
+            last call are recomputed. See OLSR.mpr.greedy_mpr for the from-scratch reference.
+        """
+        return self.mpr_selector.select()
 
     def calculate_routing_table(self):
         """
         Calculates the routing table based on the known topology.
 
-        This method creates a graph from the known topology and calculates the shortest paths from the current node to all other nodes.
-        It then updates the routing table with the next hop for each destination.
+        The RoutingEngine mirrors the known topology as an adjacency of unit-weight links and runs a breadth-first
+        search from the current node, resuming it from the first node whose links changed since the last call.
+        The routing table holds the next hop for each destination and is identical to the one produced by Dijkstra's
+        algorithm on the equivalent NetworkX graph (see OLSR.routing.networkx_routing_table).
 
         Returns:
             None
         """
-        # Create a new graph from the topology
-        G = nx.Graph()
-
-        # Add edges for each node in the topology
-        for node, node_data in self.known_topology.items():
-            if 'nexthop' in node_data:
-                G.add_edge(self.componentinstancenumber, node, weight=node_data['distance'])
+        self.counters['routing_recomputations'] += 1
+        self.routing_dirty = False
+        self._last_recompute = self.scheduler.clock()
+        routing_table = self.routing.compute()
+        if routing_table is not self.routing_table:
+            self.routing_table = routing_table
+            if self.state_saver is not None:
+                self.state_saver.check_convergence(self.topology, self.tc_counter)
+
+    def mark_routing_dirty(self):
+        """
+        Marks the routing table as out of date after a topology update and schedules its calculation.
 
-            if 'mpr_selectors' in node_data:
-                for mpr_selector in node_data['mpr_selectors']:
-                    G.add_edge(node, mpr_selector, weight=1)
+        Calculations are coalesced so that a burst of topology updates costs at most one calculation per
+        recompute_interval. Data packets that find the table dirty calculate it right away (see on_else).
+        """
+        self.counters['topology_updates'] += 1
+        self.routing_dirty = True
+        if self.recompute_interval <= 0:
+            self.calculate_routing_table()
+        elif not self._recompute_scheduled:
+            self._recompute_scheduled = True
+            delay = max(0, self._last_recompute + self.recompute_interval - self.scheduler.clock())
+            self.scheduler.call_later(delay, self.send_self, Event(self, OLSREventTypes.ROUTING_RECOMPUTE, None))
+
+    def on_routing_recompute(self, eventobj: Event):
+        """
+        Handles the scheduled routing table calculation.
 
-        # Calculate the shortest paths from the current node to all other nodes
-        shortest_paths = nx.single_source_dijkstra_path(G, self.componentinstancenumber)
+        Args:
+            eventobj (Event): The scheduled event.
 
-        # Update the routing table with the next hop for each destination
-        self.routing_table = {}
-        for dest, path in shortest_paths.items():
-            if dest != self.componentinstancenumber and len(path) > 1:
-                self.routing_table[dest] = path[1]
+        Returns:
+            None
+        """
+        self._recompute_scheduled = False
+        if self.routing_dirty:
+            self.calculate_routing_table()
 
 # def main(number_of_nodes):
 #     from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
@@ -316,8 +706,8 @@ class OLSRComponent(GenericModel):
 #     time.sleep(15)
     
 #     topo.exit()
-#     state_saver.produce_gif()
-#     logger.info(f"Converged at step: {state_saver.converged_step}")
+#     topo.state_saver.produce_gif()
+#     logger.info(f"Converged at step: {topo.state_saver.converged_step}")
 
 
 # if __name__ == '__main__':
@@ -0,0 +1,99 @@
+from OLSR.enums import AdvertisementStatus
+
+
+class Advertiser:
+    """
+    Builds the payload fields for a versioned set a node advertises periodically, such as its neighbors in HELLOs
+    or its MPRs in TCs.
+
+    The version increases whenever the advertised set changes. In delta mode only the entries added and removed since
+    the previous version are sent, together with the version they apply to. A full set is sent on the first
+    advertisement, every full_refresh_every advertisements, whenever a receiver asked for a resync, and when the delta
+    would list as many nodes as the set itself.
+
+    Advertised sets are frozensets, so receivers can keep them by reference. The full payload fields are built once
+    per version and shared by every advertisement of that version; they must not be modified.
+    """
+
+    def __init__(self, set_key, version_key, full_refresh_every=5):
+        """
+        Args:
+            set_key (str): The payload key of the full set, e.g. 'neighbors'.
+            version_key (str): The payload key of the version, e.g. 'ansn'.
+            full_refresh_every (int, optional): Every how many advertisements a full set is sent in delta mode. Defaults to 5.
+        """
+        self.set_key = set_key
+        self.version_key = version_key
+        self.base_version_key = 'base_' + version_key
+        self.full_refresh_every = full_refresh_every
+        self.version = 0
+        self.advertised = None
+        self.full_pending = True
+        self._since_full = 0
+        self._full_fields = None
+
+    def advertise(self, current, delta=False):
+        """
+        Records the current set and returns the payload fields advertising it.
+
+        Args:
+            current (Iterable[int]): The set to advertise. A frozenset is kept as is, other iterables are copied.
+            delta (bool, optional): Whether a delta may be sent instead of the full set. Defaults to False.
+
+        Returns:
+            dict: The payload fields.
+        """
+        if not isinstance(current, frozenset):
+            current = frozenset(current)
+        previous = self.advertised
+        base_version = self.version
+        if current is not previous and current != previous:
+            self.version += 1
+            self.advertised = current
+            self._full_fields = None
+
+        self._since_full += 1
+        if delta and not self.full_pending and previous is not None and self._since_full < self.full_refresh_every:
+            added = current - previous
+            removed = previous - current
+            # A delta listing as many nodes as the set itself saves nothing
+            if len(added) + len(removed) < len(current):
+                return {
+                    'added': added,
+                    'removed': removed,
+                    self.base_version_key: base_version,
+                    self.version_key: self.version,
+                }
+
+        self.full_pending = False
+        self._since_full = 0
+        if self._full_fields is None:
+            self._full_fields = {self.set_key: self.advertised, self.version_key: self.version}
+        return self._full_fields
+
+
+def merge_advertisement(payload, set_key, version_key, stored_set, stored_version):
+    """
+    Merges a received full or delta advertisement into the stored set.
+
+    Args:
+        payload (dict): The received payload.
+        set_key (str): The payload key of the full set.
+        version_key (str): The payload key of the version.
+        stored_set (set | None): The set stored for the sender, None if there is none.
+        stored_version (int | None): The version of the stored set, None if unknown.
+
+    Returns:
+        tuple: The AdvertisementStatus, the merged set (the stored one unless NEW) and its version.
+    """
+    version = payload.get(version_key)
+    if stored_set is not None and version is not None and stored_version is not None and version <= stored_version:
+        return AdvertisementStatus.UNCHANGED, stored_set, stored_version
+
+    if set_key in payload:
+        return AdvertisementStatus.NEW, payload[set_key], version
+
+    if stored_set is not None and payload['base_' + version_key] == stored_version:
+        return AdvertisementStatus.NEW, (stored_set - payload['removed']) | payload['added'], version
+
+    return AdvertisementStatus.GAP, stored_set, stored_version
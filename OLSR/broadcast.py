@@ -0,0 +1,128 @@
+from collections import Counter, OrderedDict
+
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Generics import Event, EventTypes, MessageDestinationIdentifiers, logger
+
+from OLSR.enums import OLSREventTypes
+from OLSR.message_types import BroadcastMessage
+
+
+class MPRBroadcastComponent(GenericModel):
+    """
+    Broadcasts application data over the MPRs of an OLSRComponent, as OLSR floods its TC messages.
+
+    The component sits next to the OLSRComponent of its node, above the same link layer. Every copy of a broadcast
+    carries the node that sent it, and a node that receives a copy for the first time delivers it up and relays it
+    only if that sender selected it as an MPR. As for TCs, this is read from the local state of the OLSRComponent:
+    the MPR set the sender advertised in its last TC, kept in the known topology. Broadcasts are identified by their
+    originator and sequence number, the last max_seen of them are remembered so duplicates are dropped.
+
+    The counters attribute counts the broadcasts originated (originated), delivered up (delivered) and relayed
+    (relayed), the duplicate copies dropped (duplicates_dropped) and the first copies not relayed because their
+    sender did not select this node (relays_suppressed).
+    """
+
+    def __init__(self, *args, olsr=None, **kwargs):
+        """
+        Args:
+            *args: Variable length arguments for GenericModel arguments passthrough.
+            olsr (OLSRComponent, optional): The OLSR component of the node, whose MPRs relay the broadcasts.
+                Defaults to None, no node relays then.
+            **kwargs: Keyword arguments for GenericModel arguments passthrough.
+        """
+        super().__init__(*args, **kwargs)
+        self.olsr = olsr
+        self.max_seen = 4096
+        self.sequencenumber = 0
+        self.seen = OrderedDict()
+        self.counters = Counter()
+
+    def set_parameters(self, olsr=None, max_seen=None):
+        """
+        Sets the parameters of the broadcast component.
+
+        Args:
+            olsr (OLSRComponent, optional): The OLSR component of the node. Defaults to None.
+            max_seen (int, optional): The number of broadcasts remembered to drop duplicates. Defaults to None.
+        """
+        if olsr is not None:
+            self.olsr = olsr
+        if max_seen is not None:
+            self.max_seen = max_seen
+
+    def selected_by(self, neighbor):
+        """
+        Tells whether a neighbor selected this node as an MPR, as advertised in the last TC of the neighbor.
+
+        Args:
+            neighbor (int): The neighbor.
+
+        Returns:
+            bool: True if the node relays the broadcasts the neighbor sends.
+        """
+        if self.olsr is None:
+            return False
+        return self.componentinstancenumber in self.olsr.known_topology.get(neighbor, {}).get('mpr_selectors', ())
+
+    def register(self, originator, sequencenumber):
+        """
+        Remembers a broadcast.
+
+        Returns:
+            bool: True if the broadcast is new, False if it was seen already.
+        """
+        key = (originator, sequencenumber)
+        if key in self.seen:
+            return False
+        self.seen[key] = True
+        if len(self.seen) > self.max_seen:
+            self.seen.popitem(last=False)
+        return True
+
+    def send_broadcast(self, originator, sequencenumber, data):
+        message = BroadcastMessage(
+            message_from=originator,
+            message_to=MessageDestinationIdentifiers.NETWORKLAYERBROADCAST,
+            payload={'data': data, 'sender': self.componentinstancenumber},
+            sequencenumber=sequencenumber,
+            nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+        )
+        self.send_down(Event(self, EventTypes.MFRT, message))
+
+    def on_message_from_top(self, eventobj: Event):
+        """
+        Broadcasts the content of the event to every node.
+
+        Args:
+            eventobj (Event): The event carrying the data.
+        """
+        self.sequencenumber += 1
+        self.register(self.componentinstancenumber, self.sequencenumber)
+        self.counters['originated'] += 1
+        self.send_broadcast(self.componentinstancenumber, self.sequencenumber, eventobj.eventcontent)
+
+    def on_message_from_bottom(self, eventobj: Event):
+        """
+        Delivers a new broadcast up and relays it if the node that sent this copy selected us as an MPR.
+
+        Args:
+            eventobj (Event): The event carrying the BroadcastMessage, other messages of the link layer are ignored.
+        """
+        message = eventobj.eventcontent
+        header = getattr(message, 'header', None)
+        if getattr(header, 'messagetype', None) != OLSREventTypes.BROADCAST:
+            return
+
+        if not self.register(header.messagefrom, header.sequencenumber):
+            self.counters['duplicates_dropped'] += 1
+            return
+
+        self.counters['delivered'] += 1
+        self.send_up(Event(self, EventTypes.MFRB, message, fromchannel=eventobj.fromchannel))
+
+        if self.selected_by(message.payload['sender']):
+            self.counters['relayed'] += 1
+            logger.debug(f"{self.componentname}-{self.componentinstancenumber} RELAYS BROADCAST {header.messagefrom}-{header.sequencenumber}")
+            self.send_broadcast(header.messagefrom, header.sequencenumber, message.payload['data'])
+        else:
+            self.counters['relays_suppressed'] += 1
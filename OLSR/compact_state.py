@@ -0,0 +1,437 @@
+"""
+Compact, array-backed storage for the neighbor set, known topology and routing table of an OLSR node.
+
+Node identifiers are interned to dense indices by a NodeIndex shared by all nodes of a topology. Sets of nodes are
+stored as bitsets over these indices (Python ints), and the scalar fields of the entries in typed arrays, one slot
+per entry. The containers are mappings with the same keys and entries as the dicts OLSRComponent uses by default.
+Reading an entry builds a new dict of its fields, with frozensets for the sets of nodes, so entries are replaced as a
+whole rather than modified in place. The routing table is a read-only mapping.
+
+The MPR selector and the routing engine of a compact node keep their own state over the same indices: NodeSet gives
+the selector bitsets with the set operations it uses, and CompactRoutingEngine keeps its edges as packed index pairs.
+"""
+
+import threading
+from array import array
+from bisect import insort
+from collections.abc import Mapping, MutableMapping
+from functools import partial
+
+from OLSR.enums import Willingness
+from OLSR.routing import RoutingEngine
+
+# Stands for a missing scalar field in the arrays
+_MISSING = -1
+# Pairs of indices are packed into a single int, the first one in the high bits
+_SHIFT = 32
+_MASK = (1 << _SHIFT) - 1
+
+
+class NodeIndex:
+    """
+    Interns node identifiers to dense indices.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.ids = []
+        self.index = {}
+
+    @classmethod
+    def for_topology(cls, topology):
+        """
+        Returns the index shared by the nodes of a topology, creating it on first use.
+
+        Args:
+            topology: The topology, None for an index of its own.
+
+        Returns:
+            NodeIndex: The index, kept as the node_index attribute of the topology.
+        """
+        if topology is None:
+            return cls()
+        node_index = getattr(topology, 'node_index', None)
+        if node_index is None:
+            with cls._lock:
+                node_index = getattr(topology, 'node_index', None)
+                if node_index is None:
+                    node_index = topology.node_index = cls()
+        return node_index
+
+    def intern(self, node):
+        """
+        Args:
+            node (Hashable): The node identifier.
+
+        Returns:
+            int: The dense index of the node.
+        """
+        index = self.index.get(node)
+        if index is None:
+            with self._lock:
+                index = self.index.get(node)
+                if index is None:
+                    index = len(self.ids)
+                    self.ids.append(node)
+                    self.index[node] = index
+        return index
+
+    def to_bits(self, nodes):
+        """
+        Args:
+            nodes (Iterable): Node identifiers.
+
+        Returns:
+            int: The bitset of their indices.
+        """
+        bits = 0
+        for node in nodes:
+            bits |= 1 << self.intern(node)
+        return bits
+
+    def from_bits(self, bits):
+        """
+        Args:
+            bits (int): A bitset of node indices.
+
+        Returns:
+            frozenset: The node identifiers.
+        """
+        ids = self.ids
+        nodes = []
+        while bits:
+            lowest = bits & -bits
+            nodes.append(ids[lowest.bit_length() - 1])
+            bits ^= lowest
+        return frozenset(nodes)
+
+    def node_set(self, nodes=()):
+        """
+        Args:
+            nodes (Iterable, optional): Node identifiers. Defaults to ().
+
+        Returns:
+            NodeSet: A set of the nodes, stored as a bitset over this index.
+        """
+        return NodeSet(self, nodes.bits if isinstance(nodes, NodeSet) else self.to_bits(nodes))
+
+
+class NodeSet:
+    """
+    A mutable set of node identifiers stored as a bitset over a NodeIndex, for the sets of nodes MPRSelector keeps.
+
+    It supports the set operations the selector uses, and compares equal to any set of the same nodes.
+    """
+
+    __slots__ = ('node_index', 'bits')
+
+    def __init__(self, node_index, bits=0):
+        """
+        Args:
+            node_index (NodeIndex): Interns the node identifiers.
+            bits (int, optional): The bitset of the node indices. Defaults to 0.
+        """
+        self.node_index = node_index
+        self.bits = bits
+
+    __hash__ = None
+
+    def _bit(self, node):
+        index = self.node_index.index.get(node)
+        return 0 if index is None else 1 << index
+
+    def __len__(self):
+        return bin(self.bits).count('1')
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __iter__(self):
+        ids = self.node_index.ids
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            yield ids[lowest.bit_length() - 1]
+            bits ^= lowest
+
+    def __contains__(self, node):
+        return self.bits & self._bit(node) != 0
+
+    def __eq__(self, other):
+        if isinstance(other, NodeSet):
+            return self.bits == other.bits
+        try:
+            return len(other) == len(self) and all(node in self for node in other)
+        except TypeError:
+            return NotImplemented
+
+    def __sub__(self, other):
+        return NodeSet(self.node_index, self.bits & ~other.bits)
+
+    def __or__(self, other):
+        return NodeSet(self.node_index, self.bits | other.bits)
+
+    def __ior__(self, other):
+        self.bits |= other.bits
+        return self
+
+    def __repr__(self):
+        return f"NodeSet({set(self)})"
+
+    def add(self, node):
+        self.bits |= 1 << self.node_index.intern(node)
+
+    def discard(self, node):
+        self.bits &= ~self._bit(node)
+
+
+class _SlotTable(MutableMapping):
+    """
+    A mapping from nodes to entries stored in slots of parallel arrays, reused once their entry is deleted.
+    """
+
+    def __init__(self, node_index):
+        self.node_index = node_index
+        self._slots = {}
+        self._free = []
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    def __contains__(self, node):
+        return node in self._slots
+
+    def __getitem__(self, node):
+        return self._read(self._slots[node])
+
+    def get(self, node, default=None):
+        slot = self._slots.get(node)
+        return default if slot is None else self._read(slot)
+
+    def __setitem__(self, node, entry):
+        slot = self._slots.get(node)
+        if slot is None:
+            slot = self._free.pop() if self._free else self._allocate()
+            self._slots[node] = slot
+        self._write(slot, entry)
+
+    def __delitem__(self, node):
+        slot = self._slots.pop(node)
+        self._clear(slot)
+        self._free.append(slot)
+
+    def _optional(self, value):
+        return _MISSING if value is None else value
+
+
+class CompactNeighborSet(_SlotTable):
+    """
+    The neighbor set of a node: one-hop neighbors mapped to {'neighbors', 'willingness', 'version'}.
+    """
+
+    def __init__(self, node_index, entries=()):
+        """
+        Args:
+            node_index (NodeIndex): Interns the node identifiers.
+            entries (Mapping, optional): Entries to start with. Defaults to ().
+        """
+        super().__init__(node_index)
+        self._neighbors = []
+        self._willingness = array('B')
+        self._version = array('q')
+        for node, entry in dict(entries).items():
+            self[node] = entry
+
+    def _allocate(self):
+        self._neighbors.append(0)
+        self._willingness.append(0)
+        self._version.append(_MISSING)
+        return len(self._neighbors) - 1
+
+    def _write(self, slot, entry):
+        self._neighbors[slot] = self.node_index.to_bits(entry.get('neighbors') or ())
+        self._willingness[slot] = entry.get('willingness', Willingness.WILL_DEFAULT).value
+        self._version[slot] = self._optional(entry.get('version'))
+
+    def _clear(self, slot):
+        self._neighbors[slot] = 0
+
+    def _read(self, slot):
+        version = self._version[slot]
+        return {
+            'neighbors': self.node_index.from_bits(self._neighbors[slot]),
+            'willingness': Willingness(self._willingness[slot]),
+            'version': None if version == _MISSING else version,
+        }
+
+
+class CompactTopologySet(_SlotTable):
+    """
+    The known topology of a node: nodes mapped to their optional 'nexthop', 'distance', 'mpr_selectors' and 'ansn'.
+    """
+
+    def __init__(self, node_index, entries=()):
+        """
+        Args:
+            node_index (NodeIndex): Interns the node identifiers.
+            entries (Mapping, optional): Entries to start with. Defaults to ().
+        """
+        super().__init__(node_index)
+        self._nexthop = array('l')
+        self._distance = array('l')
+        # None when the entry has no advertised set, a bitset otherwise
+        self._mpr_selectors = []
+        self._ansn = array('q')
+        for node, entry in dict(entries).items():
+            self[node] = entry
+
+    def _allocate(self):
+        self._nexthop.append(_MISSING)
+        self._distance.append(_MISSING)
+        self._mpr_selectors.append(None)
+        self._ansn.append(_MISSING)
+        return len(self._nexthop) - 1
+
+    def _write(self, slot, entry):
+        nexthop = entry.get('nexthop')
+        self._nexthop[slot] = _MISSING if nexthop is None else self.node_index.intern(nexthop)
+        self._distance[slot] = self._optional(entry.get('distance'))
+        mpr_selectors = entry.get('mpr_selectors')
+        self._mpr_selectors[slot] = None if mpr_selectors is None else self.node_index.to_bits(mpr_selectors)
+        self._ansn[slot] = self._optional(entry.get('ansn'))
+
+    def _clear(self, slot):
+        self._mpr_selectors[slot] = None
+
+    def _read(self, slot):
+        entry = {}
+        nexthop = self._nexthop[slot]
+        if nexthop != _MISSING:
+            entry['nexthop'] = self.node_index.ids[nexthop]
+            entry['distance'] = self._distance[slot]
+        mpr_selectors = self._mpr_selectors[slot]
+        if mpr_selectors is not None:
+            entry['mpr_selectors'] = self.node_index.from_bits(mpr_selectors)
+            ansn = self._ansn[slot]
+            entry['ansn'] = None if ansn == _MISSING else ansn
+        return entry
+
+
+class CompactRoutingTable(Mapping):
+    """
+    A read-only routing table, destination to next hop, stored as an array of next hop indices by destination index.
+    """
+
+    def __init__(self, node_index, next_hops):
+        """
+        Args:
+            node_index (NodeIndex): Interns the node identifiers.
+            next_hops (Mapping): The next hop of each reachable destination.
+        """
+        self.node_index = node_index
+        table = array('l')
+        for destination, next_hop in next_hops.items():
+            index = node_index.intern(destination)
+            if index >= len(table):
+                table.extend([_MISSING] * (index + 1 - len(table)))
+            table[index] = node_index.intern(next_hop)
+        self._table = table
+        self._length = len(next_hops)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        ids = self.node_index.ids
+        return (ids[index] for index, next_hop in enumerate(self._table) if next_hop != _MISSING)
+
+    def get(self, destination, default=None):
+        index = self.node_index.index.get(destination)
+        if index is None or index >= len(self._table):
+            return default
+        next_hop = self._table[index]
+        return default if next_hop == _MISSING else self.node_index.ids[next_hop]
+
+    def __getitem__(self, destination):
+        next_hop = self.get(destination)
+        if next_hop is None:
+            raise KeyError(destination)
+        return next_hop
+
+    def __contains__(self, destination):
+        return self.get(destination) is not None
+
+
+class CompactRoutingEngine(RoutingEngine):
+    """
+    A RoutingEngine over node indices, which hands out CompactRoutingTables.
+
+    The edges of an entry are kept as an array of packed index pairs, and the occurrences of an edge, i.e. the
+    (group order, index) pairs the adjacency is ordered by, as packed ints keyed by the packed pair of its ends: a
+    single int for an edge in one entry, a sorted list otherwise. The search and the resulting routing tables are
+    those of RoutingEngine.
+    """
+
+    def __init__(self, source, node_index):
+        """
+        Args:
+            source (int): The identifier of the calculating node.
+            node_index (NodeIndex): Interns the node identifiers.
+        """
+        self.node_index = node_index
+        super().__init__(source, partial(CompactRoutingTable, node_index))
+        self._occurrences = {}
+
+    def _edges_of(self, node, node_data):
+        intern = self.node_index.intern
+        edges = array('q')
+        if 'nexthop' in node_data:
+            edges.append(intern(self.source) << _SHIFT | intern(node))
+        node = intern(node) << _SHIFT
+        for mpr_selector in node_data.get('mpr_selectors', ()):
+            edges.append(node | intern(mpr_selector))
+        return edges
+
+    def _link(self, order, edges):
+        ids = self.node_index.ids
+        for index, edge in enumerate(edges):
+            a, b = edge >> _SHIFT, edge & _MASK
+            key = min(a, b) << _SHIFT | max(a, b)
+            occurrence = order << _SHIFT | index
+            occurrences = self._occurrences.get(key)
+            if occurrences is None:
+                first = None
+                self._occurrences[key] = occurrence
+            elif isinstance(occurrences, int):
+                first = occurrences
+                self._occurrences[key] = sorted((occurrences, occurrence))
+            else:
+                first = occurrences[0]
+                insort(occurrences, occurrence)
+            if first is None or occurrence < first:
+                self._set_first(ids[a], ids[b], occurrence)
+
+    def _unlink(self, order, edges):
+        ids = self.node_index.ids
+        for index, edge in enumerate(edges):
+            a, b = edge >> _SHIFT, edge & _MASK
+            key = min(a, b) << _SHIFT | max(a, b)
+            occurrence = order << _SHIFT | index
+            occurrences = self._occurrences[key]
+            a, b = ids[a], ids[b]
+            if isinstance(occurrences, int):
+                del self._occurrences[key]
+                self._adjacency[a].pop(b, None)
+                self._adjacency[b].pop(a, None)
+                self._invalidate(a, b)
+                continue
+            first = occurrences[0]
+            occurrences.remove(occurrence)
+            if len(occurrences) == 1:
+                self._occurrences[key] = occurrences[0]
+            if occurrence == first:
+                self._set_first(a, b, occurrences[0])
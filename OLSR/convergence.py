@@ -0,0 +1,140 @@
+"""
+Headless convergence detection for OLSR topologies.
+
+OLSR has converged once every node is covered by the MPRs, i.e. is an MPR or a neighbor of one, and the routing
+table of every node follows shortest paths on the ground-truth graph of the topology. Both conditions are checked
+on the live topology without plotting anything.
+"""
+
+import threading
+import time
+
+import networkx as nx
+
+from OLSR.versioned_graph import graph_version
+
+
+def mpr_coverage(G, selected_as_mpr):
+    """
+    Tells whether every node of a graph is an MPR or a neighbor of one.
+
+    Args:
+        G (nx.Graph): The graph.
+        selected_as_mpr (dict): Whether each node is selected as MPR.
+
+    Returns:
+        bool: True if every node is covered.
+    """
+    for node in G.nodes:
+        if selected_as_mpr.get(node, False):
+            continue
+        if not any(selected_as_mpr.get(neighbor, False) for neighbor in G.neighbors(node)):
+            return False
+    return True
+
+
+def routes_follow_shortest_paths(G, routing_tables, distances=None):
+    """
+    Tells whether the next hop of every node towards every reachable destination lies on a shortest path of a graph.
+
+    Args:
+        G (nx.Graph): The graph.
+        routing_tables (dict): The routing table, destination to next hop, of each node.
+        distances (dict, optional): The hop distances between all pairs of nodes of G. Computed if None.
+
+    Returns:
+        bool: True if every route is a shortest path.
+    """
+    if distances is None:
+        distances = dict(nx.all_pairs_shortest_path_length(G))
+    for node, node_distances in distances.items():
+        routing_table = routing_tables.get(node, {})
+        for destination, distance in node_distances.items():
+            if destination == node:
+                continue
+            next_hop = routing_table.get(destination)
+            if next_hop is None or not G.has_edge(node, next_hop) or \
+                    distances[next_hop].get(destination) != distance - 1:
+                return False
+    return True
+
+
+class ConvergenceDetector:
+    """
+    Records the step and time at which a topology first reached MPR coverage, shortest-path routing and both.
+
+    Checks are meant to run at each state change, i.e. whenever a node changes its MPR status or its routing table.
+    The hop distances of the graph are cached until its links change, which is told in O(1) for a VersionedGraph
+    (see OLSR.versioned_graph.graph_version). Checks may run concurrently from the threads
+    of several nodes, only recording a first convergence takes a lock.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        Args:
+            clock (Callable[[], float], optional): The time source, used when the topology has no scheduler.
+                Defaults to time.monotonic.
+        """
+        self.clock = clock
+        self._lock = threading.Lock()
+        # The version of the graph and its hop distances, replaced together
+        self._distances = (None, None)
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the recorded convergence.
+        """
+        self.checks = 0
+        self.coverage_step = None
+        self.coverage_time = None
+        self.routing_step = None
+        self.routing_time = None
+        self.converged_step = None
+        self.converged_time = None
+        self.converged = False
+
+    def _now(self, topology):
+        scheduler = getattr(topology, 'scheduler', None)
+        return scheduler.clock() if scheduler is not None else self.clock()
+
+    def _shortest_path_lengths(self, G):
+        version = graph_version(G)
+        cached_version, distances = self._distances
+        if version != cached_version:
+            distances = dict(nx.all_pairs_shortest_path_length(G))
+            self._distances = (version, distances)
+        return distances
+
+    def _record(self, topology, step, covered, routed):
+        with self._lock:
+            self.checks += 1
+            now = None
+            if covered and self.coverage_time is None:
+                now = self._now(topology)
+                self.coverage_step, self.coverage_time = step, now
+            if routed and self.routing_time is None:
+                now = self._now(topology) if now is None else now
+                self.routing_step, self.routing_time = step, now
+            self.converged = covered and routed
+            if self.converged and self.converged_time is None:
+                now = self._now(topology) if now is None else now
+                self.converged_step, self.converged_time = step, now
+
+    def check(self, topology, step=None):
+        """
+        Checks the current state of a topology, recording the first step and time each condition held.
+
+        Args:
+            topology (Topology): The topology. Its nodes expose selected_as_mpr and routing_table.
+            step (int, optional): The step of the state, e.g. the TC counter of the node that changed. Defaults to None.
+
+        Returns:
+            bool: True if the topology is converged now.
+        """
+        G = topology.G
+        covered = mpr_coverage(G, {k: getattr(v, 'selected_as_mpr', False) for k, v in topology.nodes.items()})
+        routing_tables = {k: getattr(v, 'routing_table', {}) for k, v in topology.nodes.items()}
+        routed = routes_follow_shortest_paths(G, routing_tables, self._shortest_path_lengths(G))
+        self._record(topology, step, covered, routed)
+        return covered and routed
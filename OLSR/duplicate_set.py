@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class DuplicateSet:
+    """
+    Remembers the latest sequence number seen from each originator, as the OLSR duplicate set does.
+
+    A message is new only if its sequence number is higher than the latest one recorded for its originator.
+    Messages with the same sequence number are duplicates, lower ones are stale. Records expire after the hold
+    time, so an originator that restarts its counter is accepted again once its old record is gone.
+    """
+
+    def __init__(self, hold_time=30, clock=time.monotonic):
+        """
+        Args:
+            hold_time (float, optional): Seconds a record is kept after it was last refreshed. Defaults to 30.
+            clock (Callable[[], float], optional): The time source. Defaults to time.monotonic.
+        """
+        self.hold_time = hold_time
+        self.clock = clock
+        self._records = {}
+        self._next_purge = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def register(self, originator, sequencenumber):
+        """
+        Records a message if it is new.
+
+        Args:
+            originator (int): The identifier of the node that created the message.
+            sequencenumber (int): The sequence number assigned by the originator.
+
+        Returns:
+            bool: True if the message is new, False if it is a duplicate or stale.
+        """
+        now = self.clock()
+        with self._lock:
+            if now >= self._next_purge:
+                self._purge(now)
+
+            record = self._records.get(originator)
+            if record is not None and record[1] > now and sequencenumber <= record[0]:
+                return False
+
+            self._records[originator] = (sequencenumber, now + self.hold_time)
+            return True
+
+    def _purge(self, now):
+        self._records = {originator: record for originator, record in self._records.items() if record[1] > now}
+        self._next_purge = now + self.hold_time
@@ -6,6 +6,10 @@ class OLSREventTypes(Enum):
     """
     HELLO = "hello"
     TC = "topology_control"
+    ROUTING_RECOMPUTE = "routing_recompute"
+    EXPIRE = "expire"
+    RESYNC = "resync"
+    BROADCAST = "broadcast"
 
 class Willingness(Enum):
     """
@@ -15,4 +19,12 @@ class Willingness(Enum):
     WILL_LOW = 1
     WILL_DEFAULT = 3
     WILL_HIGH = 7
-    WILL_ALWAYS = 255
\ No newline at end of file
+    WILL_ALWAYS = 255
+
+class AdvertisementStatus(Enum):
+    """
+    Enum class representing the outcome of merging a received advertisement into the stored one.
+    """
+    NEW = "new"
+    UNCHANGED = "unchanged"
+    GAP = "gap"
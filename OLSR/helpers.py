@@ -1,80 +1,274 @@
 import networkx as nx
 import threading
-import matplotlib.pyplot as plt
-plt.switch_backend('agg')
 import os
-from copy import deepcopy
+from heapq import heappop, heappush
+from itertools import count, islice
+from OLSR.convergence import ConvergenceDetector
+from OLSR.rendering import RED, Layout, iter_frames, render_frames, write_gif
+from OLSR.state_history import StateHistory
+from OLSR.versioned_graph import graph_version
 
 class TopologyStateSaver:
     """
     A class for saving and visualizing the state of a topology.
 
+    Each topology has its own saver, see for_topology, so runs in the same process do not share states. The states
+    are kept in a StateHistory bounded to max_states: the graph is copied only when it changes, each state only
+    stores the nodes whose MPR status changed and full states are rebuilt when they are read.
+
+    The nodes of a topology record their changes from their own threads. Each thread appends to a buffer of its own,
+    without taking a lock, and the buffers are merged into the history when the states are read or a buffer grows
+    past merge_every records. Records are numbered when they are made and applied in that order: a merge only applies
+    them up to the first number not buffered yet, the later ones wait in a heap for the next merge. The buffer of a
+    thread that exited is dropped once it was merged.
+
     Attributes:
-        states (list): A list to store the states of the topology.
-        graphs (list): A list to store the graphs of the topology.
-        steps (list): A list to store the steps of the topology.
+        history (StateHistory): The saved states.
+        states (Sequence[dict]): The MPR status of each node at each saved state.
+        graphs (Sequence[nx.Graph]): The graph at each saved state.
+        steps (Sequence[int]): The step of each saved state.
         converged_step (int): The step at which the topology converged.
+        detect_convergence (bool): Whether the detector checks the topology at each state change, off by default.
+        detector (ConvergenceDetector): Checks the topology for convergence at each state change, until it converged.
+        coverage_index (int): The index of the first saved state in which every node is covered by an MPR, None if
+            there is none or it was dropped from the history.
 
     Methods:
+        for_topology: Returns the saver of a topology.
         save_state: Saves the state of the topology.
+        update_state: Records MPR status changes without saving a state.
+        check_convergence: Checks the topology for convergence.
         save_each_state: Saves each state of the topology and plots it.
         produce_gif: Produces a GIF animation of the saved states.
     """
 
-    states = []
-    graphs = []
-    steps = []
     converged_step = 0
+    _lock = threading.Lock()
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, max_states=100000, merge_every=1024, detect_convergence=False) -> None:
+        """
+        Args:
+            max_states (int): The maximum number of states kept, the oldest are dropped beyond it.
+            merge_every (int): The number of records a thread buffers before merging them into the history.
+            detect_convergence (bool): Whether to check the topology for convergence at each state change. Each
+                check walks every pair of nodes, so runs that do not read the detector leave it off.
+        """
+        self.max_states = max_states
+        self.merge_every = merge_every
+        self.detect_convergence = detect_convergence
+        self.detector = ConvergenceDetector()
+        self._merge_lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def for_topology(cls, topology):
+        """
+        Returns the saver of a topology, creating it on first use.
+
+        Args:
+            topology: The topology.
 
-    def save_state(self, topology, step=None):
+        Returns:
+            TopologyStateSaver: The saver, kept as the state_saver attribute of the topology.
+        """
+        saver = getattr(topology, 'state_saver', None)
+        if saver is None:
+            with cls._lock:
+                saver = getattr(topology, 'state_saver', None)
+                if saver is None:
+                    saver = topology.state_saver = cls()
+        return saver
+
+    @property
+    def states(self):
+        self.merge()
+        return self.history.states
+
+    @property
+    def graphs(self):
+        self.merge()
+        return self.history.graphs
+
+    @property
+    def steps(self):
+        self.merge()
+        return self.history.steps
+
+    @property
+    def coverage_index(self):
+        self.merge()
+        if self._coverage_index is None or self._coverage_index < self.history.dropped:
+            return None
+        return self._coverage_index - self.history.dropped
+
+    def _buffer(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = []
+            with self._merge_lock:
+                self._buffers.append((threading.current_thread(), buffer))
+        return buffer
+
+    def _record(self, changes, graph=None, version=None, step=None, covers=False):
+        """
+        Appends a record to the buffer of the current thread.
+
+        Args:
+            changes (dict): The MPR status changes.
+            graph (nx.Graph): The copy of the graph of a saved state, None if no state is saved.
+            version (Hashable): The graph_version of the graph copied.
+            step (int): The step of the saved state.
+            covers (bool): Whether the saved state is the first in which every node is covered by an MPR.
+        """
+        buffer = self._buffer()
+        buffer.append((next(self._sequence), changes, graph, version, step, covers))
+        if len(buffer) >= self.merge_every and self._merge_lock.acquire(blocking=False):
+            try:
+                self._merge()
+            finally:
+                self._merge_lock.release()
+
+    def merge(self):
+        """
+        Moves the records buffered by all threads into the history.
+        """
+        with self._merge_lock:
+            self._merge()
+
+    def _merge(self):
+        pending = self._pending
+        buffers = []
+        for thread, buffer in self._buffers:
+            # A thread that exited before its buffer is taken records nothing more
+            exited = not thread.is_alive()
+            taken = buffer[:]
+            del buffer[:len(taken)]
+            for record in taken:
+                heappush(pending, record)
+            if not exited:
+                buffers.append((thread, buffer))
+        self._buffers = buffers
+
+        # A number missing from the heap was taken by a thread that did not buffer its record yet
+        while pending and pending[0][0] == self._next_sequence:
+            _, changes, graph, version, step, covers = heappop(pending)
+            self._next_sequence += 1
+            self.history.update(changes)
+            if graph is not None:
+                self.history.append(graph, step, graph.nodes, copy=False, version=version)
+                if covers and self._coverage_index is None:
+                    self._coverage_index = self.history.dropped + len(self.history) - 1
+
+    def _graph_copy(self, G):
+        """
+        Returns a copy of a graph and its graph_version, copied only when the version changed. Threads racing on a
+        change may each make a copy.
+        """
+        version = graph_version(G)
+        cached = self._graph
+        if version != cached[0]:
+            cached = self._graph = (version, G.copy())
+        return cached
+
+    def save_state(self, topology, step=None, changes=None):
         """
         Saves the state of the topology.
 
         Args:
             topology: The topology object to save the state of.
             step (int): The step at which the topology is saved.
+            changes (dict): The MPR status of the nodes that changed since the last call to save_state or
+                update_state. The status of every node is read if None.
+        """
+        if changes is None:
+            changes = {k: v.selected_as_mpr for k, v in topology.nodes.items()}
+        version, graph = self._graph_copy(topology.G)
+        covered_before = self.detector.coverage_time is not None
+        self.check_convergence(topology, step)
+        covers = not covered_before and self.detector.coverage_time is not None
+        self._record(changes, graph, version, step, covers)
+
+    def update_state(self, changes):
+        """
+        Records MPR status changes that are part of the next saved state.
+
+        Args:
+            changes (dict): The new MPR status of each node that changed.
         """
-        self.states.append({k: v.selected_as_mpr for k, v in topology.nodes.items()})
-        self.graphs.append(deepcopy(topology.G))
-        self.steps.append(step)
+        self._record(changes)
 
-    def save_each_state(self):
+    def check_convergence(self, topology, step=None):
         """
-        Saves each state of the topology and plots it. Stops when the topology converges.
+        Checks whether the topology has converged, without plotting it. Called at each state change, i.e. whenever a
+        node changes its MPR status or its routing table. Nothing is checked unless detect_convergence is set, nor
+        once the topology converged: the detector then recorded the first step and time of every condition.
+
+        Args:
+            topology: The topology object to check.
+            step (int): The step of the state.
+
+        Returns:
+            bool: True if every node is covered by an MPR and all routing tables follow shortest paths, as of the
+                last check.
         """
-        for graph, state, step in zip(self.graphs, self.states, self.steps):
-            for node, selected_as_mpr in state.items():
-                graph.nodes[node]['selected_as_mpr'] = selected_as_mpr
-                self.converged_step = step
-            if plot_topology(graph, in_thread=False):
-                break
+        if not self.detect_convergence or self.detector.converged_time is not None:
+            return self.detector.converged
+        converged = self.detector.check(topology, step)
+        if self.detector.converged_step is not None:
+            self.converged_step = self.detector.converged_step
+        return converged
 
-    def produce_gif(self):
+    def frames(self):
+        """
+        Returns the graphs and states to draw: up to the first state in which every node is covered by an MPR, as
+        recorded by the detector when detect_convergence is set, or all of them if there is none.
         """
-        Produces a GIF animation of the saved states.
+        last = len(self.states) if self.coverage_index is None else self.coverage_index + 1
+        return islice(self.graphs, last), islice(self.states, last)
+
+    def save_each_state(self, processes=None):
+        """
+        Saves each state of the topology and plots it. Stops at the first state in which every node is covered by an
+        MPR, as recorded by the detector.
+
+        Args:
+            processes (int): The number of processes drawing the plots. Defaults to the number of CPUs.
         """
-        try:
-            from PIL import Image
-        except ImportError:
-            raise ImportError("You need to have the Python Imaging Library (PIL) installed to create a GIF.")
-        self.save_each_state()
-        images = []
-        image_files = os.listdir('plots')
-        for i in range (len(image_files)):
-            images.append(Image.open(f'plots/{i + 1}.png'))
-        images[0].save('plots/animation.gif', save_all=True, append_images=images[1:], optimize=False, duration=500, loop=0)
-            
+        number = _next_plot_number()
+        for png in iter_frames(*self.frames(), processes=processes, image_format='PNG'):
+            with open(f'plots/{number}.png', 'wb') as file:
+                file.write(png)
+            number += 1
+
+    def produce_gif(self, path='plots/animation.gif', processes=None):
+        """
+        Produces a GIF animation of the saved states. The frames are drawn in parallel and streamed into the GIF,
+        no image files are written.
+
+        Args:
+            path (str): The path of the GIF.
+            processes (int): The number of processes drawing the frames. Defaults to the number of CPUs.
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        write_gif(path, *self.frames(), processes=processes)
+
     def reset(self):
         """
         Resets the states, graphs and steps of the topology.
         """
-        self.states = []
-        self.graphs = []
-        self.steps = []
-        self.converged_step = 0
+        with self._merge_lock:
+            self.history = StateHistory(capacity=self.max_states)
+            self._local = threading.local()
+            self._buffers = []
+            self._sequence = count()
+            self._pending = []
+            self._next_sequence = 0
+            self._graph = (None, None)
+            self._coverage_index = None
+            self.converged_step = 0
+            self.detector.reset()
 
 def plot_topology(topology, in_thread=True):
     """
@@ -93,6 +287,18 @@ def plot_topology(topology, in_thread=True):
     else:
         return _plot_topology(topology)
 
+def _next_plot_number():
+    """
+    Creates the plots directory if needed and returns the number of the next plot in it.
+    """
+    if not os.path.exists('plots'):
+        os.makedirs('plots')
+    highest_num = 0
+    for file in os.listdir('plots'):
+        if file.endswith('.png') and file.split('.')[0].isdigit():
+            highest_num = max(highest_num, int(file.split('.')[0]))
+    return highest_num + 1
+
 def _plot_topology(topology):
     """
     Helper function to plot the given topology.
@@ -100,61 +306,21 @@ def _plot_topology(topology):
     Args:
         topology: The topology object to plot.
     """
-    # Create a new figure and axis
-    fig, ax = plt.subplots(figsize=(8, 6))
-
     # Check if the input is a NetworkX graph
     if isinstance(topology, nx.Graph):
-        # Get the selected_as_mpr attributes of the nodes
-        selected_as_mpr = nx.get_node_attributes(topology, 'selected_as_mpr')
-
-        # Create a list of colors for each node
-        colors = ['blue' if selected_as_mpr.get(node, False) else 'red' for node in topology.nodes]
-        
-        # Set the graph to the input
         G = topology
+        state = nx.get_node_attributes(topology, 'selected_as_mpr')
     else:
-        # Create a list of colors for each node
-        colors = ['blue' if getattr(node, 'selected_as_mpr', False) else 'red' for node in topology.nodes.values()]
-        
-        # Set the graph to the graph of the topology
         G = topology.G
+        state = {k: getattr(v, 'selected_as_mpr', False) for k, v in topology.nodes.items()}
 
-    # Modify the colors of one-hop neighbors of blue nodes to green
-    for node in G.nodes:
-        if colors[list(G.nodes).index(node)] == 'blue':
-            for neighbor in G.neighbors(node):
-                if colors[list(G.nodes).index(neighbor)] == 'red':
-                    colors[list(G.nodes).index(neighbor)] = 'green'
-
-    # Draw the graph
-    pos = nx.kamada_kawai_layout(G)
-    nx.draw(G, pos, with_labels=True, font_weight='bold', ax=ax, node_color=colors)
-
-    # Set the title and labels
-    ax.set_title("Topology Plot")
-    ax.set_xlabel("X")
-    ax.set_ylabel("Y")
-
-    # Display the plot
-    plt.tight_layout()
-
-    # Create the plots directory if it doesn't exist
-    if not os.path.exists('plots'):
-        os.makedirs('plots')
-
-    # Find the highest numbered file in the plots directory
-    highest_num = 0
-    for file in os.listdir('plots'):
-        if file.endswith('.png'):
-            num = int(file.split('.')[0])
-            if num > highest_num:
-                highest_num = num
+    # Blue for MPRs, green for their one-hop neighbors, red for the others
+    layout = Layout(G)
+    colors = layout.colors(state)
+    png, = render_frames(None, layout.positions, layout.edges, layout.labels, [colors], 'PNG')
 
     # Save the plot with the next number
-    plt.savefig(f'plots/{highest_num + 1}.png')
+    with open(f'plots/{_next_plot_number()}.png', 'wb') as file:
+        file.write(png)
 
-    if all(color != 'red' for color in colors):
-        return True
-    
-    return False
\ No newline at end of file
+    return bool((colors != RED).all())
@@ -93,4 +93,66 @@ class Message(GenericMessage):
             interfaceid=interfaceid,
             sequencenumber=sequencenumber
         )
-        super().__init__(header, payload=payload)
\ No newline at end of file
+        super().__init__(header, payload=payload)
+
+class ResyncMessage(GenericMessage):
+    def __init__(
+            self, 
+            message_from, 
+            message_to, 
+            payload,
+            nexthop=float('inf'), 
+            interfaceid=float('inf'), 
+            sequencenumber=-1, 
+        ):
+        """
+        Represents a request for a full Hello or TC message, sent when a delta message does not apply to the stored state.
+
+        Args:
+            message_from (int): The identifier of the requesting node.
+            message_to (int): The identifier of the node whose full message is requested.
+            payload (Any): The payload of the message, the requested message type under 'messagetype'.
+            nexthop (float, optional): The next hop for the message. Defaults to float('inf').
+            interfaceid (float, optional): The interface ID. Defaults to float('inf').
+            sequencenumber (int, optional): The sequence number of the message. Defaults to -1.
+        """
+        header = GenericMessageHeader(
+            OLSREventTypes.RESYNC,
+            message_from,
+            message_to,
+            nexthop=nexthop,
+            interfaceid=interfaceid,
+            sequencenumber=sequencenumber
+        )
+        super().__init__(header, payload=payload)
+
+class BroadcastMessage(GenericMessage):
+    def __init__(
+            self, 
+            message_from, 
+            message_to, 
+            payload,
+            nexthop=float('inf'), 
+            interfaceid=float('inf'), 
+            sequencenumber=-1, 
+        ):
+        """
+        Represents application data broadcast over the MPRs, as relayed by one node.
+
+        Args:
+            message_from (int): The identifier of the node that originated the broadcast.
+            message_to (int): The identifier of the receiver, the network layer broadcast address.
+            payload (Any): The payload of the message, the data under 'data' and the node that sent this copy under 'sender'.
+            nexthop (float, optional): The next hop for the message. Defaults to float('inf').
+            interfaceid (float, optional): The interface ID. Defaults to float('inf').
+            sequencenumber (int, optional): The sequence number the originator gave the broadcast. Defaults to -1.
+        """
+        header = GenericMessageHeader(
+            OLSREventTypes.BROADCAST,
+            message_from,
+            message_to,
+            nexthop=nexthop,
+            interfaceid=interfaceid,
+            sequencenumber=sequencenumber
+        )
+        super().__init__(header, payload=payload)
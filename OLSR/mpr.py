@@ -0,0 +1,231 @@
+import heapq
+import threading
+from collections import defaultdict
+
+
+def greedy_mpr(node_id, neighbor_set):
+    """
+    Selects the Multi-Point Relays (MPRs) from scratch with the greedy OLSR heuristic.
+
+    This is the reference implementation the incremental MPRSelector has to agree with.
+
+    Args:
+        node_id (int): The identifier of the selecting node.
+        neighbor_set (dict): One-hop neighbors mapped to {'neighbors': ..., 'willingness': Willingness}.
+
+    Returns:
+        set: A set of selected MPRs.
+    """
+    covered_two_hop_neighbors = set()
+    mpr_set = set()
+
+    # Create a dictionary to keep track of which one-hop neighbors cover which two-hop neighbors
+    coverage_map = {}
+    for one_hop_neighbor, neighbor_data in neighbor_set.items():
+        two_hop_set = set(neighbor_data['neighbors']) - {node_id} - set(neighbor_set.keys())
+        coverage_map[one_hop_neighbor] = {
+            'two_hop_set': two_hop_set,
+            'willingness': neighbor_data['willingness']
+        }
+
+    # While there are still two-hop neighbors that are not covered
+    while any(data['two_hop_set'] for data in coverage_map.values()):
+        # Find the neighbors with the maximum number of unique uncovered two-hop neighbors
+        max_uncovered_count = max(len(data['two_hop_set'] - covered_two_hop_neighbors) for data in coverage_map.values())
+        candidates = [neighbor for neighbor, data in coverage_map.items() if len(data['two_hop_set'] - covered_two_hop_neighbors) == max_uncovered_count]
+
+        # Select the candidate with the highest willingness
+        mpr_candidate = max(candidates, key=lambda x: coverage_map[x]['willingness'].value)
+        mpr_set.add(mpr_candidate)
+
+        # Update the set of covered two-hop neighbors
+        covered_two_hop_neighbors.update(coverage_map[mpr_candidate]['two_hop_set'])
+
+        # Remove covered two-hop neighbors from all sets in the coverage map
+        for neighbor_data in coverage_map.values():
+            neighbor_data['two_hop_set'].difference_update(covered_two_hop_neighbors)
+
+    return mpr_set
+
+
+class MPRSelector:
+    """
+    Incrementally maintains the MPR set of a node as HELLO messages arrive.
+
+    The selector keeps a reverse index from every advertised node to the one-hop neighbors that advertise it.
+    One-hop neighbors and strict two-hop neighbors form a bipartite coverage graph, and the greedy heuristic
+    picks its MPRs independently in every connected component of that graph. A HELLO that changes the
+    advertised neighbors or the willingness of a neighbor therefore only marks the components it touches as
+    dirty, and select() re-runs the greedy selection on those components alone, using a priority queue keyed
+    by (uncovered count, willingness, arrival order). HELLOs that carry no change cost a single comparison.
+
+    The resulting MPR set is identical to greedy_mpr() over the same neighbor set.
+    """
+
+    def __init__(self, node_id, node_set=None):
+        """
+        Args:
+            node_id (int): The identifier of the selecting node.
+            node_set (Callable[[Iterable], Set], optional): Builds the sets of nodes the selector keeps, e.g.
+                NodeIndex.node_set for bitsets. Defaults to None, for frozensets and sets.
+        """
+        self.node_id = node_id
+        self._frozen = node_set or frozenset
+        self._new_set = node_set or set
+        self._advertised = {}
+        self._two_hop = {}
+        self._willingness = {}
+        self._order = {}
+        self._next_order = 0
+        self._advertisers = defaultdict(self._new_set)
+        self._dirty = set()
+        self._mpr_set = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, neighbor):
+        return neighbor in self._advertised
+
+    def __len__(self):
+        return len(self._advertised)
+
+    def update_neighbor(self, neighbor, neighbors, willingness):
+        """
+        Records the HELLO content of a one-hop neighbor.
+
+        Args:
+            neighbor (int): The one-hop neighbor that sent the HELLO.
+            neighbors (Iterable[int]): The neighbors advertised in the HELLO.
+            willingness (Willingness): The willingness advertised in the HELLO.
+
+        Returns:
+            bool: True if the coverage graph changed, False otherwise.
+        """
+        with self._lock:
+            old = self._advertised.get(neighbor)
+            if old is not None and self._willingness[neighbor] == willingness and old == neighbors:
+                return False
+
+            neighbors = self._frozen(neighbors)
+            if old is None:
+                old = self._frozen()
+                self._order[neighbor] = self._next_order
+                self._next_order += 1
+                self._two_hop[neighbor] = self._new_set()
+                # The new neighbor is no longer a two-hop neighbor of the ones advertising it
+                for advertiser in self._advertisers.get(neighbor, ()):
+                    self._two_hop[advertiser].discard(neighbor)
+                    self._dirty.add(advertiser)
+                self._advertised[neighbor] = old
+
+            self._relink(neighbor, old, neighbors)
+            self._advertised[neighbor] = neighbors
+            self._willingness[neighbor] = willingness
+            self._dirty.add(neighbor)
+            return True
+
+    def remove_neighbor(self, neighbor):
+        """
+        Forgets a one-hop neighbor, e.g. when its link expires.
+
+        Args:
+            neighbor (int): The one-hop neighbor to remove.
+
+        Returns:
+            bool: True if the neighbor was known, False otherwise.
+        """
+        with self._lock:
+            old = self._advertised.get(neighbor)
+            if old is None:
+                return False
+            self._relink(neighbor, old, self._frozen())
+            del self._advertised[neighbor]
+            del self._two_hop[neighbor]
+            del self._willingness[neighbor]
+            del self._order[neighbor]
+            self._mpr_set.discard(neighbor)
+            self._dirty.discard(neighbor)
+            # The removed neighbor may now be a two-hop neighbor of the ones advertising it
+            if neighbor != self.node_id:
+                for advertiser in self._advertisers.get(neighbor, ()):
+                    self._two_hop[advertiser].add(neighbor)
+                    self._dirty.add(advertiser)
+            return True
+
+    def select(self):
+        """
+        Repairs the MPR set for the dirty components and returns it.
+
+        Returns:
+            set: A set of selected MPRs.
+        """
+        with self._lock:
+            if self._dirty:
+                component = self._affected_component()
+                self._dirty.clear()
+                self._mpr_set.difference_update(component)
+                self._mpr_set.update(self._greedy(component))
+            return set(self._mpr_set)
+
+    def _is_two_hop(self, node):
+        return node != self.node_id and node not in self._advertised
+
+    def _relink(self, neighbor, old, new):
+        two_hop_set = self._two_hop[neighbor]
+        for node in old - new:
+            advertisers = self._advertisers[node]
+            advertisers.discard(neighbor)
+            if node in two_hop_set:
+                two_hop_set.discard(node)
+                # Dropping the link may split the component, the other side has to be repaired as well
+                self._dirty.update(advertisers)
+            if not advertisers:
+                del self._advertisers[node]
+        for node in new - old:
+            self._advertisers[node].add(neighbor)
+            if self._is_two_hop(node):
+                two_hop_set.add(node)
+
+    def _affected_component(self):
+        """
+        Collects the one-hop neighbors connected to a dirty neighbor in the coverage graph.
+        """
+        component = set()
+        visited_two_hop = self._new_set()
+        stack = [neighbor for neighbor in self._dirty if neighbor in self._advertised]
+        while stack:
+            neighbor = stack.pop()
+            if neighbor in component:
+                continue
+            component.add(neighbor)
+            new_two_hop = self._two_hop[neighbor] - visited_two_hop
+            visited_two_hop |= new_two_hop
+            for node in new_two_hop:
+                stack.extend(self._advertisers[node])
+        return component
+
+    def _greedy(self, component):
+        """
+        Runs the greedy heuristic on a closed set of one-hop neighbors.
+        """
+        uncovered = {neighbor: self._new_set(self._two_hop[neighbor]) for neighbor in component}
+        heap = [
+            (-len(two_hop_set), -self._willingness[neighbor].value, self._order[neighbor], neighbor)
+            for neighbor, two_hop_set in uncovered.items() if two_hop_set
+        ]
+        heapq.heapify(heap)
+
+        mpr_set = set()
+        while heap:
+            count, willingness, order, neighbor = heapq.heappop(heap)
+            remaining = uncovered[neighbor]
+            if len(remaining) != -count:
+                # Stale priority, counts only decrease so push it back with the current one
+                if remaining:
+                    heapq.heappush(heap, (-len(remaining), willingness, order, neighbor))
+                continue
+
+            mpr_set.add(neighbor)
+            for node in list(remaining):
+                for other in self._advertisers[node]:
+                    uncovered[other].discard(node)
+        return mpr_set
@@ -0,0 +1,256 @@
+"""
+Rendering of saved topology states into frames and GIF animations.
+
+The layout of a graph is computed once and reused by every frame drawn on it, and node colors are computed with array
+operations over the links of the graph. Frames are drawn in a pool of worker processes, each of which draws the figure
+of a graph once and then only redraws its nodes, and are mapped to a palette there. They come back in order as palette
+images and are streamed into the GIF encoder without being written to disk.
+"""
+
+import io
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+
+RED, GREEN, BLUE = 0, 1, 2
+PALETTE = np.array([[1.0, 0.0, 0.0, 1.0], [0.0, 0.5, 0.0, 1.0], [0.0, 0.0, 1.0, 1.0]])
+
+# The figure of the graph a process drew last, by graph key
+_figures = {}
+# Numbers the render calls, graph keys are unique across them
+_renders = itertools.count()
+
+
+class Layout:
+    """
+    The positions, links and labels of a graph, in a fixed node order.
+    """
+
+    def __init__(self, G, pos=None):
+        """
+        Args:
+            G (nx.Graph): The graph.
+            pos (dict, optional): The position of each node. Computed with nx.kamada_kawai_layout if None.
+        """
+        self.nodes = list(G.nodes)
+        index = {node: i for i, node in enumerate(self.nodes)}
+        if pos is None:
+            pos = nx.kamada_kawai_layout(G) if len(self.nodes) > 1 else {node: (0.0, 0.0) for node in self.nodes}
+        self.positions = np.array([pos[node] for node in self.nodes], dtype=float).reshape(-1, 2)
+        self.edges = np.array([(index[u], index[v]) for u, v in G.edges], dtype=np.intp).reshape(-1, 2)
+        self.labels = [str(node) for node in self.nodes]
+
+    def colors(self, state):
+        """
+        Colors the nodes of a state: blue for MPRs, green for their neighbors and red for the others.
+
+        Args:
+            state (dict): The MPR status of each node.
+
+        Returns:
+            np.ndarray: The color code of each node.
+        """
+        blue = np.fromiter((bool(state.get(node, False)) for node in self.nodes), dtype=bool, count=len(self.nodes))
+        covered = blue.copy()
+        u, v = self.edges[:, 0], self.edges[:, 1]
+        covered[v[blue[u]]] = True
+        covered[u[blue[v]]] = True
+        return np.where(blue, BLUE, np.where(covered, GREEN, RED)).astype(np.uint8)
+
+
+class _Figure:
+    """
+    The figure of a graph, drawn once. A frame only redraws the nodes over the stored background and lays the stored
+    label pixels over them, then maps its pixels to a palette computed once for the graph.
+    """
+
+    def __init__(self, positions, edges, labels):
+        # Imported here so that worker processes load matplotlib once, and the module can be used without it
+        from matplotlib.collections import LineCollection
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from PIL import Image
+
+        fig = Figure(figsize=(8, 6))
+        self.canvas = FigureCanvasAgg(fig)
+        self.ax = ax = fig.add_subplot()
+        ax.add_collection(LineCollection(positions[edges], colors='black', linewidths=1.0, zorder=1))
+        self.nodes = ax.scatter(positions[:, 0], positions[:, 1], s=300, zorder=2)
+        texts = [ax.text(x, y, label, ha='center', va='center', fontweight='bold', zorder=3)
+                 for (x, y), label in zip(positions, labels)]
+        ax.set_title("Topology Plot")
+        ax.margins(0.1)
+        ax.set_axis_off()
+        fig.tight_layout()
+
+        # Everything but the nodes and the labels
+        self.nodes.set_visible(False)
+        for text in texts:
+            text.set_visible(False)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(fig.bbox)
+
+        # The labels alone, on a transparent background
+        for artist in fig.findobj():
+            if artist is not fig and artist is not ax:
+                artist.set_visible(False)
+        fig.patch.set_visible(False)
+        for text in texts:
+            text.set_visible(True)
+        self.canvas.draw()
+        labels = np.asarray(self.canvas.buffer_rgba()).reshape(-1, 4)
+        self.label_pixels = np.flatnonzero(labels[:, 3])
+        self.label_alpha = labels[self.label_pixels, 3:4] / 255.0
+        self.label_color = labels[self.label_pixels, :3] * self.label_alpha
+        self.nodes.set_visible(True)
+
+        # A palette covering the colors of the nodes, their anti-aliased edges and the labels over them
+        samples = [self.draw(np.full(len(positions), color, dtype=np.uint8)) for color in (RED, GREEN, BLUE)]
+        self.palette = Image.fromarray(np.concatenate(samples)).quantize(256)
+
+    def draw(self, colors):
+        """
+        Args:
+            colors (np.ndarray): The color code of each node.
+
+        Returns:
+            np.ndarray: The RGB pixels of the frame.
+        """
+        self.canvas.restore_region(self.background)
+        self.nodes.set_facecolor(PALETTE[colors])
+        self.ax.draw_artist(self.nodes)
+        buffer = np.asarray(self.canvas.buffer_rgba())
+        frame = buffer[..., :3].copy()
+        pixels = frame.reshape(-1, 3)
+        pixels[self.label_pixels] = pixels[self.label_pixels] * (1 - self.label_alpha) + self.label_color
+        return frame
+
+
+def render_frames(key, positions, edges, labels, frame_colors, image_format='GIF'):
+    """
+    Draws frames of one graph.
+
+    Args:
+        key (Hashable): Identifies the graph, frames of the same graph reuse its figure. The figure is not kept if None.
+        positions (np.ndarray): The position of each node.
+        edges (np.ndarray): The links, as pairs of node positions in the arrays.
+        labels (list[str]): The label of each node.
+        frame_colors (list[np.ndarray]): The color codes of the nodes of each frame.
+        image_format (str, optional): 'GIF' for palette images ready for the GIF encoder, 'PNG' for PNG files.
+            Defaults to 'GIF'.
+
+    Returns:
+        list: The PIL image or the PNG bytes of each frame.
+    """
+    from PIL import Image
+
+    figure = _figures.get(key) if key is not None else None
+    if figure is None:
+        figure = _Figure(positions, edges, labels)
+        if key is not None:
+            _figures.clear()
+            _figures[key] = figure
+    frames = []
+    for colors in frame_colors:
+        image = Image.fromarray(figure.draw(colors))
+        if image_format == 'PNG':
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG', compress_level=1)
+            frames.append(buffer.getvalue())
+        else:
+            frames.append(image.quantize(palette=figure.palette, dither=Image.Dither.NONE))
+    return frames
+
+
+def _chunks(graphs, states, chunk_size):
+    """
+    Groups consecutive frames on the same graph into render tasks of at most chunk_size frames.
+    """
+    render = next(_renders)
+    layouts = {}
+    current, key, layout, frames = None, None, None, []
+    for graph, state in zip(graphs, states):
+        if graph is not current or len(frames) == chunk_size:
+            if frames:
+                yield (key, layout.positions, layout.edges, layout.labels, frames)
+            if graph is not current:
+                current = graph
+                if id(graph) not in layouts:
+                    layouts[id(graph)] = (render, len(layouts)), Layout(graph), graph
+                key, layout, _ = layouts[id(graph)]
+            frames = []
+        frames.append(layout.colors(state))
+    if frames:
+        yield (key, layout.positions, layout.edges, layout.labels, frames)
+
+
+def iter_frames(graphs, states, processes=None, chunk_size=None, image_format='GIF'):
+    """
+    Renders frames in order, in a pool of worker processes.
+
+    Args:
+        graphs (Iterable[nx.Graph]): The graph of each frame. Consecutive frames should share the same graph object
+            while the graph does not change, its layout is computed once.
+        states (Iterable[dict]): The MPR status of each node in each frame.
+        processes (int, optional): The number of worker processes, renders in this process if 1. Defaults to the
+            number of CPUs.
+        chunk_size (int, optional): The number of frames per task. Defaults to 16.
+        image_format (str, optional): 'GIF' or 'PNG', see render_frames. Defaults to 'GIF'.
+
+    Yields:
+        The PIL image or the PNG bytes of each frame.
+    """
+    processes = processes or os.cpu_count() or 1
+    tasks = _chunks(graphs, states, chunk_size or 16)
+    if processes == 1:
+        for task in tasks:
+            yield from render_frames(*task, image_format)
+        return
+    with ProcessPoolExecutor(processes) as pool:
+        # Keep a bounded number of tasks in flight so that frames are not all held in memory
+        pending = []
+        for task in tasks:
+            pending.append(pool.submit(render_frames, *task, image_format))
+            if len(pending) >= 2 * processes:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+
+def write_gif(path, graphs, states, processes=None, duration=500):
+    """
+    Streams frames into a GIF animation.
+
+    Args:
+        path (str): The path of the GIF.
+        graphs (Iterable[nx.Graph]): The graph of each frame.
+        states (Iterable[dict]): The MPR status of each node in each frame.
+        processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        duration (int, optional): The display time of each frame in milliseconds. Defaults to 500.
+
+    Returns:
+        int: The number of frames written.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("You need to have the Python Imaging Library (PIL) installed to create a GIF.")
+
+    written = 0
+
+    def counted():
+        nonlocal written
+        for image in frames:
+            written += 1
+            yield image
+
+    frames = iter_frames(graphs, states, processes)
+    first = next(frames, None)
+    if first is None:
+        return 0
+    written = 1
+    first.save(path, save_all=True, append_images=counted(), optimize=False, duration=duration, loop=0)
+    return written
@@ -0,0 +1,229 @@
+from collections import defaultdict
+
+import networkx as nx
+
+
+def networkx_routing_table(source, known_topology):
+    """
+    Calculates the routing table from scratch by building a NetworkX graph from the known topology.
+
+    This is the reference implementation the incremental RoutingEngine has to agree with.
+
+    Args:
+        source (int): The identifier of the calculating node.
+        known_topology (dict): Nodes mapped to their 'nexthop', 'distance' and 'mpr_selectors' entries.
+
+    Returns:
+        dict: The next hop for each reachable destination.
+    """
+    # Create a new graph from the topology
+    G = nx.Graph()
+
+    # Add edges for each node in the topology
+    for node, node_data in known_topology.items():
+        if 'nexthop' in node_data:
+            G.add_edge(source, node, weight=node_data['distance'])
+
+        if 'mpr_selectors' in node_data:
+            for mpr_selector in node_data['mpr_selectors']:
+                G.add_edge(node, mpr_selector, weight=1)
+
+    if source not in G:
+        return {}
+
+    # Calculate the shortest paths from the current node to all other nodes
+    shortest_paths = nx.single_source_dijkstra_path(G, source)
+
+    # Update the routing table with the next hop for each destination
+    routing_table = {}
+    for dest, path in shortest_paths.items():
+        if dest != source and len(path) > 1:
+            routing_table[dest] = path[1]
+    return routing_table
+
+
+class RoutingEngine:
+    """
+    Incrementally maintains the routing table of a node over a unit-weight topology.
+
+    The engine mirrors the entries of OLSRComponent.known_topology. Every entry contributes a group of edges: the
+    link to the node itself if it is a one-hop neighbor, followed by the links to its MPR selectors. Adjacency is
+    kept in dicts ordered exactly like the adjacency of the NetworkX graph networkx_routing_table() would build,
+    so a breadth-first search breaks ties between equal-cost paths the same way Dijkstra does there, and the
+    resulting routing tables are identical.
+
+    The search records the order in which nodes are visited. When an entry changes, only the nodes whose adjacency
+    changed are marked, and the search resumes from the first of them in visiting order: everything visited before
+    it is provably unaffected. Changes among unreachable nodes do not trigger any search at all.
+    """
+
+    def __init__(self, source, table_factory=dict):
+        """
+        Args:
+            source (int): The identifier of the calculating node.
+            table_factory (Callable[[dict], Mapping], optional): Builds the routing table handed out by compute() from
+                the next hop of each destination. Defaults to dict.
+        """
+        self.source = source
+        self.table_factory = table_factory
+        self._groups = {}
+        self._next_group = 0
+        self._occurrences = defaultdict(set)
+        self._adjacency = defaultdict(dict)
+        self._ordered = {}
+        self._touched = set()
+
+        self._order = [source]
+        self._position = {source: 0}
+        self._distance = {source: 0}
+        self._next_hop = {}
+        self._discovered_before = []
+        self._search(0)
+        self._routing_table = {}
+
+    @property
+    def distances(self):
+        """
+        dict: The hop count of every reachable node, as of the last compute().
+        """
+        return dict(self._distance)
+
+    def update_entry(self, node, node_data):
+        """
+        Mirrors a known_topology entry.
+
+        Args:
+            node (int): The key of the entry.
+            node_data (dict): The entry with optional 'nexthop' and 'mpr_selectors' keys.
+
+        Returns:
+            bool: True if the edges of the entry changed, False otherwise.
+        """
+        edges = self._edges_of(node, node_data)
+
+        group = self._groups.get(node)
+        if group is not None:
+            order, old_edges = group
+            # Equal sets built differently may iterate in different orders, which changes how NetworkX breaks ties,
+            # so the edges are relinked unless their order is the same too
+            if old_edges == edges:
+                return False
+            self._unlink(order, old_edges)
+        else:
+            order = self._next_group
+            self._next_group += 1
+
+        self._groups[node] = (order, edges)
+        self._link(order, edges)
+        return True
+
+    def remove_entry(self, node):
+        """
+        Forgets a known_topology entry.
+
+        Args:
+            node (int): The key of the entry.
+
+        Returns:
+            bool: True if the entry was known, False otherwise.
+        """
+        group = self._groups.pop(node, None)
+        if group is None:
+            return False
+        self._unlink(*group)
+        return True
+
+    def compute(self):
+        """
+        Brings the routing table up to date with the mirrored entries.
+
+        Returns:
+            Mapping: The next hop for each reachable destination. The same object is returned while nothing changes.
+        """
+        if self._touched:
+            start = min((self._position[node] for node in self._touched if node in self._position), default=None)
+            self._touched.clear()
+            if start is not None:
+                self._search(start)
+                self._routing_table = self.table_factory(self._next_hop)
+        return self._routing_table
+
+    def _edges_of(self, node, node_data):
+        edges = []
+        if 'nexthop' in node_data:
+            edges.append((self.source, node))
+        for mpr_selector in node_data.get('mpr_selectors', ()):
+            edges.append((node, mpr_selector))
+        return tuple(edges)
+
+    def _link(self, order, edges):
+        for index, (a, b) in enumerate(edges):
+            occurrences = self._occurrences[frozenset((a, b))]
+            first = min(occurrences) if occurrences else None
+            occurrences.add((order, index))
+            if first is None or (order, index) < first:
+                self._set_first(a, b, (order, index))
+
+    def _unlink(self, order, edges):
+        for index, (a, b) in enumerate(edges):
+            edge = frozenset((a, b))
+            occurrences = self._occurrences[edge]
+            first = min(occurrences)
+            occurrences.discard((order, index))
+            if not occurrences:
+                del self._occurrences[edge]
+                self._adjacency[a].pop(b, None)
+                self._adjacency[b].pop(a, None)
+                self._invalidate(a, b)
+            elif (order, index) == first:
+                self._set_first(a, b, min(occurrences))
+
+    def _set_first(self, a, b, key):
+        # NetworkX keeps neighbors in the order their edge was first added
+        self._adjacency[a][b] = key
+        self._adjacency[b][a] = key
+        self._invalidate(a, b)
+
+    def _invalidate(self, a, b):
+        self._touched.add(a)
+        self._touched.add(b)
+        self._ordered.pop(a, None)
+        self._ordered.pop(b, None)
+
+    def _neighbors_of(self, node):
+        ordered = self._ordered.get(node)
+        if ordered is None:
+            adjacency = self._adjacency.get(node, {})
+            ordered = sorted(adjacency, key=adjacency.__getitem__)
+            self._ordered[node] = ordered
+        return ordered
+
+    def _search(self, start):
+        """
+        Resumes the breadth-first search right before the node at position start is expanded.
+        """
+        if start < len(self._discovered_before):
+            cut = self._discovered_before[start]
+            for node in self._order[cut:]:
+                del self._position[node]
+                del self._distance[node]
+                del self._next_hop[node]
+            del self._order[cut:]
+            del self._discovered_before[start:]
+
+        order = self._order
+        position = self._position
+        distance = self._distance
+        next_hop = self._next_hop
+        index = start
+        while index < len(order):
+            node = order[index]
+            self._discovered_before.append(len(order))
+            hop = distance[node] + 1
+            for neighbor in self._neighbors_of(node):
+                if neighbor not in position:
+                    position[neighbor] = len(order)
+                    order.append(neighbor)
+                    distance[neighbor] = hop
+                    next_hop[neighbor] = neighbor if node == self.source else next_hop[node]
+            index += 1
@@ -0,0 +1,273 @@
+"""
+Schedulers that drive the timers of OLSR components, in real time or in virtual time.
+
+OLSRComponent takes its clock and timers from the scheduler of its topology. The RealTimeScheduler, used when the
+topology has none, keeps the wall-clock AHCTimers and threads of the Ad Hoc Computing framework. The
+VirtualTimeScheduler is a discrete-event scheduler: events are kept in a heap ordered by their virtual time and the
+order in which they were scheduled, and running the scheduler jumps from one event to the next. SimulatedTopology
+routes the events of all components and channels through it, so a run takes only as long as its events take to
+process and, for a given seed, always produces the same result.
+"""
+
+import heapq
+import random
+import threading
+import time
+
+from adhoccomputing.Experimentation.Topology import Topology
+from adhoccomputing.Generics import AHCTimer, logger
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+
+class RealTimeScheduler:
+    """
+    Runs callbacks on wall-clock timers.
+    """
+
+    def clock(self):
+        """
+        Returns:
+            float: The current time in seconds.
+        """
+        return time.monotonic()
+
+    def call_later(self, delay, callback, *args):
+        """
+        Calls a callback once after a delay.
+
+        Args:
+            delay (float): Seconds until the call.
+            callback (Callable): The function to call.
+            *args: The arguments of the call.
+
+        Returns:
+            threading.Timer: The started timer, which can be cancelled.
+        """
+        timer = threading.Timer(delay, callback, args=args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def call_every(self, interval, callback):
+        """
+        Calls a callback every interval, starting one interval from now.
+
+        Args:
+            interval (float): Seconds between two calls.
+            callback (Callable[[], Any]): The function to call.
+
+        Returns:
+            AHCTimer: The started timer.
+        """
+        timer = AHCTimer(interval, callback)
+        timer.start()
+        return timer
+
+
+class ScheduledCall:
+    """
+    A call scheduled on a VirtualTimeScheduler.
+    """
+
+    def __init__(self, moment, callback, args, interval=None):
+        self.moment = moment
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Cancels the call, and all its repetitions if it is periodic.
+        """
+        self.cancelled = True
+
+
+class VirtualTimeScheduler:
+    """
+    A discrete-event scheduler with a virtual clock.
+
+    Calls due at the same moment run in the order they were scheduled, which together with the seeded random
+    number generator makes every run reproducible.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Args:
+            seed (int, optional): The seed of the random number generator of the run. Defaults to None.
+        """
+        self.now = 0.0
+        self.random = random.Random(seed)
+        self._queue = []
+        self._counter = 0
+        self.processed = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def clock(self):
+        """
+        Returns:
+            float: The current virtual time in seconds.
+        """
+        return self.now
+
+    def _push(self, call):
+        heapq.heappush(self._queue, (call.moment, self._counter, call))
+        self._counter += 1
+
+    def call_later(self, delay, callback, *args):
+        """
+        Calls a callback once after a delay of virtual time.
+
+        Args:
+            delay (float): Seconds until the call.
+            callback (Callable): The function to call.
+            *args: The arguments of the call.
+
+        Returns:
+            ScheduledCall: The scheduled call, which can be cancelled.
+        """
+        call = ScheduledCall(self.now + delay, callback, args)
+        self._push(call)
+        return call
+
+    def call_every(self, interval, callback):
+        """
+        Calls a callback every interval of virtual time, starting one interval from now.
+
+        Args:
+            interval (float): Seconds between two calls.
+            callback (Callable[[], Any]): The function to call.
+
+        Returns:
+            ScheduledCall: The scheduled call, which can be cancelled.
+        """
+        call = ScheduledCall(self.now + interval, callback, (), interval=interval)
+        self._push(call)
+        return call
+
+    def run(self, until=None):
+        """
+        Runs the scheduled calls in order, advancing the virtual clock to each of them.
+
+        Args:
+            until (float, optional): Stop after the calls due at this moment, the clock is then set to it. Runs until
+                no call is left if None. Defaults to None.
+
+        Returns:
+            int: The number of calls made.
+        """
+        processed = 0
+        while self._queue and (until is None or self._queue[0][0] <= until):
+            moment, _, call = heapq.heappop(self._queue)
+            if call.cancelled:
+                continue
+            self.now = moment
+            if call.interval is not None:
+                call.moment = moment + call.interval
+                self._push(call)
+            call.callback(*call.args)
+            processed += 1
+        if until is not None:
+            self.now = max(self.now, until)
+        self.processed += processed
+        return processed
+
+    def run_for(self, duration):
+        """
+        Runs the calls due within a duration from now.
+
+        Args:
+            duration (float): Seconds of virtual time to run.
+
+        Returns:
+            int: The number of calls made.
+        """
+        return self.run(self.now + duration)
+
+
+class SimulatedTopology(Topology):
+    """
+    A topology whose components exchange events through a VirtualTimeScheduler instead of their worker threads.
+
+    Every event a component would put on its input queue is scheduled instead, after channel_delay seconds if the
+    component is a channel and right away otherwise, and handled when the scheduler reaches it. Components find
+    the scheduler as the scheduler attribute of their topology.
+    """
+
+    def __init__(self, name=None, seed=None, channel_delay=0.001) -> None:
+        """
+        Args:
+            name (str, optional): The name of the topology. Defaults to None.
+            seed (int, optional): The seed of the run. Defaults to None.
+            channel_delay (float, optional): The time a message takes to cross a channel in seconds. Defaults to 0.001.
+        """
+        super().__init__(name)
+        # Topology keeps its nodes and channels in class attributes, a simulation needs its own
+        self.nodes = {}
+        self.channels = {}
+        self.scheduler = VirtualTimeScheduler(seed)
+        self.channel_delay = channel_delay
+
+    @property
+    def now(self):
+        """
+        float: The current virtual time in seconds.
+        """
+        return self.scheduler.now
+
+    def construct_from_graph(self, G, nodetype, channeltype, context=None):
+        super().construct_from_graph(G, nodetype, channeltype, context)
+        for component in list(self.nodes.values()) + list(self.channels.values()):
+            self.attach(component)
+
+    def attach(self, component):
+        """
+        Routes the events of a component and of its subcomponents through the scheduler.
+
+        Args:
+            component (GenericModel): The component.
+        """
+        delay = self.channel_delay if isinstance(component, GenericChannel) else 0
+
+        def trigger_event(eventobj):
+            self.scheduler.call_later(delay, self.dispatch, component, eventobj)
+
+        component.trigger_event = trigger_event
+        for subcomponent in component.components:
+            self.attach(subcomponent)
+
+    @staticmethod
+    def dispatch(component, eventobj):
+        """
+        Handles an event on a component, as the worker thread of the component would.
+
+        Args:
+            component (GenericModel): The component.
+            eventobj (Event): The event.
+        """
+        if component.terminated:
+            return
+        if eventobj.event in component.eventhandlers:
+            component.on_pre_event(eventobj)
+            component.eventhandlers[eventobj.event](eventobj=eventobj)
+        else:
+            logger.error(f"{component.componentname}.{component.componentinstancenumber} Event Handler: {eventobj.event} is not implemented")
+
+    def run(self, duration):
+        """
+        Runs the simulation for a duration of virtual time.
+
+        Args:
+            duration (float): Seconds of virtual time to run.
+
+        Returns:
+            int: The number of events handled.
+        """
+        return self.scheduler.run_for(duration)
+
+    def exit(self):
+        super().exit()
+        # Deliver the exit events, and everything still due now
+        self.scheduler.run(self.scheduler.now)
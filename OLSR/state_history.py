@@ -0,0 +1,226 @@
+"""
+Compact, append-only history of the MPR states of a topology.
+
+Every saved state refers to a version of the graph, which is copied only when the graph changes, and stores the
+nodes whose MPR status changed since the previous state in a flat array of (node index, status) pairs. The full
+statuses are kept as a bitset every checkpoint_every states, so any state is rebuilt from the closest checkpoint
+before it by applying at most checkpoint_every deltas. Full states are only rebuilt when they are read.
+
+A history can be bounded to a capacity, it then works as a ring buffer: once it is full, the oldest checkpoint_every
+states are dropped together with their checkpoint.
+"""
+
+from array import array
+from collections.abc import Sequence
+
+from OLSR.versioned_graph import graph_version
+
+
+class _Column(Sequence):
+    """
+    A read-only sequence view of one column of a StateHistory.
+    """
+
+    def __init__(self, history, get, iterate=None):
+        self._history = history
+        self._get = get
+        self._iterate = iterate
+
+    def __len__(self):
+        return len(self._history)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("state index out of range")
+        return self._get(index)
+
+    def __iter__(self):
+        if self._iterate is not None:
+            return self._iterate()
+        return (self._get(i) for i in range(len(self)))
+
+
+class StateHistory:
+    """
+    Records the MPR status of every node of a topology at each saved state.
+
+    Attributes:
+        states (Sequence[dict]): The MPR status of each node at each state, rebuilt when read.
+        graphs (Sequence[nx.Graph]): The graph at each state. States saved on the same graph share one copy.
+        steps (Sequence[int]): The step of each state.
+        dropped (int): The number of oldest states dropped to stay within the capacity.
+    """
+
+    def __init__(self, checkpoint_every=64, capacity=None):
+        """
+        Args:
+            checkpoint_every (int, optional): Every how many states the full statuses are stored. Defaults to 64.
+            capacity (int, optional): The maximum number of states kept, unbounded if None. Defaults to None.
+        """
+        if capacity is not None and capacity < checkpoint_every:
+            raise ValueError("capacity must be at least checkpoint_every")
+        self.checkpoint_every = checkpoint_every
+        self.capacity = capacity
+        self.dropped = 0
+        self._nodes = []
+        self._index = {}
+        self._pending = {}
+        self._bits = 0
+        self._checkpoints = []
+        # Deltas of state i are _deltas[_offsets[i] - _delta_base:_offsets[i + 1] - _delta_base], each entry is
+        # node index << 1 | status
+        self._deltas = array('Q')
+        self._delta_base = 0
+        self._offsets = array('Q', [0])
+        # Steps are never negative, -1 stands for None
+        self._steps = array('q')
+        self._graph_versions = []
+        self._graph_base = 0
+        self._graph_of = array('Q')
+        self._graph_version = None
+
+        self.states = _Column(self, self.state, self.iter_states)
+        self.graphs = _Column(self, self.graph)
+        self.steps = _Column(self, self.step)
+
+    def __len__(self):
+        return len(self._steps)
+
+    def _intern(self, node):
+        index = self._index.get(node)
+        if index is None:
+            index = self._index[node] = len(self._nodes)
+            self._nodes.append(node)
+        return index
+
+    def update(self, changes):
+        """
+        Records status changes of nodes since the last saved state, without saving a state.
+
+        Args:
+            changes (dict): The new MPR status of each node that changed.
+        """
+        self._pending.update(changes)
+
+    def append(self, graph, step=None, nodes=(), copy=True, version=None):
+        """
+        Saves the current state.
+
+        Args:
+            graph (nx.Graph): The graph of the topology. It is copied only if it changed since the previous state,
+                i.e. its graph_version differs: it is another graph or its nodes or links changed.
+            step (int, optional): The step of the state. Defaults to None.
+            nodes (Iterable, optional): The nodes of the topology, so that nodes that never changed are part of the
+                rebuilt states. Defaults to ().
+            copy (bool, optional): Whether to copy a changed graph, False if the caller already made a copy that is
+                not modified afterwards. Defaults to True.
+            version (Hashable, optional): The graph_version of the graph, if the caller already has it. Defaults to
+                None, it is then computed, in O(1) for a VersionedGraph and O(nodes + links) for other graphs.
+        """
+        if self.capacity is not None and len(self) >= self.capacity:
+            self._drop_oldest()
+        if version is None:
+            version = graph_version(graph)
+        if version != self._graph_version:
+            self._graph_version = version
+            self._graph_versions.append(graph.copy() if copy else graph)
+            for node in nodes:
+                self._intern(node)
+        self._graph_of.append(self._graph_base + len(self._graph_versions) - 1)
+
+        bits = self._bits
+        for node, selected_as_mpr in self._pending.items():
+            index = self._intern(node)
+            if ((bits >> index) & 1) != bool(selected_as_mpr):
+                bits ^= 1 << index
+                self._deltas.append(index << 1 | bool(selected_as_mpr))
+        self._pending.clear()
+        self._bits = bits
+        self._offsets.append(self._delta_base + len(self._deltas))
+        if len(self._steps) % self.checkpoint_every == 0:
+            self._checkpoints.append(bits)
+        self._steps.append(-1 if step is None else step)
+
+    def _drop_oldest(self):
+        """
+        Drops the oldest checkpoint_every states, the checkpoint after them becomes the first one.
+        """
+        count = self.checkpoint_every
+        del self._checkpoints[0]
+        del self._deltas[:self._offsets[count] - self._delta_base]
+        self._delta_base = self._offsets[count]
+        del self._offsets[:count]
+        del self._steps[:count]
+        del self._graph_of[:count]
+        unused = self._graph_of[0] - self._graph_base
+        del self._graph_versions[:unused]
+        self._graph_base += unused
+        self.dropped += count
+
+    def _apply(self, bits, index):
+        base = self._delta_base
+        for entry in self._deltas[self._offsets[index] - base:self._offsets[index + 1] - base]:
+            if entry & 1:
+                bits |= 1 << (entry >> 1)
+            else:
+                bits &= ~(1 << (entry >> 1))
+        return bits
+
+    def _as_dict(self, bits):
+        return {node: bool((bits >> index) & 1) for index, node in enumerate(self._nodes)}
+
+    def state(self, index):
+        """
+        Rebuilds a saved state.
+
+        Args:
+            index (int): The index of the state.
+
+        Returns:
+            dict: The MPR status of each node.
+        """
+        checkpoint = index // self.checkpoint_every
+        bits = self._checkpoints[checkpoint]
+        for i in range(checkpoint * self.checkpoint_every + 1, index + 1):
+            bits = self._apply(bits, i)
+        return self._as_dict(bits)
+
+    def iter_states(self):
+        """
+        Rebuilds the saved states in order, applying each delta once.
+
+        Yields:
+            dict: The MPR status of each node.
+        """
+        if not len(self):
+            return
+        bits = self._checkpoints[0]
+        yield self._as_dict(bits)
+        for i in range(1, len(self)):
+            bits = self._apply(bits, i)
+            yield self._as_dict(bits)
+
+    def graph(self, index):
+        """
+        Args:
+            index (int): The index of the state.
+
+        Returns:
+            nx.Graph: The graph of the state.
+        """
+        return self._graph_versions[self._graph_of[index] - self._graph_base]
+
+    def step(self, index):
+        """
+        Args:
+            index (int): The index of the state.
+
+        Returns:
+            int: The step of the state.
+        """
+        step = self._steps[index]
+        return None if step == -1 else step
@@ -4,11 +4,11 @@ sys.path.insert(0, '/root/code')
 
 from adhoccomputing.GenericModel import GenericModel
 from adhoccomputing.Generics import *
-from adhoccomputing.Experimentation.Topology import Topology
 from adhoccomputing.Generics import Event
 from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
 from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
-from OLSR.OLSR import OLSRComponent, state_saver
+from OLSR.OLSR import OLSRComponent
+from OLSR.simulation import SimulatedTopology
 from helpers import plot_topology
 
 import networkx as nx
@@ -54,13 +54,14 @@ class AdHocNode(GenericModel):
         eventobj.event = EventTypes.MFRB
         self.send_up(eventobj)
 
-    def random_send_message(self):
+    def random_send_message(self, rng=None):
         # Randomly select a node to send the message
         import random
         from OLSR.message_types import Message
 
+        rng = rng or random
         while True:
-            node_number = random.choice(list(self.routing_table.keys())) # Because some nodes may be disconnected.
+            node_number = rng.choice(list(self.routing_table.keys())) # Because some nodes may be disconnected.
             if node_number != self.componentinstancenumber:
                 break
 
@@ -73,9 +74,8 @@ class AdHocNode(GenericModel):
         )
         self.olsr.trigger_event(Event(self, EventTypes.MFRB, message))
 
-def main(number_of_nodes=10):
+def main(number_of_nodes=10, seed=42):
     import os
-    import random
     # Remove plots folder if it exists
     if os.path.exists("plots"):
         import shutil
@@ -83,26 +83,29 @@ def main(number_of_nodes=10):
 
     number_of_hops.clear()
 
-    topo = Topology()
+    # Runs in virtual time, so the run takes as long as its events take to process and is the same for a given seed
+    topo = SimulatedTopology(seed=seed)
+    rng = topo.scheduler.random
 
     G = nx.random_geometric_graph(number_of_nodes, 0.4, seed=42)
 
     topo.construct_from_graph(G, AdHocNode, GenericChannel)
+    # The GIF stops at the first state in which every node is covered by an MPR
+    topo.state_saver.detect_convergence = True
 
     plot_topology(topo)
     topo.start()
-    time.sleep(10) # Wait for the network to stabilize
+    topo.run(10) # Wait for the network to stabilize
     
     for _ in range(1000):
         # Pick a random node to send a message
-        node = random.choice(topo.nodes)
-        t = AHCTimer(1, node.random_send_message)
-        t.start()        
+        node = rng.choice(topo.nodes)
+        topo.scheduler.call_later(1, node.random_send_message, rng)
 
-    time.sleep(20)
+    topo.run(20)
     topo.exit()
     logger.info(f"Avg number of hops: {sum(number_of_hops) / len(number_of_hops)}")
-    state_saver.produce_gif()
+    topo.state_saver.produce_gif()
 
     return sum(number_of_hops) / len(number_of_hops)
     
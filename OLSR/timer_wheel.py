@@ -0,0 +1,94 @@
+import math
+import time
+
+
+class TimerWheel:
+    """
+    A hashed timer wheel that expires keys after their holding time.
+
+    Time is divided into ticks, and a key whose deadline falls on tick t is kept in slot t % slots. Scheduling,
+    refreshing and cancelling a key are O(1) dict operations. Advancing the wheel only visits the slots of the
+    ticks that elapsed, and keys whose deadline lies more than one revolution ahead simply stay in their slot until
+    their tick comes around again.
+    """
+
+    def __init__(self, tick=0.5, slots=64, clock=time.monotonic):
+        """
+        Args:
+            tick (float, optional): The resolution of the wheel in seconds. Defaults to 0.5.
+            slots (int, optional): The number of slots. Defaults to 64.
+            clock (Callable[[], float], optional): The time source. Defaults to time.monotonic.
+        """
+        self.tick = tick
+        self.clock = clock
+        self._slots = [{} for _ in range(slots)]
+        self._slot_of = {}
+        self._current_tick = self._tick_of(clock())
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def __contains__(self, key):
+        return key in self._slot_of
+
+    def _tick_of(self, moment):
+        return math.floor(moment / self.tick)
+
+    def schedule(self, key, holding_time):
+        """
+        Schedules a key to expire after the holding time, replacing its previous deadline if any.
+
+        Args:
+            key (Hashable): The key to expire.
+            holding_time (float): Seconds from now until the key expires.
+        """
+        deadline = max(math.ceil((self.clock() + holding_time) / self.tick), self._current_tick + 1)
+        index = deadline % len(self._slots)
+        previous = self._slot_of.get(key)
+        if previous is not None and previous != index:
+            del self._slots[previous][key]
+        self._slots[index][key] = deadline
+        self._slot_of[key] = index
+
+    def cancel(self, key):
+        """
+        Cancels the expiry of a key.
+
+        Args:
+            key (Hashable): The key to cancel.
+
+        Returns:
+            bool: True if the key was scheduled, False otherwise.
+        """
+        index = self._slot_of.pop(key, None)
+        if index is None:
+            return False
+        del self._slots[index][key]
+        return True
+
+    def advance(self):
+        """
+        Moves the wheel to the current time.
+
+        Returns:
+            list: The keys that expired, in order of their deadlines.
+        """
+        now = self._tick_of(self.clock())
+        if now <= self._current_tick:
+            return []
+
+        # After a full revolution every slot has been passed, visit each of them once
+        first = max(self._current_tick + 1, now - len(self._slots) + 1)
+        expired = []
+        for tick in range(first, now + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            due = [(deadline, key) for key, deadline in slot.items() if deadline <= now]
+            for _, key in due:
+                del slot[key]
+                del self._slot_of[key]
+            expired.extend(due)
+        expired.sort(key=lambda item: item[0])
+        self._current_tick = now
+        return [key for _, key in expired]
@@ -0,0 +1,85 @@
+"""
+Graphs that count their changes, so that caches built on a graph can tell cheaply whether it changed.
+
+A VersionedGraph takes a new version whenever a node or a link is added or removed. Versions are drawn from one
+counter shared by all graphs, so no two graphs, nor two states of a graph, ever have the same version. graph_version
+returns it in O(1), and falls back to comparing the identity, nodes and links of graphs that do not count their
+changes. Attribute changes do not change the version.
+"""
+
+from itertools import count
+
+import networkx as nx
+
+_versions = count()
+
+
+class VersionedGraph(nx.Graph):
+    """
+    An undirected graph that takes a new version at every change of its nodes or links.
+
+    Attributes:
+        version (int): The version of the current nodes and links.
+    """
+
+    def __init__(self, incoming_graph_data=None, **attr):
+        self.version = next(_versions)
+        super().__init__(incoming_graph_data, **attr)
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self.version = next(_versions)
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        super().add_nodes_from(nodes_for_adding, **attr)
+        self.version = next(_versions)
+
+    def remove_node(self, n):
+        super().remove_node(n)
+        self.version = next(_versions)
+
+    def remove_nodes_from(self, nodes):
+        super().remove_nodes_from(nodes)
+        self.version = next(_versions)
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self.version = next(_versions)
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        super().add_edges_from(ebunch_to_add, **attr)
+        self.version = next(_versions)
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self.version = next(_versions)
+
+    def remove_edges_from(self, ebunch):
+        super().remove_edges_from(ebunch)
+        self.version = next(_versions)
+
+    def clear(self):
+        super().clear()
+        self.version = next(_versions)
+
+    def clear_edges(self):
+        super().clear_edges()
+        self.version = next(_versions)
+
+
+def graph_version(G):
+    """
+    Returns a key of the current nodes and links of a graph: the key changes whenever they do.
+
+    Args:
+        G (nx.Graph): The graph.
+
+    Returns:
+        Hashable: The version of a VersionedGraph, in O(1). The identity, nodes and links of any other graph, in
+            O(nodes + links).
+    """
+    version = getattr(G, 'version', None)
+    if version is not None:
+        return version
+    # A graph that does not count its changes is compared by its identity, nodes and links
+    return id(G), frozenset(G.nodes), frozenset(frozenset(edge) for edge in G.edges)
@@ -0,0 +1,314 @@
+"""
+Compact binary encoding of HELLO and TC messages.
+
+A packed message starts with a small header followed by the payload of the message:
+
+- message type (1 byte), 1 for HELLO and 2 for TC
+- originator, destination, next hop and interface id as varints; destinations reserve 0 for float('inf'),
+  1 for LINKLAYERBROADCAST and 2 for NETWORKLAYERBROADCAST, node n is stored as n + 3
+- sequence number as a zigzag varint
+- payload flags (1 byte) telling which optional fields follow and how the node list is encoded
+- willingness (1 byte) for HELLO
+- the version as a varint when present, the HELLO version or the ANSN of a TC
+- for delta messages, the version the delta applies to as a varint
+- validity in milliseconds as a varint when present
+- the node list (neighbors for HELLO, MPR selectors for TC), either as sorted varint deltas or as a bitmap
+  starting at the smallest id, whichever is shorter; delta messages carry the added nodes here, followed by the
+  removed nodes in the same encoding
+"""
+
+from adhoccomputing.GenericModel import GenericMessage, GenericMessageHeader
+from adhoccomputing.Generics import MessageDestinationIdentifiers
+
+from OLSR.enums import OLSREventTypes, Willingness
+from OLSR.message_types import HelloMessage, TCMessage
+
+_MESSAGE_TYPES = {OLSREventTypes.HELLO: 1, OLSREventTypes.TC: 2}
+_MESSAGE_TYPES_BY_CODE = {code: messagetype for messagetype, code in _MESSAGE_TYPES.items()}
+
+_DESTINATIONS = {
+    MessageDestinationIdentifiers.LINKLAYERBROADCAST: 1,
+    MessageDestinationIdentifiers.NETWORKLAYERBROADCAST: 2,
+}
+_DESTINATIONS_BY_CODE = {code: destination for destination, code in _DESTINATIONS.items()}
+_FIRST_NODE_CODE = 3
+
+_HAS_VALIDITY = 0x01
+_BITMAP = 0x02
+_HAS_VERSION = 0x04
+_DELTA = 0x08
+_BITMAP_REMOVED = 0x10
+
+_SET_KEYS = {OLSREventTypes.HELLO: 'neighbors', OLSREventTypes.TC: 'mpr_selectors'}
+_VERSION_KEYS = {OLSREventTypes.HELLO: 'version', OLSREventTypes.TC: 'ansn'}
+
+
+class WireFormatError(Exception):
+    pass
+
+
+def _write_varint(out, value):
+    if value < 0:
+        raise WireFormatError(f"Cannot encode negative value {value} as a varint")
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[offset]
+        except IndexError:
+            raise WireFormatError("Truncated varint")
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _write_destination(out, destination):
+    if destination == float('inf'):
+        _write_varint(out, 0)
+    elif destination in _DESTINATIONS:
+        _write_varint(out, _DESTINATIONS[destination])
+    elif isinstance(destination, int):
+        _write_varint(out, destination + _FIRST_NODE_CODE)
+    else:
+        raise WireFormatError(f"Cannot encode destination {destination}")
+
+
+def _read_destination(data, offset):
+    code, offset = _read_varint(data, offset)
+    if code == 0:
+        return float('inf'), offset
+    if code in _DESTINATIONS_BY_CODE:
+        return _DESTINATIONS_BY_CODE[code], offset
+    return code - _FIRST_NODE_CODE, offset
+
+
+def _encode_nodes(nodes):
+    """
+    Encodes a set of node ids, returning the flags and the bytes of the shorter of both encodings.
+    """
+    nodes = sorted(nodes)
+    deltas = bytearray()
+    _write_varint(deltas, len(nodes))
+    previous = 0
+    for node in nodes:
+        if not isinstance(node, int) or node < 0:
+            raise WireFormatError(f"Cannot encode node id {node}")
+        _write_varint(deltas, node - previous)
+        previous = node
+    if not nodes:
+        return 0, deltas
+
+    bitmap = bytearray()
+    _write_varint(bitmap, nodes[0])
+    span = nodes[-1] - nodes[0] + 1
+    _write_varint(bitmap, span)
+    if len(bitmap) + (span + 7) // 8 >= len(deltas):
+        return 0, deltas
+    bits = 0
+    for node in nodes:
+        bits |= 1 << (node - nodes[0])
+    bitmap.extend(bits.to_bytes((span + 7) // 8, 'little'))
+    return _BITMAP, bitmap
+
+
+def _decode_nodes(data, offset, flags):
+    if flags & _BITMAP:
+        base, offset = _read_varint(data, offset)
+        span, offset = _read_varint(data, offset)
+        end = offset + (span + 7) // 8
+        if end > len(data):
+            raise WireFormatError("Truncated bitmap")
+        bits = int.from_bytes(data[offset:end], 'little')
+        nodes = set()
+        while bits:
+            lowest = bits & -bits
+            nodes.add(base + lowest.bit_length() - 1)
+            bits ^= lowest
+        return frozenset(nodes), end
+
+    count, offset = _read_varint(data, offset)
+    nodes = set()
+    node = 0
+    for _ in range(count):
+        delta, offset = _read_varint(data, offset)
+        node += delta
+        nodes.add(node)
+    return frozenset(nodes), offset
+
+
+def _encode_header(out, header):
+    if header.messagetype not in _MESSAGE_TYPES:
+        raise WireFormatError(f"Cannot encode message type {header.messagetype}")
+    out.append(_MESSAGE_TYPES[header.messagetype])
+    _write_varint(out, header.messagefrom)
+    _write_destination(out, header.messageto)
+    _write_destination(out, header.nexthop)
+    _write_destination(out, header.interfaceid)
+    sequencenumber = header.sequencenumber
+    _write_varint(out, 2 * sequencenumber if sequencenumber >= 0 else -2 * sequencenumber - 1)
+
+
+def _decode_header(data):
+    if not data or data[0] not in _MESSAGE_TYPES_BY_CODE:
+        raise WireFormatError("Unknown message type")
+    messagetype = _MESSAGE_TYPES_BY_CODE[data[0]]
+    messagefrom, offset = _read_varint(data, 1)
+    messageto, offset = _read_destination(data, offset)
+    nexthop, offset = _read_destination(data, offset)
+    interfaceid, offset = _read_destination(data, offset)
+    zigzag, offset = _read_varint(data, offset)
+    sequencenumber = zigzag // 2 if zigzag % 2 == 0 else -(zigzag + 1) // 2
+    header = GenericMessageHeader(
+        messagetype,
+        messagefrom,
+        messageto,
+        nexthop=nexthop,
+        interfaceid=interfaceid,
+        sequencenumber=sequencenumber
+    )
+    return header, offset
+
+
+def encode(message):
+    """
+    Encodes a HELLO or TC message.
+
+    Args:
+        message (HelloMessage | TCMessage): The message to encode.
+
+    Returns:
+        bytes: The packed message.
+    """
+    out = bytearray()
+    _encode_header(out, message.header)
+    payload = message.payload
+    messagetype = message.header.messagetype
+    version_key = _VERSION_KEYS[messagetype]
+    if _SET_KEYS[messagetype] in payload:
+        flags, nodes = _encode_nodes(payload[_SET_KEYS[messagetype]])
+    else:
+        flags, nodes = _encode_nodes(payload['added'])
+        removed_flags, removed = _encode_nodes(payload['removed'])
+        flags |= _DELTA | (_BITMAP_REMOVED if removed_flags else 0)
+        nodes.extend(removed)
+    if payload.get('validity') is not None:
+        flags |= _HAS_VALIDITY
+    if payload.get(version_key) is not None:
+        flags |= _HAS_VERSION
+    elif flags & _DELTA:
+        raise WireFormatError("Cannot encode a delta message without a version")
+    out.append(flags)
+
+    if messagetype == OLSREventTypes.HELLO:
+        out.append(payload['willingness'].value)
+    if flags & _HAS_VERSION:
+        _write_varint(out, payload[version_key])
+    if flags & _DELTA:
+        _write_varint(out, payload['base_' + version_key])
+    if flags & _HAS_VALIDITY:
+        _write_varint(out, round(payload['validity'] * 1000))
+    out.extend(nodes)
+    return bytes(out)
+
+
+def decode(data):
+    """
+    Decodes a packed HELLO or TC message.
+
+    Args:
+        data (bytes): The packed message.
+
+    Returns:
+        HelloMessage | TCMessage: The decoded message.
+    """
+    header, offset = _decode_header(data)
+    if offset >= len(data):
+        raise WireFormatError("Truncated payload")
+    flags = data[offset]
+    offset += 1
+
+    payload = {}
+    version_key = _VERSION_KEYS[header.messagetype]
+    if header.messagetype == OLSREventTypes.HELLO:
+        if offset >= len(data):
+            raise WireFormatError("Truncated payload")
+        willingness = Willingness(data[offset])
+        offset += 1
+    if flags & _HAS_VERSION:
+        payload[version_key], offset = _read_varint(data, offset)
+    if flags & _DELTA:
+        payload['base_' + version_key], offset = _read_varint(data, offset)
+    if flags & _HAS_VALIDITY:
+        validity, offset = _read_varint(data, offset)
+        payload['validity'] = validity / 1000
+    nodes, offset = _decode_nodes(data, offset, flags)
+    if flags & _DELTA:
+        removed, offset = _decode_nodes(data, offset, _BITMAP if flags & _BITMAP_REMOVED else 0)
+        nodes = {'added': nodes, 'removed': removed}
+    else:
+        nodes = {_SET_KEYS[header.messagetype]: nodes}
+
+    if header.messagetype == OLSREventTypes.HELLO:
+        message_class = HelloMessage
+        payload = {**nodes, 'willingness': willingness, **payload}
+    else:
+        message_class = TCMessage
+        payload = {**nodes, **payload}
+    return message_class(
+        message_from=header.messagefrom,
+        message_to=header.messageto,
+        nexthop=header.nexthop,
+        interfaceid=header.interfaceid,
+        sequencenumber=header.sequencenumber,
+        payload=payload
+    )
+
+
+class PackedMessage(GenericMessage):
+    """
+    A HELLO or TC message carried in its packed encoding.
+
+    The header is kept decoded so that the link layer can address the message, the payload is the packed bytes.
+    """
+
+    def __init__(self, data, header=None):
+        """
+        Args:
+            data (bytes): The packed message.
+            header (GenericMessageHeader, optional): The already decoded header. Decoded from data if None.
+        """
+        if header is None:
+            header, _ = _decode_header(data)
+        super().__init__(header, payload=data)
+
+    @classmethod
+    def pack(cls, message):
+        """
+        Packs a HELLO or TC message.
+
+        Args:
+            message (HelloMessage | TCMessage): The message to pack.
+
+        Returns:
+            PackedMessage: The packed message.
+        """
+        return cls(encode(message), header=message.header)
+
+    def unpack(self):
+        """
+        Returns:
+            HelloMessage | TCMessage: The decoded message.
+        """
+        return decode(self.payload)
+
+    def __len__(self):
+        return len(self.payload)
@@ -7,7 +7,8 @@ from collections import defaultdict
 from adhoccomputing.Experimentation.Topology import Topology
 from adhoccomputing.GenericModel import GenericModel, GenericMessageHeader,  GenericMessage
 from adhoccomputing.Generics import *
-from Snapshot.Snapshot import SnapshotComponentModel, SnapshotMessageTypes, SnapshotEventTypes
+from Snapshot.Snapshot import SnapshotComponentModel, SnapshotMessageTypes, SnapshotEventTypes, SnapshotRecord
+from Snapshot.event_log import EventLog
 
 
 
@@ -20,81 +21,124 @@ class ChandyLamportState:
     ChandyLamportState keeps track of states.
     """
 
-    def __init__(self, component, state, chnl_states):
+    def __init__(self, component, state, chnl_states, snapshot_id=None):
         self.component_id = component
-        self.component_state = []
-        for s in state:
-            self.component_state.append(s)
+        self.component_state = state
+        self.snapshot_id = snapshot_id
 
         self.chnl_states = defaultdict(list)
         for c, s in chnl_states.items():
-            self.chnl_states[c].append(s)
+            self.chnl_states[c].extend(s)
+
+
+class ChandyLamportRecord(SnapshotRecord):
+    """
+    The progress of one Chandy-Lamport snapshot: the channels markers came from and, for each channel, the sequence
+    number of the first message received after the local state was recorded.
+    """
+
+    def __init__(self, snapshot_id):
+        super().__init__(snapshot_id)
+        self.in_chnl_states = defaultdict(list)
+        self.chnl_marks = dict()
+        self.mark_recv_chnls = set()
+
 
 class ChandyLamportComponentModel(SnapshotComponentModel):
     """
     A ComponentModel that you can take a snapshot of using the Chandy-Lamport algorithm
+
+    Markers carry the identifier of their snapshot, so snapshots started by different components or one after the
+    other proceed independently, each in its own ChandyLamportRecord.
+
+    The application messages received on a channel are numbered in the order they arrive and appended to a log of the
+    channel while a snapshot waits for a marker on it. The state of a channel is the range of sequence numbers between
+    the recording of the local state and the marker, taken as a view of the log, so a message is recorded once however
+    many snapshots are in flight, and the log is truncated once no snapshot waits on the channel.
+
+    The marker wave builds the spanning tree used to convergecast the local states: the channel of the first marker
+    leads to the parent, and every marker names the channel of the parent of its sender so the parent learns its
+    children.
     """
 
+    record_type = ChandyLamportRecord
+
     def __init__(self, componentname, componentinstancenumber, context=None, configurationparameters=None, num_worker_threads=1, topology=None):
         super().__init__(componentname, componentinstancenumber, context, configurationparameters, num_worker_threads, topology)
-        self.global_state = dict()
-        self.in_chnl_states = defaultdict(list)
-        self.in_chnl_events = defaultdict(list)
-        self.mark_recv_chnls = set()
-        self.gsu_chnls = set()
+        self.chnl_logs = defaultdict(EventLog)
+        # The number of snapshots waiting for a marker on each channel
+        self.chnl_waiting = defaultdict(int)
 
     def on_gsu_recv(self, state: ChandyLamportState):
-        if not self.init_snapshot:
+        record = self.snapshot(state.snapshot_id)
+        if record is None or not record.init_snapshot:
             return
 
-        report=f"State of component: {state.component_id}="
-        report += ", ".join(str(e) for e in state.component_state)
-        logger.debug(report)
-        for chnl, events in state.chnl_states.items():
-            chnl_rep = f"State of channel: {chnl}="
-            chnl_rep += ", ".join(str(e) for e in events)
-            logger.debug(chnl_rep)
+        record.global_state[state.component_id] = state
+        if logger.isEnabledFor(DEBUG):
+            report=f"State of component: {state.component_id}="
+            report += ", ".join(str(e) for e in state.component_state)
+            logger.debug(report)
+            for chnl, events in state.chnl_states.items():
+                chnl_rep = f"State of channel: {chnl}="
+                chnl_rep += ", ".join(str(e) for e in events)
+                logger.debug(chnl_rep)
+
+        if not record.completed and len(record.global_state) == self.expected_components():
+            record.completed = True
+            self.persist_snapshot(record.snapshot_id, record.global_state)
+            self.on_global_snapshot(record)
 
     def send_msg(self, event: Event):
         self.send_down(event)
 
-    def mark_send(self):
+    def mark_send(self, record):
         # Record the state
-        self.state = []
-        for re in self.recv_events:
-            self.state.append(re)
+        record.state = self.record_events(record)
+        for c in self.chnls:
+            record.chnl_marks[c] = self.chnl_logs[c].watermark
+            self.chnl_waiting[c] += 1
 
         # Broadcast the mark message
         mark_msg = GenericMessage(
             GenericMessageHeader(ChandyLamportMessageTypes.MARKER, None, None),
-            None)
+            (record.snapshot_id, record.parent_chnl))
         self.send_msg(Event(self, EventTypes.MFRT, mark_msg))
 
     def on_take_snapshot(self):
         """Initializes a global snapshot and a report will be printed out when
         complete"""
-        self.mark_send()
+        record = self.snapshot(self.new_snapshot_id())
+        record.init_snapshot = True
+        self.mark_send(record)
+
+    def mark_recv(self, from_chnl, snapshot_id, sender_parent_chnl=None):
+        record = self.snapshot(snapshot_id)
+        if record is None or from_chnl in record.mark_recv_chnls:
+            # The snapshot was finished here, it is not recorded anymore
+            return
+        if sender_parent_chnl == from_chnl:
+            # The sender joined the tree through us
+            record.child_chnls.add(from_chnl)
 
-    def mark_recv(self, from_chnl):
-        if self.state is None:
+        if record.state is None:
             # First mark message, save component and channel state
-            self.mark_send()
-            self.in_chnl_states[from_chnl] = []
-        else:
-            # Consequent mark messages, save channel states
-            for e in self.in_chnl_events[from_chnl]:
-                self.in_chnl_states[e].append(e)
-
-        self.mark_recv_chnls.add(from_chnl)
-        if self.mark_recv_chnls == self.chnls:
+            record.parent_chnl = from_chnl
+            self.mark_send(record)
+
+        # The messages received on the channel since the local state was recorded
+        record.in_chnl_states[from_chnl] = self.chnl_logs[from_chnl].view(record.chnl_marks[from_chnl])
+        self.stop_recording(from_chnl)
+        record.mark_recv_chnls.add(from_chnl)
+        if record.mark_recv_chnls == self.chnls:
             # Local snapshot completed, broadcast the local state
             local_state = ChandyLamportState(self.componentinstancenumber,
-                                             self.state, self.in_chnl_states)
-            gsu_msg = GenericMessage(
-                GenericMessageHeader(SnapshotMessageTypes.GLOBALSNAPSHOT, None, None),
-                local_state)
-            self.send_msg(Event(self, EventTypes.MFRT, gsu_msg))
-            self.gsu_recv(local_state)
+                                             record.state, record.in_chnl_states, snapshot_id)
+            if self.convergecast:
+                self.collect_local_state(record, local_state)
+            else:
+                # gsu_recv broadcasts the state as it does for the states of other components
+                self.gsu_recv(local_state)
 
     def msg_recv(self, event: Event):
         from_chnl = self.channel_of(event)
@@ -102,24 +146,31 @@ class ChandyLamportComponentModel(SnapshotComponentModel):
         if type(contnt := event.eventcontent) == GenericMessage and\
            type(header := contnt.header) == GenericMessageHeader:
             if header.messagetype == ChandyLamportMessageTypes.MARKER:
-                self.mark_recv(from_chnl)
+                self.mark_recv(from_chnl, *contnt.payload)
+                return event
+            elif header.messagetype == SnapshotMessageTypes.GLOBALSNAPSHOT and self.convergecast:
+                self.subtree_recv(from_chnl, contnt.payload)
+                return event
             elif header.messagetype == SnapshotMessageTypes.GLOBALSNAPSHOT:
                 self.gsu_recv(contnt.payload)
+                return event
 
-            return event
-
-        if self.state is None:
-            return event
-
-        # If the state is not recorded
-        if from_chnl not in self.in_chnl_states:
-            self.in_chnl_events[from_chnl].append(event)
+        # Record the message on the channel once for all the snapshots waiting for its marker
+        if self.chnl_waiting[from_chnl]:
+            self.chnl_logs[from_chnl].append(event)
 
         return event
 
-    def reset_state(self):
-        super().reset_state()
-        self.in_chnl_states.clear()
-        self.in_chnl_events.clear()
-        self.mark_recv_chnls.clear()
-
+    def stop_recording(self, chnl):
+        """Releases the log of a channel once no snapshot waits for a marker on it"""
+        self.chnl_waiting[chnl] -= 1
+        if not self.chnl_waiting[chnl]:
+            log = self.chnl_logs[chnl]
+            log.truncate(log.watermark)
+
+    def finish_snapshot(self, snapshot_id):
+        record = self.snapshots.get(snapshot_id)
+        if record is not None and record.state is not None:
+            for c in record.chnl_marks.keys() - record.mark_recv_chnls:
+                self.stop_recording(c)
+        super().finish_snapshot(snapshot_id)
@@ -3,46 +3,118 @@ from enum import Enum
 from adhoccomputing.Experimentation.Topology import Topology
 from adhoccomputing.GenericModel import GenericModel, GenericMessageHeader, GenericMessagePayload, GenericMessage
 from adhoccomputing.Generics import *
-from collections import defaultdict
+from collections import Counter, defaultdict
 from Snapshot.Snapshot import SnapshotComponentModel, SnapshotMessageTypes, SnapshotEventTypes
+from Snapshot.event_log import EventLog
+
+
+class LaiYangColors(Enum):
+    """
+    The color of a message, carried in the lowest bit of the eventid of its event: channels copy the eventid to the
+    event they deliver, so the content passes through untouched. Components that do not take snapshots leave it to 0,
+    white.
+    """
+    WHITE = 0
+    RED = 1
+
+
+def color_of(event: Event):
+    return event.eventid & 1
+
+
+def sequence_of(event: Event):
+    """Returns the sequence number of a message, carried in the eventid above the color bit"""
+    return event.eventid >> 1
+
+
+class LaiYangMessageTypes(Enum):
+    WHITECOUNT = "WHITECOUNT"
+
+
+class ReceiveWindow:
+    """
+    The sequence numbers received on a channel: every number below next, and those above it that arrived out of order.
+    """
+
+    __slots__ = ('next', 'ahead')
+
+    def __init__(self, next=0, ahead=()):
+        self.next = next
+        self.ahead = set(ahead)
+
+    def add(self, sequence):
+        if sequence == self.next:
+            self.next += 1
+            while self.ahead and self.next in self.ahead:
+                self.ahead.remove(self.next)
+                self.next += 1
+        elif sequence > self.next:
+            self.ahead.add(sequence)
+
+    def copy(self):
+        return ReceiveWindow(self.next, self.ahead)
+
+    def missing(self, end):
+        """Returns the sequence numbers below end that were not received, in O(missing + out of order)"""
+        if self.next > end or any(sequence >= end for sequence in self.ahead):
+            raise Exception("Not a consistent global state")
+        return [sequence for sequence in range(self.next, end) if sequence not in self.ahead]
 
 
 class LaiYangState:
+    """
+    The local state of a LaiYangComponentModel: the received events, the sequence numbers received on each channel
+    and a view of the messages sent, indexed by sequence number.
+    """
+
     def __init__(self, comp_id, comp_state, received, sent):
         self.component_id = comp_id
-        self.component_state = []
-        for cs in comp_state:
-            self.component_state.append(cs)
+        self.component_state = comp_state
+        self.received = dict(received)
+        self.sent = dict(sent)
 
-        self.received = defaultdict(list)
-        for chnl, r in received.items():
-            self.received[chnl].append(r)
+class LaiYangComponentModel(SnapshotComponentModel):
+    """
+    Every message a component sends is numbered, and sent on every channel, so its sequence number is also its
+    number on each channel. A local state records the numbers received on each channel and the messages sent so far;
+    the messages in transit on a channel are the ones the sender sent before its snapshot whose numbers the receiver
+    had not received before its own, found by a range computation instead of comparing the histories.
 
-        self.sent = defaultdict(list)
-        for chnl, s in sent.items():
-            self.sent[chnl].append(s)
+    Local states are flooded to every component, so a component learns from the states of its neighbors the first
+    number each of them had not received from it. Every message below the lowest of these was received before the
+    snapshot and before any later one, so no channel state needs it anymore and sent_log is truncated there: it only
+    holds the messages sent since the previous snapshot of the receivers, and grows with the history until the
+    first snapshot is taken.
+    """
 
-class LaiYangComponentModel(SnapshotComponentModel):
     def __init__(self, componentname, componentinstancenumber, context=None, configurationparameters=None, num_worker_threads=1, topology=None):
         super().__init__(componentname, componentinstancenumber, context, configurationparameters, num_worker_threads, topology)
-        self.chnl_recv = defaultdict(list)
-        self.chnl_sent = defaultdict(list)
+        self.chnl_recv = defaultdict(ReceiveWindow)
+        self.sent_log = EventLog()
+        # The first sequence number the receiver on each channel had not received when it recorded its state
+        self.receiver_next = dict()
         self.global_state = dict()
+        self.collected_comps = set()
         self.sent_remaining = dict()
         self.recv_remaining = dict()
 
+    def color(self):
+        """Returns the color of the messages sent, red once the local state is recorded"""
+        return LaiYangColors.WHITE.value if self.state is None else LaiYangColors.RED.value
+
     def send_msg(self, event: Event):
-        event.eventcontent = (event.eventcontent, self.state is not None)
-        for c in self.chnls:
-            self.chnl_sent[c].append(event)
+        event.eventid = self.sent_log.watermark << 1 | self.color()
+        self.sent_log.append(event.eventcontent)
 
         self.send_down(event)
 
     def handle_snapshot(self):
         # Take a snapshot
+        sent = self.sent_log.view()
         self.state = LaiYangState(self.componentinstancenumber,
-                                  self.recv_events, self.chnl_recv,
-                                  self.chnl_sent)
+                                  self.record_events(),
+                                  {c: self.chnl_recv[c].copy() for c in self.chnls},
+                                  {c: sent for c in self.chnls})
         self.gsu_recv(self.state)
 
     def on_take_snapshot(self):
@@ -52,54 +124,69 @@ class LaiYangComponentModel(SnapshotComponentModel):
         # and broadcast their snapshots
         self.send_msg(Event(self, EventTypes.MFRT, "dummy"))
 
-    def report_and_save_channel_state(self, channel, set_recv, set_sent):
-        if not set_recv.issubset(set_sent):
-            raise Exception("Not a consistent global state")
-
-        chnl_state = list(set_sent - set_recv)
+    # Channel states are keyed by the channel and the component receiving on it
+    def report_and_save_channel_state(self, channel, recv, sent):
+        chnl_state = [sent[sequence - sent.start] for sequence in recv.missing(sent.end)]
         self.global_state[channel] = chnl_state
-        logger.debug(f"State of channel: {channel}=chnl_state")
+        logger.debug(f"State of channel: {channel}={chnl_state}")
+
+    def release_sent(self, state: LaiYangState):
+        """Truncates sent_log below the messages the receivers had not received, once all of them reported"""
+        if state.component_id == self.componentinstancenumber:
+            return
+        for chnl, recv in state.received.items():
+            if chnl in self.chnls:
+                self.receiver_next[chnl] = recv.next
+        if self.chnls and self.receiver_next.keys() >= self.chnls:
+            self.sent_log.truncate(min(self.receiver_next[c] for c in self.chnls))
+            self.receiver_next.clear()
 
     def on_gsu_recv(self, state: LaiYangState):
+        self.release_sent(state)
         if not self.init_snapshot:
             return
         # Report the snapshot if we are the source component of the snapshot
         self.global_state[state.component_id] = state.component_state
-        report = f"State of component: {state.component_id}="
-        report += ", ".join(str(e) for e in state.component_state)
-        logger.debug(report)
-
-        # Compute the messages in transit
-        for chnl, recv in state.received:
-            if chnl in self.sent_remaining:
-                self.report_and_save_channel_state(
-                    chnl, set(recv), set(self.sent_remaining[chnl]))
+        # The report lists every recorded event, only build it when it is logged
+        if logger.isEnabledFor(DEBUG):
+            report = f"State of component: {state.component_id}="
+            report += ", ".join(str(e) for e in state.component_state)
+            logger.debug(report)
+
+        # Compute the messages in transit, the messages one end of a channel sent are received by the other end
+        for chnl, recv in state.received.items():
+            sender, sent = self.sent_remaining.get(chnl, (state.component_id, None))
+            if sender != state.component_id:
+                self.report_and_save_channel_state((chnl, state.component_id), recv, sent)
             else:
-                self.recv_remaining[chnl] = recv
+                self.recv_remaining[chnl] = (state.component_id, recv)
 
-        for chnl, sent in state.sent:
-            if chnl in self.recv_remaining:
-                self.report_and_save_channel_state(
-                    chnl, set(self.recv_remaining[chnl]), set(sent))
+        for chnl, sent in state.sent.items():
+            receiver, recv = self.recv_remaining.get(chnl, (state.component_id, None))
+            if receiver != state.component_id:
+                self.report_and_save_channel_state((chnl, receiver), recv, sent)
             else:
-                self.sent_remaining[chnl] = sent
+                self.sent_remaining[chnl] = (state.component_id, sent)
 
-    def msg_recv(self, event: Event):
-        content = event.eventcontent
-        if type(content) is not tuple or len(content) != 2:
-            raise Exception("Malformed message received by: "
-                            "{self.unique_name()}")
+        self.check_global_snapshot(state.component_id)
 
-        # Unpack the event content and modify the event with the actual content
-        act_cntnt, post_snapshot = content
-        event.eventcontent = act_cntnt
+    def check_global_snapshot(self, component_id):
+        """Persists the global state once the local states of every component are in, channel states included"""
+        if component_id in self.collected_comps:
+            return
+        self.collected_comps.add(component_id)
+        if len(self.collected_comps) == self.expected_components():
+            self.persist_snapshot(None, self.global_state)
+
+    def msg_recv(self, event: Event):
+        act_cntnt = event.eventcontent
 
         # We are white and the message is post-snapshot
-        if self.state is None and post_snapshot:
+        if self.state is None and color_of(event) == LaiYangColors.RED.value:
             self.handle_snapshot()
 
         from_chnl = self.channel_of(event)
-        self.chnl_recv[from_chnl].append(event)
+        self.chnl_recv[from_chnl].add(sequence_of(event))
 
         # If not a GLOBALSNAPSHOT message return the modified event
         if type(act_cntnt) != GenericMessage or\
@@ -112,4 +199,119 @@ class LaiYangComponentModel(SnapshotComponentModel):
 
     def reset_state(self):
         super().reset_state()
-        self.global_state.clear()
\ No newline at end of file
+        self.global_state.clear()
+        self.collected_comps.clear()
+        # Local states of the next snapshot must not be paired with those of this one
+        self.sent_remaining.clear()
+        self.recv_remaining.clear()
+
+
+class LaiYangCountingState:
+    """
+    The local state of a LaiYangCountingComponentModel: the received events and the messages that were in transit on
+    each incoming channel.
+    """
+
+    def __init__(self, comp_id, comp_state, chnl_states=None):
+        self.component_id = comp_id
+        self.component_state = comp_state
+        self.chnl_states = dict(chnl_states or {})
+
+
+class LaiYangCountingComponentModel(LaiYangComponentModel):
+    """
+    A Lai-Yang variant that counts the messages of each channel instead of recording them, as in Mattern's algorithm.
+
+    A component counts the white (pre-snapshot) messages it sends and receives on every channel. When it turns red it
+    records its state and announces its white sent counts in a red WHITECOUNT message on every channel. The white
+    messages a component receives after its own snapshot were in transit and make up the channel state, which is
+    complete once the announced number of white messages has been received, in whatever order the messages arrive.
+    The local state is broadcast in a GLOBALSNAPSHOT when every incoming channel is complete. Memory is O(channels) besides the in-transit messages, whatever the traffic.
+    """
+
+    def __init__(self, componentname, componentinstancenumber, context=None, configurationparameters=None, num_worker_threads=1, topology=None):
+        super().__init__(componentname, componentinstancenumber, context, configurationparameters, num_worker_threads, topology)
+        self.white_sent = Counter()
+        self.white_recv = Counter()
+        self.expected = dict()
+        self.in_transit = defaultdict(list)
+        self.local_state_sent = False
+
+    def send_msg(self, event: Event):
+        if self.state is None:
+            for c in self.chnls:
+                self.white_sent[c] += 1
+        event.eventid = self.color()
+        self.send_down(event)
+
+    def handle_snapshot(self):
+        announced = {c: self.white_sent[c] for c in self.chnls}
+        self.state = LaiYangCountingState(self.componentinstancenumber, self.record_events())
+        # Let every neighbor know how many white messages to wait for
+        count_msg = GenericMessage(
+            GenericMessageHeader(LaiYangMessageTypes.WHITECOUNT, self.componentinstancenumber, None),
+            announced)
+        self.send_msg(Event(self, EventTypes.MFRT, count_msg))
+        self.check_channels()
+
+    def on_take_snapshot(self):
+        self.handle_snapshot()
+
+    def check_channels(self):
+        """Broadcasts the local state once every incoming channel is complete"""
+        if self.state is None or self.local_state_sent:
+            return
+        for c in self.chnls:
+            expected = self.expected.get(c)
+            if expected is None or self.white_recv[c] < expected:
+                return
+
+        self.local_state_sent = True
+        self.state.chnl_states = {c: self.in_transit[c] for c in self.chnls}
+        self.gsu_recv(self.state)
+
+    def on_gsu_recv(self, state: LaiYangCountingState):
+        if not self.init_snapshot:
+            return
+        self.global_state[state.component_id] = state.component_state
+        # The report lists every recorded event, only build it when it is logged
+        if logger.isEnabledFor(DEBUG):
+            report = f"State of component: {state.component_id}="
+            report += ", ".join(str(e) for e in state.component_state)
+            logger.debug(report)
+
+        for chnl, chnl_state in state.chnl_states.items():
+            self.global_state[(chnl, state.component_id)] = chnl_state
+            logger.debug(f"State of channel: {(chnl, state.component_id)}={chnl_state}")
+
+        self.check_global_snapshot(state.component_id)
+
+    def msg_recv(self, event: Event):
+        act_cntnt = event.eventcontent
+        from_chnl = self.channel_of(event)
+
+        if color_of(event) != LaiYangColors.RED.value:
+            self.white_recv[from_chnl] += 1
+            # Sent before the snapshot of the sender and received after ours
+            if self.state is not None:
+                self.in_transit[from_chnl].append(act_cntnt)
+                self.check_channels()
+        elif self.state is None:
+            self.handle_snapshot()
+
+        if type(act_cntnt) != GenericMessage or type(header := act_cntnt.header) != GenericMessageHeader:
+            return event
+
+        if header.messagetype == LaiYangMessageTypes.WHITECOUNT:
+            self.expected[from_chnl] = act_cntnt.payload.get(from_chnl, 0)
+            self.check_channels()
+        elif header.messagetype == SnapshotMessageTypes.GLOBALSNAPSHOT:
+            self.gsu_recv(act_cntnt.payload)
+        return event
+
+    def reset_state(self):
+        # The counters are cumulative, white messages of the next snapshot are counted on top of them
+        super().reset_state()
+        self.expected.clear()
+        self.in_transit.clear()
+        self.local_state_sent = False
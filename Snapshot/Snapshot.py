@@ -9,7 +9,9 @@ from enum import Enum
 from adhoccomputing.Experimentation.Topology import Topology
 from adhoccomputing.GenericModel import GenericModel, GenericMessageHeader, GenericMessagePayload, GenericMessage
 from adhoccomputing.Generics import *
-from collections import defaultdict
+import itertools
+from collections import OrderedDict, defaultdict
+from Snapshot.event_log import EventLog
 
 class SnapshotEventTypes(Enum):
     """ 
@@ -21,24 +23,166 @@ class SnapshotMessageTypes(Enum):
     GLOBALSNAPSHOT = "GLOBALSNAPSHOT"
 
 
+class SnapshotRecord:
+    """
+    The progress of one snapshot at a component, kept in the snapshot table of the component.
+    """
+
+    def __init__(self, snapshot_id):
+        self.snapshot_id = snapshot_id
+        self.state = None
+        self.init_snapshot = False
+        self.watermark = None
+        self.gsu_redirected_comps = set()
+        self.global_state = dict()
+        self.completed = False
+
+        # Convergecast along the spanning tree of the snapshot
+        self.local_state = None
+        self.parent_chnl = None
+        self.child_chnls = set()
+        self.subtree_states = []
+        self.reported_chnls = set()
+
+
 class SnapshotComponentModel(GenericModel):
     """
     A generic snapshot component model to implement various snapshot algorithms.
 
     Extend SnapshotComponentModel to implement your own snapshot algorithm.
+
+    Received events are appended to recv_events, a segmented EventLog. A snapshot records the component state as a
+    view of the log up to its watermark (see record_events), and reset_state truncates the log at that watermark once
+    the global snapshot is complete, so the log only holds the events received since the last snapshot.
+
+    Every snapshot has an identifier, unique across components, and its progress is kept in a SnapshotRecord of the
+    snapshots table, so several snapshots can be in flight at once. The table is bounded by max_snapshots: the
+    oldest snapshots, completed ones first, are finished to make room for new ones, and the messages of finished
+    snapshots are ignored from then on. Algorithms that take one snapshot at a time use the record of the None
+    identifier.
+
+    Local states are flooded to every component in GLOBALSNAPSHOT messages by default. With
+    set_parameters(convergecast=True) they are instead gathered along a spanning tree rooted at the initiator, which
+    the algorithm builds while the snapshot spreads (parent_chnl and child_chnls of the record): a component sends
+    the states of its subtree, merged with its own, to its parent once all its children have reported, so every tree
+    edge carries one message and the initiator ends up with every local state. Nothing of the snapshot reaches a
+    component after it sent its subtree to its parent, so it finishes the snapshot right away and truncates its log.
     """
+
+    record_type = SnapshotRecord
+
     def __init__(self, componentname, componentinstancenumber, context=None, configurationparameters=None, num_worker_threads=1, topology=None):
         """
         Initializes the SnapshotComponentModel
         """
         super().__init__(componentname, componentinstancenumber, context, configurationparameters, num_worker_threads, topology)
         self.state = None
-        self.gsu_redirected_comps = set()
-        self.recv_events = []
+        self.recv_events = EventLog()
+        self.snapshot_watermark = None
         self.chnls = set()
         self.init_snapshot = False
+        self.convergecast = False
+        self.snapshots = OrderedDict()
+        self.max_snapshots = 16
+        self.snapshot_writer = None
+        self._snapshot_ids = itertools.count()
+        # The snapshots finished per initiator, later messages of those snapshots are ignored: the sequence number
+        # below which all are finished, and the finished ones above it
+        self._finished = dict()
         self.eventhandlers[SnapshotEventTypes.TAKESNAPSHOT] = self.take_snapshot
 
+    def set_parameters(self, convergecast=None, max_snapshots=None, snapshot_writer=None):
+        """
+        Sets the parameters of the snapshot component.
+
+        Args:
+            convergecast (bool, optional): Whether local states are gathered along a spanning tree rooted at the initiator instead of flooded. Defaults to None.
+            max_snapshots (int, optional): The number of snapshots kept in the snapshot table. Defaults to None.
+            snapshot_writer (SnapshotWriter, optional): Where the initiator persists the global snapshots. Defaults to None.
+        """
+        if convergecast is not None:
+            self.convergecast = convergecast
+        if max_snapshots:
+            self.max_snapshots = max_snapshots
+        if snapshot_writer is not None:
+            self.snapshot_writer = snapshot_writer
+
+    def new_snapshot_id(self):
+        """
+        Returns:
+            tuple: An identifier for a snapshot initiated by the component, unique across components.
+        """
+        return (self.componentinstancenumber, next(self._snapshot_ids))
+
+    def snapshot(self, snapshot_id):
+        """
+        Returns the record of a snapshot, creating it the first time the snapshot reaches the component.
+
+        Args:
+            snapshot_id (Hashable): The identifier of the snapshot.
+
+        Returns:
+            SnapshotRecord | None: The record, None if the snapshot was already finished.
+        """
+        record = self.snapshots.get(snapshot_id)
+        if record is None:
+            if self.is_finished(snapshot_id):
+                return None
+            while len(self.snapshots) >= self.max_snapshots:
+                oldest = next((sid for sid, r in self.snapshots.items() if r.completed), next(iter(self.snapshots)))
+                self.finish_snapshot(oldest)
+            record = self.snapshots[snapshot_id] = self.record_type(snapshot_id)
+        return record
+
+    def finish_snapshot(self, snapshot_id):
+        """
+        Drops the record of a snapshot and truncates the event log at its watermark.
+
+        Args:
+            snapshot_id (Hashable): The identifier of the snapshot.
+        """
+        record = self.snapshots.pop(snapshot_id, None)
+        if record is not None and record.watermark is not None:
+            self.recv_events.truncate(record.watermark)
+        if snapshot_id is not None:
+            initiator, number = snapshot_id
+            finished = self._finished.setdefault(initiator, [0, set()])
+            finished[1].add(number)
+            # Snapshots finish roughly in order, only those finished ahead of an earlier one are kept
+            while finished[0] in finished[1]:
+                finished[1].remove(finished[0])
+                finished[0] += 1
+
+    def is_finished(self, snapshot_id):
+        """
+        Args:
+            snapshot_id (Hashable): The identifier of the snapshot.
+
+        Returns:
+            bool: True if the snapshot was finished at the component.
+        """
+        if snapshot_id is None or snapshot_id[0] not in self._finished:
+            return False
+        below, above = self._finished[snapshot_id[0]]
+        return snapshot_id[1] < below or snapshot_id[1] in above
+
+    def expected_components(self):
+        """
+        Returns:
+            int | None: The number of components a global snapshot covers, None if the topology is unknown.
+        """
+        nodes = getattr(self.topology, 'nodes', None)
+        return len(nodes) if nodes else None
+
+    def persist_snapshot(self, snapshot_id, global_state):
+        """Queues a complete global snapshot to the snapshot writer, if any"""
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.write(snapshot_id, global_state)
+
+    def on_global_snapshot(self, record):
+        """Called at the initiator once the local states of every component are in the record"""
+        pass
+
     def on_connected_to_component(self, name, channel):
         """
         on_connected_to_component is an event to address the channels
@@ -46,6 +190,14 @@ class SnapshotComponentModel(GenericModel):
         super().on_connected_to_component(name, channel)
         self.chnls.add(channel.componentinstancenumber)
 
+    def connect_me_to_component(self, name, component):
+        """
+        Registers the channels the component sends down to, the topology does not call on_connected_to_component
+        """
+        super().connect_me_to_component(name, component)
+        if name == ConnectorTypes.DOWN:
+            self.on_connected_to_component(name, component)
+
     def channel_of(self, eventobj: Event):
         from_chnl = eventobj.fromchannel
         if from_chnl is None:
@@ -59,6 +211,31 @@ class SnapshotComponentModel(GenericModel):
         """
         return self.recv_events.append(event)
 
+    def record_events(self, record=None):
+        """
+        Records the received events as part of the local state of a snapshot.
+
+        Args:
+            record (SnapshotRecord, optional): The record of the snapshot, None for algorithms taking one snapshot at a time.
+
+        Returns:
+            EventLogView: The events received since the log was last truncated, referenced rather than copied.
+        """
+        watermark = self.recv_events.watermark
+        if record is None:
+            self.snapshot_watermark = watermark
+        else:
+            record.watermark = watermark
+        return self.recv_events.view(end=watermark)
+
+    def compact_log(self):
+        """
+        Truncates the event log at the watermark of the last snapshot, once the global snapshot is complete.
+        """
+        if self.snapshot_watermark is not None:
+            self.recv_events.truncate(self.snapshot_watermark)
+            self.snapshot_watermark = None
+
 
     def send_msg(self, event: Event):
         """Generic send message function"""
@@ -68,6 +245,44 @@ class SnapshotComponentModel(GenericModel):
         """Generic message received function"""
         pass
 
+    def send_on_channel(self, event: Event, channel):
+        """Sends an event down to a single channel"""
+        for p in self.connectors[ConnectorTypes.DOWN]:
+            if p.componentinstancenumber == channel:
+                p.trigger_event(event)
+
+    def collect_local_state(self, record, local_state):
+        """Adds the local state to the subtree states once the children of the component are known"""
+        record.local_state = local_state
+        self.convergecast_states(record)
+
+    def subtree_recv(self, from_chnl, states):
+        """Handles the states of the subtree of a child, all of the same snapshot"""
+        record = self.snapshot(states[0].snapshot_id)
+        if record is None:
+            return
+        record.subtree_states.extend(states)
+        record.reported_chnls.add(from_chnl)
+        self.convergecast_states(record)
+
+    def convergecast_states(self, record):
+        """Sends the states of the subtree to the parent, or reports them at the initiator, once all are in"""
+        if record.local_state is None or not record.child_chnls <= record.reported_chnls:
+            return
+        states = [record.local_state] + record.subtree_states
+        record.local_state = None
+        record.subtree_states = []
+        if record.parent_chnl is None:
+            for state in states:
+                self.on_gsu_recv(state)
+            return
+
+        gsu_msg = GenericMessage(
+            GenericMessageHeader(SnapshotMessageTypes.GLOBALSNAPSHOT, None, None),
+            states)
+        self.send_on_channel(Event(self, EventTypes.MFRT, gsu_msg), record.parent_chnl)
+        self.finish_snapshot(record.snapshot_id)
+
     def send_gsu(self, local_state):
         """Send GLOBALSNAPSHOT message """
         gsu_msg = GenericMessage(
@@ -77,8 +292,11 @@ class SnapshotComponentModel(GenericModel):
 
     def gsu_recv(self, state):
         # Redirect the GLOBALSNAPSHOT if we are not the source component of the snapshot
-        if state.component_id not in self.gsu_redirected_comps:
-            self.gsu_redirected_comps.add(state.component_id)
+        record = self.snapshot(getattr(state, 'snapshot_id', None))
+        if record is None:
+            return
+        if state.component_id not in record.gsu_redirected_comps:
+            record.gsu_redirected_comps.add(state.component_id)
             self.send_gsu(state)
 
         self.on_gsu_recv(state)
@@ -107,5 +325,7 @@ class SnapshotComponentModel(GenericModel):
         return self.msg_recv(eventobj)
 
     def reset_state(self):
+        for snapshot_id in list(self.snapshots):
+            self.finish_snapshot(snapshot_id)
+        self.compact_log()
         self.state = None
-        self.gsu_redirected_comps.clear()
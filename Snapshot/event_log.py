@@ -0,0 +1,140 @@
+"""
+Append-only, segmented log of the events a snapshot component receives.
+
+Events are appended to fixed-size segments and numbered by their position in the log. A snapshot records a view of
+the log up to a watermark, which only references the segments it covers instead of copying the events, so recording
+a state costs O(segments) whatever the length of the history. Once a global snapshot completes, the log is truncated
+at its watermark: the segments before it are dropped from the log and stay alive only as long as views reference them.
+"""
+
+import itertools
+from collections.abc import Sequence
+
+
+class EventLogView(Sequence):
+    """
+    The events of a log between two positions. Views are immutable and stay valid after the log is truncated.
+    """
+
+    def __init__(self, segments, segment_size, offset, start, end):
+        """
+        Args:
+            segments (list[list]): The segments holding the events, the first from offset on.
+            segment_size (int): The number of events of every segment but the last.
+            offset (int): The index of the first event in the first segment.
+            start (int): The log position of the first event.
+            end (int): The log position after the last event.
+        """
+        self._segments = segments
+        self._segment_size = segment_size
+        self._offset = offset
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("EventLogView index out of range")
+        segment, index = divmod(index + self._offset, self._segment_size)
+        return self._segments[segment][index]
+
+    def __iter__(self):
+        return itertools.islice(itertools.chain.from_iterable(self._segments), self._offset, self._offset + len(self))
+
+    def __repr__(self):
+        return f"EventLogView(start={self.start}, end={self.end})"
+
+
+class EventLog:
+    """
+    An append-only log of events stored in segments of segment_size events.
+    """
+
+    def __init__(self, segment_size=1024):
+        """
+        Args:
+            segment_size (int, optional): The number of events per segment. Defaults to 1024.
+        """
+        self.segment_size = segment_size
+        self._segments = []
+        # The log position of the first event of the first segment, and of the first event not truncated
+        self._base = 0
+        self._first = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._first
+
+    def __iter__(self):
+        return iter(self.view())
+
+    @property
+    def start(self):
+        """
+        int: The position of the first event kept in the log.
+        """
+        return self._first
+
+    @property
+    def watermark(self):
+        """
+        int: The position the next event will be appended at.
+        """
+        return self._end
+
+    @property
+    def segments(self):
+        """
+        int: The number of segments held by the log.
+        """
+        return len(self._segments)
+
+    def append(self, event):
+        """
+        Args:
+            event (Event): The event to append.
+        """
+        if not self._segments or len(self._segments[-1]) == self.segment_size:
+            self._segments.append([])
+        self._segments[-1].append(event)
+        self._end += 1
+
+    def view(self, start=None, end=None):
+        """
+        Returns a view of the events between two positions of the log.
+
+        Args:
+            start (int, optional): The first position. Defaults to the start of the log.
+            end (int, optional): The position after the last event. Defaults to the watermark.
+
+        Returns:
+            EventLogView: The view.
+        """
+        start = self._first if start is None else start
+        end = self._end if end is None else end
+        if not self._first <= start <= end <= self._end:
+            raise ValueError(f"Positions {start}-{end} are outside the log {self._first}-{self._end}")
+        first, offset = divmod(start - self._base, self.segment_size)
+        last = (end - 1 - self._base) // self.segment_size if end > start else first
+        return EventLogView(self._segments[first:last + 1], self.segment_size, offset, start, end)
+
+    def truncate(self, position):
+        """
+        Drops the events before a position, typically the watermark of a completed global snapshot. Whole segments
+        are released, views taken before keep the events they cover.
+
+        Args:
+            position (int): The position of the first event to keep.
+        """
+        position = min(max(position, self._first), self._end)
+        dropped = (position - self._base) // self.segment_size
+        if dropped:
+            del self._segments[:dropped]
+            self._base += dropped * self.segment_size
+        self._first = position
@@ -0,0 +1,315 @@
+"""
+Incremental persistence of global snapshots.
+
+Global snapshots are appended to a data file, each one stored as the changes since the previous snapshot: the
+entries (recorded events or messages in transit) of a component or channel that did not change are not written
+again, and an entry list that only gained entries at its end, or lost some at its start when the event log was
+truncated, is written as the entries it dropped and gained. A full snapshot is written every checkpoint_every
+snapshots, so any snapshot is rebuilt by applying at most checkpoint_every deltas to the closest full snapshot
+before it.
+
+The data file starts with an 8-byte magic followed by the pickled records. The index, a second file next to it, holds
+one fixed-size entry per snapshot: the offset and length of its record and the number of the full snapshot its
+chain of deltas starts from. Both files are append-only and read through mmap, so opening a store does not read
+the snapshots it holds.
+
+Records are encoded and written by a background thread: SnapshotWriter.write only queues the global state, so
+protocol handlers never wait for the disk. Events are stored as plain tuples, without the component that sent them.
+"""
+
+import mmap
+import os
+import pickle
+import queue
+import struct
+import threading
+from collections.abc import Sequence
+
+from adhoccomputing.GenericModel import GenericMessage
+from adhoccomputing.Generics import Event
+
+_MAGIC = b"AHCSNAP1"
+# Offset and length of the record, number of the full snapshot the chain of deltas starts from
+_INDEX_ENTRY = struct.Struct("<QQQ")
+
+_SET = 0
+_SPLICE = 1
+
+
+class SnapshotStoreError(Exception):
+    pass
+
+
+def index_path(path):
+    return path + ".index"
+
+
+def encode_entry(entry):
+    """
+    Converts an entry of a snapshot to plain, picklable values.
+
+    Events become (event type, source component name, source instance number, channel, content) and messages
+    (message type, from, to, sequence number, payload). Local states carried by GLOBALSNAPSHOT messages are only
+    referenced as ('state', component id, snapshot id), their content is part of the snapshot already.
+
+    Args:
+        entry: A recorded event, a message or any part of one.
+
+    Returns:
+        The plain value.
+    """
+    if isinstance(entry, Event):
+        return (entry.event, entry.eventsource_componentname, entry.eventsource_componentinstancenumber,
+                entry.fromchannel, encode_entry(entry.eventcontent))
+    if isinstance(entry, GenericMessage):
+        header = entry.header
+        return (header.messagetype, header.messagefrom, header.messageto, header.sequencenumber,
+                encode_entry(entry.payload))
+    if isinstance(entry, (list, tuple)):
+        return tuple(encode_entry(e) for e in entry)
+    if isinstance(entry, dict):
+        return {key: encode_entry(value) for key, value in entry.items()}
+    if hasattr(entry, 'component_id') and hasattr(entry, 'component_state'):
+        return ('state', entry.component_id, getattr(entry, 'snapshot_id', None))
+    return entry
+
+
+def encode_global_state(global_state):
+    """
+    Flattens a global state into the entries of every component and channel.
+
+    Args:
+        global_state (dict): The global state gathered by the initiator. Values are either local states with
+            component_state and chnl_states, as for Chandy-Lamport, or the entries of a component or channel, as for
+            Lai-Yang where channel states are keyed by (channel, receiving component).
+
+    Returns:
+        dict: The encoded entries keyed by component id or (channel, receiving component id).
+    """
+    encoded = dict()
+    for key, value in global_state.items():
+        chnl_states = getattr(value, 'chnl_states', None)
+        if chnl_states is None:
+            encoded[key] = encode_entry(tuple(value))
+            continue
+        encoded[key] = encode_entry(tuple(value.component_state))
+        for chnl, entries in chnl_states.items():
+            encoded[(chnl, key)] = encode_entry(tuple(entries))
+    return encoded
+
+
+def _splice(previous, entries):
+    """
+    Returns the number of entries dropped from the start of previous if entries is the rest of previous followed by
+    new entries, None otherwise.
+    """
+    for drop in range(len(previous) + 1):
+        kept = len(previous) - drop
+        if kept <= len(entries) and (not kept or previous[drop] == entries[0]) and entries[:kept] == previous[drop:]:
+            return drop
+    return None
+
+
+def _diff(previous, state):
+    changes = dict()
+    for key, entries in state.items():
+        old = previous.get(key)
+        if old == entries:
+            continue
+        drop = None if old is None else _splice(old, entries)
+        if drop is None:
+            changes[key] = (_SET, entries)
+        else:
+            changes[key] = (_SPLICE, drop, entries[len(old) - drop:])
+    deleted = tuple(key for key in previous if key not in state)
+    return changes, deleted
+
+
+class SnapshotWriter:
+    """
+    Appends global snapshots to a store from a background thread.
+
+    Opening an existing store appends to it, the first snapshot written is then a full one.
+    """
+
+    def __init__(self, path, checkpoint_every=64):
+        """
+        Args:
+            path (str): The path of the data file, the index is written next to it.
+            checkpoint_every (int, optional): Every how many snapshots a full snapshot is written. Defaults to 64.
+        """
+        if checkpoint_every < 1:
+            raise ValueError("checkpoint_every must be at least 1")
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.error = None
+        self._data = open(path, "ab")
+        self._index = open(index_path(path), "ab")
+        if self._data.tell() == 0:
+            self._data.write(_MAGIC)
+        self._offset = self._data.tell()
+        self._count = self._index.tell() // _INDEX_ENTRY.size
+        self._base = self._count
+        self._previous = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"SnapshotWriter-{os.path.basename(path)}",
+                                        daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, snapshot_id, global_state):
+        """
+        Queues a global snapshot to be written. The local states in it are not copied, they must not change
+        afterwards, as is the case for the recorded views of the event log.
+
+        Args:
+            snapshot_id (Hashable): The identifier of the snapshot, None for algorithms taking one at a time.
+            global_state (dict): The global state gathered by the initiator.
+        """
+        self._queue.put((snapshot_id, dict(global_state)))
+
+    def flush(self):
+        """
+        Waits until the queued snapshots are written.
+
+        Raises:
+            SnapshotStoreError: If a snapshot could not be written.
+        """
+        self._queue.join()
+        if self.error is not None:
+            raise SnapshotStoreError(f"Could not write snapshot to {self.path}") from self.error
+
+    def close(self):
+        """Writes the queued snapshots and closes the store"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._data.close()
+        self._index.close()
+        if self.error is not None:
+            raise SnapshotStoreError(f"Could not write snapshot to {self.path}") from self.error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    self._append(*item)
+                if self._queue.empty():
+                    self._data.flush()
+                    self._index.flush()
+            except Exception as e:
+                self.error = e
+            finally:
+                self._queue.task_done()
+
+    def _append(self, snapshot_id, global_state):
+        state = encode_global_state(global_state)
+        if self._previous is None or (self._count - self._base) % self.checkpoint_every == 0:
+            self._base = self._count
+            record = (snapshot_id, True, {key: (_SET, entries) for key, entries in state.items()}, ())
+        else:
+            record = (snapshot_id, False) + _diff(self._previous, state)
+        data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        self._data.write(data)
+        self._index.write(_INDEX_ENTRY.pack(self._offset, len(data), self._base))
+        self._offset += len(data)
+        self._count += 1
+        self._previous = state
+
+
+def _map(file):
+    size = os.fstat(file.fileno()).st_size
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+
+class SnapshotReader(Sequence):
+    """
+    Random access to the snapshots of a store, as written when the reader was opened.
+
+    Every snapshot is rebuilt as a dict of tuples of encoded entries keyed by component id or (channel, receiving
+    component id). The last rebuilt snapshot is kept, so reading the snapshots in order applies each delta once.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The path of the data file.
+
+        Raises:
+            SnapshotStoreError: If the file is not a snapshot store.
+        """
+        self.path = path
+        self._data_file = open(path, "rb")
+        self._index_file = open(index_path(path), "rb")
+        self._data = _map(self._data_file)
+        self._index = _map(self._index_file)
+        if self._data[:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise SnapshotStoreError(f"{path} is not a snapshot store")
+        self._length = len(self._index) // _INDEX_ENTRY.size
+        self._cached = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._length
+
+    def _record(self, index):
+        offset, length, base = _INDEX_ENTRY.unpack_from(self._index, index * _INDEX_ENTRY.size)
+        return pickle.loads(self._data[offset:offset + length]), base
+
+    def snapshot_id(self, index):
+        """
+        Args:
+            index (int): The number of the snapshot in the store.
+
+        Returns:
+            Hashable: The identifier of the snapshot.
+        """
+        return self._record(index)[0][0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SnapshotReader index out of range")
+
+        base = _INDEX_ENTRY.unpack_from(self._index, index * _INDEX_ENTRY.size)[2]
+        if self._cached is not None and base <= self._cached[0] <= index:
+            start, state = self._cached[0] + 1, dict(self._cached[1])
+        else:
+            start, state = base, dict()
+        for i in range(start, index + 1):
+            (_, full, changes, deleted), _ = self._record(i)
+            if full:
+                state.clear()
+            for key in deleted:
+                del state[key]
+            for key, change in changes.items():
+                if change[0] == _SET:
+                    state[key] = change[1]
+                else:
+                    state[key] = state[key][change[1]:] + change[2]
+        self._cached = (index, state)
+        return dict(state)
+
+    def close(self):
+        for mapped in (self._data, self._index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._data_file.close()
+        self._index_file.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Measures the per-node memory of the neighbor and topology state of OLSRComponent, stored as dicts and in compact
+arrays (set_parameters(compact_state=True)).
+
+Both modes run the same simulation of a random geometric graph. The state of a node is its neighbor set, known
+topology and routing table, together with the MPR selector and the routing engine that keep their own view of the
+first two. Sizes are the deep sizes of these five, averaged over the nodes, with objects they share counted once. The
+NodeIndex shared by a topology in compact mode is charged to its nodes in equal parts. Willingness members, locks and
+callables are shared by every node in both modes and not counted.
+"""
+import argparse
+import os
+import sys
+import threading
+from array import array
+from enum import Enum
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.compact_state import NodeIndex
+from OLSR.simulation import SimulatedTopology
+
+
+class OLSRNode(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.olsr, self.link_layer])
+
+        self.olsr.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    def on_message_from_top(self, eventobj):
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj):
+        self.send_up(eventobj)
+
+
+SHARED = (Enum, NodeIndex, type(threading.Lock()))
+
+
+def deep_size(obj, seen):
+    if id(obj) in seen or isinstance(obj, SHARED) or callable(obj):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif not isinstance(obj, (int, str, array)):
+        if hasattr(obj, '__dict__'):
+            size += deep_size(vars(obj), seen)
+        for name in getattr(type(obj), '__slots__', ()):
+            size += deep_size(getattr(obj, name, None), seen)
+    return size
+
+
+def footprint(G, compact_state, seed, duration):
+    topo = SimulatedTopology(seed=seed)
+    topo.construct_from_graph(G, OLSRNode, GenericChannel)
+    for node in topo.nodes.values():
+        node.olsr.set_parameters(compact_state=compact_state)
+    topo.start()
+    topo.run(duration)
+    topo.exit()
+
+    total = 0
+    for node in topo.nodes.values():
+        olsr = node.olsr
+        # Node identifiers are shared with the rest of the simulation, they are not counted
+        seen = {id(node) for node in G}
+        total += sum(deep_size(state, seen) for state in (
+            olsr.neighbor_set, olsr.known_topology, olsr.routing_table, olsr.mpr_selector, olsr.routing
+        ))
+    node_index = getattr(topo, 'node_index', None)
+    if node_index is not None:
+        total += deep_size(vars(node_index), {id(node) for node in G})
+    return total / len(topo.nodes), sum(len(node.olsr.routing_table) for node in topo.nodes.values()) / len(topo.nodes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[25, 50, 100])
+    parser.add_argument('--radius', type=float, default=0.3)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print("Nodes, routes per node, bytes per node with dicts, bytes per node compact, ratio")
+    for number_of_nodes in args.nodes:
+        G = nx.random_geometric_graph(number_of_nodes, args.radius, seed=args.seed)
+        plain, routes = footprint(G, False, args.seed, args.duration)
+        compact, _ = footprint(G, True, args.seed, args.duration)
+        print(f"{number_of_nodes}, {routes:.1f}, {plain:.0f}, {compact:.0f}, {plain / compact:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
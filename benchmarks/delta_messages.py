@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Compares the control traffic of full and delta HELLO/TC messages on the networks of broadcast.txt (10 to 50 nodes,
+radius 0.4, seed 42) while the nodes move.
+
+The run is simulated at the message level so that it is deterministic: every node sends a HELLO every 2 steps to
+its current neighbors and a TC every 5 steps, which is sent once by the originator and relayed once by each of its
+MPRs to the nodes within two hops. Receivers merge what they get, and a delta that does not apply to what they
+stored (a new neighbor, or a node that came back in range) costs a resync request and makes the next message full.
+Bytes are those of the packed wire format, node ids are the entries of the carried node lists. Resync requests are
+counted as messages but not as bytes.
+"""
+import os
+import sys
+import math
+import random
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.Generics import MessageDestinationIdentifiers
+
+from OLSR.advertisement import Advertiser, merge_advertisement
+from OLSR.enums import AdvertisementStatus, OLSREventTypes, Willingness
+from OLSR.message_types import HelloMessage, TCMessage
+from OLSR.mpr import greedy_mpr
+from OLSR.wire_format import encode
+
+
+def move(positions, rng, speed):
+    for node, (x, y) in positions.items():
+        angle = rng.uniform(0, 2 * math.pi)
+        positions[node] = (min(max(x + speed * math.cos(angle), 0), 1), min(max(y + speed * math.sin(angle), 0), 1))
+
+
+def connect(positions, radius):
+    G = nx.Graph()
+    G.add_nodes_from(positions)
+    for node, (x, y) in positions.items():
+        for other, (u, v) in positions.items():
+            if node < other and (x - u) ** 2 + (y - v) ** 2 <= radius ** 2:
+                G.add_edge(node, other)
+    return G
+
+
+def simulate(number_of_nodes, delta, radius=0.4, seed=42, steps=300, speed=0.01, full_refresh_every=5):
+    rng = random.Random(seed)
+    positions = dict(nx.random_geometric_graph(number_of_nodes, radius, seed=seed).nodes(data='pos'))
+    hello_advertisers = {node: Advertiser('neighbors', 'version', full_refresh_every) for node in positions}
+    tc_advertisers = {node: Advertiser('mpr_selectors', 'ansn', full_refresh_every) for node in positions}
+    # stored[receiver][(kind, sender)] = (set, version, step the entry expires after)
+    stored = {node: {} for node in positions}
+    totals = {'messages': 0, 'bytes': 0, 'node_ids': 0, 'resyncs': 0}
+
+    step = 0
+
+    def deliver(message, receivers, kind, set_key, version_key, advertiser, hold_time, copies=1):
+        data = encode(message)
+        payload = message.payload
+        totals['messages'] += copies
+        totals['bytes'] += copies * len(data)
+        carried = len(payload[set_key]) if set_key in payload else len(payload['added']) + len(payload['removed'])
+        totals['node_ids'] += copies * carried
+        sender = message.header.messagefrom
+        for receiver in receivers:
+            stored_set, stored_version, deadline = stored[receiver].get((kind, sender), (None, None, None))
+            status, merged, version = merge_advertisement(payload, set_key, version_key, stored_set, stored_version)
+            if status == AdvertisementStatus.GAP:
+                totals['resyncs'] += 1
+                advertiser.full_pending = True
+                if stored_set is not None:
+                    stored[receiver][(kind, sender)] = (stored_set, stored_version, deadline)
+            else:
+                stored[receiver][(kind, sender)] = (merged, version, step + hold_time)
+
+    for step in range(steps):
+        move(positions, rng, speed)
+        G = connect(positions, radius)
+        for node in G.nodes:
+            # Entries expire after three intervals without a message, as the neighbor and topology hold times
+            for key, (_, _, deadline) in list(stored[node].items()):
+                if deadline < step:
+                    del stored[node][key]
+
+        if step % 2 == 0:
+            for node in G.nodes:
+                payload = hello_advertisers[node].advertise(G.neighbors(node), delta)
+                message = HelloMessage(
+                    message_from=node,
+                    message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+                    payload={**payload, 'willingness': Willingness.WILL_DEFAULT, 'validity': 6},
+                    nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+                )
+                deliver(message, list(G.neighbors(node)), OLSREventTypes.HELLO, 'neighbors', 'version',
+                        hello_advertisers[node], hold_time=6)
+
+        if step % 5 == 0:
+            for node in G.nodes:
+                neighbor_set = {
+                    neighbor: {'neighbors': set(G.neighbors(neighbor)), 'willingness': Willingness.WILL_DEFAULT}
+                    for neighbor in G.neighbors(node)
+                }
+                mpr_set = greedy_mpr(node, neighbor_set)
+                payload = tc_advertisers[node].advertise(mpr_set, delta)
+                message = TCMessage(
+                    message_from=node,
+                    payload={**payload, 'validity': 15},
+                    message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+                    sequencenumber=step,
+                    nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+                )
+                receivers = [other for other in nx.single_source_shortest_path_length(G, node, cutoff=2) if other != node]
+                deliver(message, receivers, OLSREventTypes.TC, 'mpr_selectors', 'ansn', tc_advertisers[node],
+                        hold_time=15, copies=1 + len(mpr_set))
+    return totals
+
+
+def main(sizes=(10, 20, 30, 40, 50)):
+    print("Number of nodes, full messages, delta messages, resync requests, full bytes, delta bytes, byte reduction, "
+          "full node ids, delta node ids, node id reduction")
+    for number_of_nodes in sizes:
+        full = simulate(number_of_nodes, delta=False)
+        delta = simulate(number_of_nodes, delta=True)
+        control_bytes = 1 - delta['bytes'] / full['bytes']
+        node_ids = 1 - delta['node_ids'] / full['node_ids']
+        print(f"{number_of_nodes}, {full['messages']}, {delta['messages'] + delta['resyncs']}, {delta['resyncs']}, "
+              f"{full['bytes']}, {delta['bytes']}, {control_bytes:.1%}, "
+              f"{full['node_ids']}, {delta['node_ids']}, {node_ids:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measures how many transit packets per second OLSRComponent.on_else forwards on a single node.
+
+The node has a routing table to 50 destinations and hands forwarded packets to a sink instead of a link layer, so
+only the forwarding itself is measured. The previous implementation, which built a new Message and Event for every
+forwarded packet, is reproduced below for comparison. Both guard their debug line the same way, so they differ only
+in the allocations.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from adhoccomputing.Generics import ConnectorTypes, Event, EventTypes, logger
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.message_types import Message
+
+
+class Sink:
+    componentname = "Sink"
+    componentinstancenumber = 1
+
+    def __init__(self):
+        self.received = 0
+
+    def trigger_event(self, eventobj):
+        self.received += 1
+
+
+def allocating_on_else(self, eventobj):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{self.componentname}-{self.componentinstancenumber} RECEIVED ELSE {str(eventobj)}")
+    data_packet = eventobj.eventcontent
+    destination = data_packet.header.messageto
+    if self.routing_dirty:
+        self.calculate_routing_table()
+    if destination == self.componentinstancenumber:
+        self.send_up(eventobj)
+    elif destination in self.routing_table:
+        next_hop = self.routing_table[destination]
+        forwarded_packet = Message(
+            message_from=data_packet.header.messagefrom,
+            message_to=destination,
+            payload=data_packet.payload,
+            nexthop=next_hop,
+            sequencenumber=data_packet.header.sequencenumber + 1
+        )
+        self.send_down(Event(self, EventTypes.MFRT, forwarded_packet))
+
+
+def rate(forward, number_of_packets, number_of_destinations=50, repeat=5):
+    component = OLSRComponent("OLSR", 0)
+    component.routing_table = {destination: 1 + destination % 4 for destination in range(1, number_of_destinations + 1)}
+    sink = Sink()
+    component.connect_me_to_component(ConnectorTypes.DOWN, sink)
+
+    best = float('inf')
+    for _ in range(repeat):
+        events = [
+            Event(None, EventTypes.MFRB, Message(100, 1 + index % number_of_destinations, "payload", sequencenumber=1))
+            for index in range(number_of_packets)
+        ]
+        start = time.perf_counter()
+        for event in events:
+            forward(component, event)
+        best = min(best, time.perf_counter() - start)
+    assert sink.received == repeat * number_of_packets
+    return number_of_packets / best
+
+
+def main(number_of_packets=20000):
+    before = rate(allocating_on_else, number_of_packets)
+    after = rate(OLSRComponent.on_else, number_of_packets)
+    print("Path, packets/s per node")
+    print(f"Allocating, {before:.0f}")
+    print(f"In place, {after:.0f}")
+    print(f"Speedup, {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
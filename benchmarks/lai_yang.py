@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compares the recording Lai-Yang snapshot with its counting variant under sustained traffic.
+
+Every node of a random geometric graph broadcasts an application message every --interval seconds of virtual time
+for --duration seconds, then node 0 takes a snapshot while the traffic goes on. The memory traced during the run
+and the wall-clock time from the snapshot request until node 0 holds the state of every component are reported for
+LaiYangComponentModel, which records the messages it sends and the sequence numbers it receives on each channel,
+and for LaiYangCountingComponentModel, which only counts them. The snapshot is the first one, so the recording
+model still holds every message sent since the start: it only truncates its log below what its receivers reported
+in their local states.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericMessage, GenericMessageHeader
+from adhoccomputing.Generics import Event, EventTypes
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.simulation import SimulatedTopology
+from Snapshot.LaiYangSnapshot import LaiYangComponentModel, LaiYangCountingComponentModel
+from Snapshot.Snapshot import SnapshotEventTypes
+
+
+def connected_graph(number_of_nodes, radius, seed):
+    # The snapshot only reaches the component of the initiator
+    while not nx.is_connected(G := nx.random_geometric_graph(number_of_nodes, radius, seed=seed)):
+        seed += 1
+    return G
+
+
+def channel_memory(node, seen):
+    # What each model keeps about its channels: the messages sent and the numbers received, or the counters
+    size = sys.getsizeof(node.chnl_recv)
+    for window in node.chnl_recv.values():
+        size += sys.getsizeof(window) + sys.getsizeof(window.ahead)
+    # One reference per message in the segments of the log
+    size += 8 * len(node.sent_log)
+    for message in node.sent_log:
+        if id(message) not in seen:
+            seen.add(id(message))
+            size += sys.getsizeof(message)
+    for counter in (getattr(node, 'white_sent', Counter()), getattr(node, 'white_recv', Counter())):
+        size += sys.getsizeof(counter)
+    return size
+
+
+def run(nodetype, G, duration, interval, seed):
+    topo = SimulatedTopology(seed=seed)
+    topo.construct_from_graph(G, nodetype, GenericChannel)
+    topo.start()
+
+    def send(node_id):
+        node = topo.nodes[node_id]
+        node.send_msg(Event(node, EventTypes.MFRT, GenericMessage(GenericMessageHeader("APP", node_id, None), None)))
+
+    for node_id in topo.nodes:
+        topo.scheduler.call_every(interval, lambda node_id=node_id: send(node_id))
+
+    tracemalloc.start()
+    topo.run(duration)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seen = set()
+    bookkeeping = sum(channel_memory(node, seen) for node in topo.nodes.values())
+
+    initiator = topo.nodes[0]
+    start = time.perf_counter()
+    initiator.send_self(Event(initiator, SnapshotEventTypes.TAKESNAPSHOT, None))
+    collected = 0
+    deadline = topo.now + 10
+    while collected < len(G) and topo.now < deadline:
+        topo.run(interval)
+        collected = sum(1 for key in initiator.global_state if not isinstance(key, tuple))
+    latency = time.perf_counter() - start
+    in_transit = sum(len(messages) for key, messages in initiator.global_state.items() if isinstance(key, tuple))
+    topo.exit()
+    return memory, bookkeeping, latency, in_transit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=30)
+    parser.add_argument('--radius', type=float, default=0.3)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    G = connected_graph(args.nodes, args.radius, args.seed)
+    messages = args.nodes * int(args.duration / args.interval)
+    print(f"{args.nodes} nodes, {len(G.edges)} channels, {messages} messages broadcast before the snapshot")
+    print("Model, traced memory (MB), channel records (MB), snapshot latency (s), messages in transit")
+    for nodetype in (LaiYangComponentModel, LaiYangCountingComponentModel):
+        memory, bookkeeping, latency, in_transit = run(nodetype, G, args.duration, args.interval, args.seed)
+        print(f"{nodetype.__name__}, {memory / 2 ** 20:.1f}, {bookkeeping / 2 ** 20:.2f}, {latency:.3f}, {in_transit}")
+
+
+if __name__ == "__main__":
+    main()
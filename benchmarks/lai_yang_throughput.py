@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Measures the messages per second a Lai-Yang component sends and receives, with and without a snapshot taken.
+
+Two components joined by a channel exchange --messages application messages. The channel is bypassed: every message
+a component sends down is handed to the other component in a new event, copying the eventid as GenericChannel does,
+so only the cost of the snapshot components themselves is measured. With snapshotting, the sender takes a snapshot
+before the messages are sent, so every message is red and both components have recorded their state.
+
+LaiYangComponentModel and LaiYangCountingComponentModel carry the color of a message in the eventid of its event.
+The previous model, which wrapped every content in a (content, post_snapshot) tuple and unpacked it on receipt, and
+recorded every message sent and received, is reproduced below for comparison.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericMessage, GenericMessageHeader
+from adhoccomputing.Generics import Event, EventTypes
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.simulation import SimulatedTopology
+from Snapshot.LaiYangSnapshot import LaiYangComponentModel, LaiYangCountingComponentModel, LaiYangState
+from Snapshot.Snapshot import SnapshotMessageTypes
+
+
+class TupleWrappingLaiYangComponentModel(LaiYangComponentModel):
+    def __init__(self, componentname, componentinstancenumber, context=None, configurationparameters=None, num_worker_threads=1, topology=None):
+        super().__init__(componentname, componentinstancenumber, context, configurationparameters, num_worker_threads, topology)
+        self.chnl_sent = defaultdict(list)
+        self.chnl_recv = defaultdict(list)
+
+    def handle_snapshot(self):
+        self.state = LaiYangState(self.componentinstancenumber, self.record_events(),
+                                  {c: list(self.chnl_recv[c]) for c in self.chnls},
+                                  {c: list(self.chnl_sent[c]) for c in self.chnls})
+        self.gsu_recv(self.state)
+
+    def report_and_save_channel_state(self, channel, recv, sent):
+        if not set(recv).issubset(set(sent)):
+            raise Exception("Not a consistent global state")
+        self.global_state[channel] = list(set(sent) - set(recv))
+
+    def release_sent(self, state):
+        # Every message sent was kept in chnl_sent
+        pass
+
+    def send_msg(self, event):
+        event.eventcontent = (event.eventcontent, self.state is not None)
+        for c in self.chnls:
+            self.chnl_sent[c].append(event.eventcontent)
+        self.send_down(event)
+
+    def msg_recv(self, event):
+        content = event.eventcontent
+        if type(content) is not tuple or len(content) != 2:
+            raise Exception("Malformed message")
+        act_cntnt, post_snapshot = content
+        event.eventcontent = act_cntnt
+        if self.state is None and post_snapshot:
+            self.handle_snapshot()
+        self.chnl_recv[self.channel_of(event)].append(content)
+        if type(act_cntnt) != GenericMessage or\
+           type(header := act_cntnt.header) != GenericMessageHeader or\
+               header.messagetype != SnapshotMessageTypes.GLOBALSNAPSHOT:
+            return event
+        self.gsu_recv(act_cntnt.payload)
+        return event
+
+
+def connect(sender, receiver, channel):
+    def send_down(eventobj):
+        delivered = Event(None, EventTypes.MFRB, eventobj.eventcontent, fromchannel=channel, eventid=eventobj.eventid,
+                          eventsource_componentname=sender.componentname,
+                          eventsource_componentinstancenumber=sender.componentinstancenumber)
+        SimulatedTopology.dispatch(receiver, delivered)
+
+    sender.send_down = send_down
+
+
+def run(nodetype, messages, snapshot):
+    topo = SimulatedTopology()
+    topo.construct_from_graph(nx.path_graph(2), nodetype, GenericChannel)
+    sender, receiver = topo.nodes[0], topo.nodes[1]
+    channel = next(iter(topo.channels))
+    connect(sender, receiver, channel)
+    connect(receiver, sender, channel)
+    if snapshot:
+        sender.take_snapshot(None)
+
+    start = time.perf_counter()
+    for i in range(messages):
+        sender.send_msg(Event(sender, EventTypes.MFRT, GenericMessage(GenericMessageHeader("APP", 0, 1), i)))
+    elapsed = time.perf_counter() - start
+    topo.exit()
+    return messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each model, the best one is reported")
+    args = parser.parse_args()
+
+    print("Model, messages per second without snapshot, messages per second with snapshot")
+    for nodetype in (TupleWrappingLaiYangComponentModel, LaiYangComponentModel, LaiYangCountingComponentModel):
+        white = max(run(nodetype, args.messages, False) for _ in range(args.repeat))
+        red = max(run(nodetype, args.messages, True) for _ in range(args.repeat))
+        print(f"{nodetype.__name__}, {white:.0f}, {red:.0f}")
+
+
+if __name__ == "__main__":
+    main()
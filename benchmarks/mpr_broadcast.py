@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Compares broadcasting application data over the MPRs of OLSR with ControlledFlooding.
+
+For each node count, a connected random geometric graph is simulated in virtual time with each broadcast service:
+ControlledFlooding, where every node relays every broadcast once, and MPRBroadcastComponent next to an
+OLSRComponent, where only the MPRs selected by the sender of a copy relay it. After --warm-up seconds, which OLSR
+needs to select its MPRs, node 0 broadcasts once a second --broadcasts times.
+
+Messages are counted at the boundary of each node, once when a node sends a message and once when it receives one,
+as broadcast/test.py counts them. Data messages are the broadcasts, control messages the HELLO and TC messages sent
+by OLSR while the broadcasts were made. The delivery ratio is the share of the other nodes that received each
+broadcast.
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.DistributedAlgorithms.Broadcasting.Broadcasting import BroadcastingEventTypes, ControlledFlooding
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Generics import Event, EventTypes
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.broadcast import MPRBroadcastComponent
+from OLSR.enums import OLSREventTypes
+from OLSR.simulation import SimulatedTopology
+
+CONTROL_TYPES = (OLSREventTypes.HELLO, OLSREventTypes.TC, OLSREventTypes.RESYNC)
+
+
+class CountingNode(GenericModel):
+    def count(self, eventobj):
+        message = eventobj.eventcontent.payload
+        messagetype = getattr(getattr(message, 'header', None), 'messagetype', None)
+        if self.topology.counting:
+            self.topology.message_counts['control' if messagetype in CONTROL_TYPES else 'data'] += 1
+
+    def on_message_from_top(self, eventobj: Event):
+        self.count(eventobj)
+        eventobj.event = EventTypes.MFRT
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj: Event):
+        self.count(eventobj)
+        eventobj.event = EventTypes.MFRB
+        self.send_up(eventobj)
+
+
+class DataSink(GenericModel):
+    def on_message_from_bottom(self, eventobj: Event):
+        self.topology.delivered += 1
+
+
+class FloodingNode(CountingNode):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.application = DataSink("DataSink", self.componentinstancenumber, topology=self.topology)
+        self.broadcast = ControlledFlooding("ControlledFlooding", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.application, self.broadcast, self.link_layer])
+
+        self.application.D(self.broadcast)
+        self.broadcast.U(self.application)
+        self.broadcast.D(self.link_layer)
+        self.link_layer.U(self.broadcast)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    def send_broadcast(self, data):
+        self.broadcast.trigger_event(Event(None, BroadcastingEventTypes.BROADCAST, data))
+
+
+class MPRBroadcastNode(CountingNode):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.application = DataSink("DataSink", self.componentinstancenumber, topology=self.topology)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.broadcast = MPRBroadcastComponent("MPRBroadcast", self.componentinstancenumber, topology=self.topology,
+                                               olsr=self.olsr)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.application, self.olsr, self.broadcast, self.link_layer])
+
+        self.application.D(self.broadcast)
+        self.broadcast.U(self.application)
+        self.olsr.D(self.link_layer)
+        self.broadcast.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.U(self.broadcast)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    @property
+    def selected_as_mpr(self):
+        return self.olsr.selected_as_mpr
+
+    def send_broadcast(self, data):
+        self.broadcast.trigger_event(Event(None, EventTypes.MFRT, data))
+
+
+def connected_graph(number_of_nodes, radius, seed):
+    while not nx.is_connected(G := nx.random_geometric_graph(number_of_nodes, radius, seed=seed)):
+        seed += 1
+    return G
+
+
+def run(nodetype, G, seed, warm_up, broadcasts):
+    topo = SimulatedTopology(seed=seed)
+    topo.message_counts = Counter()
+    topo.delivered = 0
+    topo.counting = False
+    topo.construct_from_graph(G, nodetype, GenericChannel)
+    topo.start()
+    topo.run(warm_up)
+
+    topo.counting = True
+    for i in range(broadcasts):
+        topo.nodes[0].send_broadcast(f"BROADCAST MESSAGE {i}")
+        topo.run(1)
+    topo.exit()
+    return topo.message_counts['data'], topo.message_counts['control'], topo.delivered / (broadcasts * (len(G) - 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, nargs='+', default=[10, 20, 30, 40, 50])
+    parser.add_argument('--radius', type=float, default=0.4)
+    parser.add_argument('--broadcasts', type=int, default=5)
+    parser.add_argument('--warm-up', type=float, default=12)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("Nodes, Service, data messages, control messages, delivery ratio")
+    for number_of_nodes in args.nodes:
+        G = connected_graph(number_of_nodes, args.radius, args.seed)
+        for name, nodetype in (('ControlledFlooding', FloodingNode), ('MPRBroadcast', MPRBroadcastNode)):
+            data, control, delivery_ratio = run(nodetype, G, args.seed, args.warm_up, args.broadcasts)
+            print(f"{number_of_nodes}, {name}, {data}, {control}, {delivery_ratio:.3f}")
+
+
+if __name__ == "__main__":
+    main()
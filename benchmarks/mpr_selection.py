@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compares the incremental MPRSelector with the from-scratch greedy MPR selection.
+
+Every node of a dense random geometric graph receives a HELLO from each neighbor and then sends a TC,
+i.e. selects its MPRs, once per round. Between rounds a few links flip to emulate mobility.
+"""
+import os
+import sys
+import random
+import time
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+
+from OLSR.enums import Willingness
+from OLSR.mpr import MPRSelector, greedy_mpr
+
+
+def perturb(G, rng, number_of_flips):
+    nodes = list(G.nodes)
+    for _ in range(number_of_flips):
+        u, v = rng.sample(nodes, 2)
+        if G.has_edge(u, v):
+            G.remove_edge(u, v)
+        else:
+            G.add_edge(u, v)
+
+
+def run(G, rounds, number_of_flips, seed, incremental):
+    rng = random.Random(seed)
+    G = G.copy()
+    neighbor_sets = {node: {} for node in G.nodes}
+    selectors = {node: MPRSelector(node) for node in G.nodes}
+    results = []
+
+    hello_time = 0.0
+    select_time = 0.0
+    for _ in range(rounds):
+        perturb(G, rng, number_of_flips)
+        advertised = {node: set(G.neighbors(node)) for node in G.nodes}
+
+        for node in G.nodes:
+            neighbor_set = neighbor_sets[node]
+            selector = selectors[node]
+            lost = [neighbor for neighbor in neighbor_set if not G.has_edge(node, neighbor)]
+
+            start = time.perf_counter()
+            for neighbor in lost:
+                del neighbor_set[neighbor]
+                if incremental:
+                    selector.remove_neighbor(neighbor)
+            for neighbor in G.neighbors(node):
+                neighbor_set[neighbor] = {'neighbors': advertised[neighbor], 'willingness': Willingness.WILL_DEFAULT}
+                if incremental:
+                    selector.update_neighbor(neighbor, advertised[neighbor], Willingness.WILL_DEFAULT)
+            hello_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            if incremental:
+                results.append(selector.select())
+            else:
+                results.append(greedy_mpr(node, neighbor_set))
+            select_time += time.perf_counter() - start
+
+    return hello_time, select_time, results
+
+
+def main(number_of_nodes=250, radius=0.2, rounds=10, seed=42):
+    G = nx.random_geometric_graph(number_of_nodes, radius, seed=seed)
+    average_degree = 2 * G.number_of_edges() / number_of_nodes
+    number_of_tcs = rounds * number_of_nodes
+
+    print(f"Nodes: {number_of_nodes}, average degree: {average_degree:.1f}, rounds: {rounds}")
+    print("Link flips per round, greedy us/TC, incremental us/TC, end-to-end speedup, incremental HELLO overhead us/TC")
+    for number_of_flips in (0, 1, 5, 25):
+        greedy_hello_time, greedy_time, greedy_results = run(G, rounds, number_of_flips, seed, incremental=False)
+        hello_time, incremental_time, incremental_results = run(G, rounds, number_of_flips, seed, incremental=True)
+
+        if greedy_results != incremental_results:
+            raise Exception("Incremental MPR selection diverged from the greedy selection")
+
+        greedy_total = greedy_time + greedy_hello_time
+        incremental_total = incremental_time + hello_time
+        print(f"{number_of_flips}, {1e6 * greedy_time / number_of_tcs:.1f}, {1e6 * incremental_time / number_of_tcs:.1f}, "
+              f"{greedy_total / incremental_total:.1f}x, {1e6 * (hello_time - greedy_hello_time) / number_of_tcs:.1f}")
+
+
+if __name__ == "__main__":
+    main()
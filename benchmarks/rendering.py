@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Measures how long TopologyStateSaver.produce_gif takes for a 100-node topology with 500 saved states.
+
+The previous pipeline, which computed the Kamada-Kawai layout and drew the whole figure with nx.draw for every frame,
+wrote each frame to plots/ and read them all back to build the GIF, is reproduced below. It is timed on the first
+--old-frames frames only and extrapolated, since it takes minutes for all of them.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+
+from OLSR.helpers import TopologyStateSaver
+
+
+def per_frame_gif(graphs, states, directory):
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    plt.switch_backend('agg')
+    paths = []
+    for graph, state in zip(graphs, states):
+        fig, ax = plt.subplots(figsize=(8, 6))
+        colors = ['blue' if state.get(node, False) else 'red' for node in graph.nodes]
+        for node in graph.nodes:
+            if colors[list(graph.nodes).index(node)] == 'blue':
+                for neighbor in graph.neighbors(node):
+                    if colors[list(graph.nodes).index(neighbor)] == 'red':
+                        colors[list(graph.nodes).index(neighbor)] = 'green'
+        pos = nx.kamada_kawai_layout(graph)
+        nx.draw(graph, pos, with_labels=True, font_weight='bold', ax=ax, node_color=colors)
+        ax.set_title("Topology Plot")
+        plt.tight_layout()
+        paths.append(os.path.join(directory, f'{len(paths) + 1}.png'))
+        plt.savefig(paths[-1])
+        plt.close(fig)
+    images = [Image.open(path) for path in paths]
+    images[0].save(os.path.join(directory, 'animation.gif'), save_all=True, append_images=images[1:], optimize=False,
+                   duration=500, loop=0)
+
+
+def saved_states(number_of_nodes, number_of_states, seed):
+    rng = random.Random(seed)
+    G = nx.random_geometric_graph(number_of_nodes, 0.2, seed=seed)
+    topology = SimpleNamespace(G=G, nodes={node: SimpleNamespace(selected_as_mpr=False) for node in G})
+    saver = TopologyStateSaver()
+    for step in range(number_of_states):
+        node = rng.randrange(number_of_nodes)
+        topology.nodes[node].selected_as_mpr = not topology.nodes[node].selected_as_mpr
+        saver.save_state(topology, step, {node: topology.nodes[node].selected_as_mpr})
+    return saver
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=100)
+    parser.add_argument('--states', type=int, default=500)
+    parser.add_argument('--old-frames', type=int, default=10)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    saver = saved_states(args.nodes, args.states, seed=1)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        per_frame_gif(saver.graphs[:args.old_frames], saver.states[:args.old_frames], directory)
+        old = (time.perf_counter() - start) * args.states / args.old_frames
+
+        start = time.perf_counter()
+        saver.produce_gif(os.path.join(directory, 'streamed.gif'), processes=args.processes)
+        new = time.perf_counter() - start
+
+    print(f"Pipeline, seconds for {args.states} frames of {args.nodes} nodes")
+    print(f"Per frame (extrapolated from {args.old_frames}), {old:.1f}")
+    print(f"Streamed, {new:.1f}")
+    print(f"Speedup, {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Scalability benchmark of ControlledFlooding and OLSR.
+
+Every run builds a random geometric graph for a node count, radius and seed and simulates it in virtual time (see
+OLSR.simulation), so runs are reproducible and as fast as the CPU allows. Messages are counted where
+broadcast/test.py counts them, at the boundary of each node, once when a node sends a message and once when a node
+receives one.
+
+- ControlledFlooding: node 0 floods a broadcast every second. All its messages are data messages.
+- OLSR: nodes exchange HELLO and TC (control messages), and after the warm-up every node sends a data packet to a
+  random node of its connected component every second (data messages). OLSR has converged once the routing tables of
+  all nodes follow shortest paths on the graph. The ConvergenceDetector of the state saver of the topology, enabled for
+  these runs, checks this at every change of an MPR status or a routing table, so the convergence time is exact.
+
+Each configuration is repeated for every seed. The summary holds the mean and the 95% confidence interval of every
+metric, and is written as CSV and JSON. A summary saved as baseline can be compared with a later one, regressions
+are costs whose mean grew by more than the tolerance and whose confidence intervals do not overlap, and delivery
+ratios that fell by more than the tolerance.
+
+--flood-table writes, for the graphs of broadcast.txt, the messages each flood originated by node 0 costs: a
+broadcast of ControlledFlooding, relayed by every node, and a TC of OLSR, relayed by the MPRs only. The table is kept
+with the benchmarks, in benchmarks/floods.txt. broadcast.txt itself holds the results of the original threaded
+experiment and is not regenerated.
+
+    python benchmarks/scalability.py --seeds 1 2 3 4 5 --json results.json --csv results.csv
+    python benchmarks/scalability.py --seeds 1 2 3 4 5 --baseline results.json
+    python benchmarks/scalability.py --flood-table benchmarks/floods.txt
+"""
+import os
+import sys
+import csv
+import json
+import math
+import logging
+import time
+import argparse
+import statistics
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.DistributedAlgorithms.Broadcasting.Broadcasting import (BroadcastingEventTypes,
+                                                                          BroadcastingMessageTypes, ControlledFlooding)
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Generics import Event, EventTypes, setAHCLogLevel
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.enums import OLSREventTypes
+from OLSR.message_types import Message
+from OLSR.simulation import SimulatedTopology
+from OLSR.versioned_graph import VersionedGraph
+
+PROTOCOLS = ('flooding', 'olsr')
+METRICS = ('control_messages', 'data_messages', 'convergence_time', 'delivery_ratio', 'cpu_time', 'peak_memory')
+# Metrics for which a higher value is worse
+COSTS = ('control_messages', 'data_messages', 'convergence_time', 'cpu_time', 'peak_memory')
+# Metrics for which a lower value is worse
+BENEFITS = ('delivery_ratio',)
+CONTROL_TYPES = (OLSREventTypes.HELLO, OLSREventTypes.TC, OLSREventTypes.RESYNC)
+# Messages flooded through the network, the broadcasts of ControlledFlooding and the TCs of OLSR
+FLOOD_TYPES = (BroadcastingMessageTypes.SIMPLEFLOOD, OLSREventTypes.TC)
+
+# Two-sided 95% quantiles of Student's t distribution by degrees of freedom, 1.96 beyond the table
+T_QUANTILES = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+               2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+               2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+class CountingNode(GenericModel):
+    """
+    A node that counts the messages crossing its boundary in the message_counts of its topology.
+
+    The messages of the floods originated by node 0 are also counted as flood_messages, and the sequence numbers of
+    these floods kept in the floods of the topology.
+    """
+
+    def count(self, eventobj):
+        message = eventobj.eventcontent.payload
+        header = getattr(message, 'header', None)
+        messagetype = getattr(header, 'messagetype', None)
+        if messagetype in FLOOD_TYPES and header.messagefrom == 0:
+            self.topology.message_counts['flood_messages'] += 1
+            self.topology.floods.add(header.sequencenumber)
+        if messagetype in CONTROL_TYPES:
+            self.topology.message_counts['control_messages'] += 1
+            self.topology.message_counts[messagetype] += 1
+        else:
+            self.topology.message_counts['data_messages'] += 1
+
+    def on_message_from_top(self, eventobj: Event):
+        self.count(eventobj)
+        eventobj.event = EventTypes.MFRT
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj: Event):
+        self.count(eventobj)
+        eventobj.event = EventTypes.MFRB
+        self.send_up(eventobj)
+
+
+class DataSink(GenericModel):
+    def on_message_from_bottom(self, eventobj: Event):
+        self.topology.delivered += 1
+
+
+class FloodingNode(CountingNode):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.application = DataSink("DataSink", self.componentinstancenumber, topology=self.topology)
+        self.flooding = ControlledFlooding("ControlledFlooding", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.application, self.flooding, self.link_layer])
+
+        self.application.D(self.flooding)
+        self.flooding.U(self.application)
+        self.flooding.D(self.link_layer)
+        self.link_layer.U(self.flooding)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+
+class OLSRNode(CountingNode):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.application = DataSink("DataSink", self.componentinstancenumber, topology=self.topology)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.application, self.olsr, self.link_layer])
+
+        self.application.D(self.olsr)
+        self.olsr.U(self.application)
+        self.olsr.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    @property
+    def selected_as_mpr(self):
+        return self.olsr.selected_as_mpr
+
+    @property
+    def routing_table(self):
+        return self.olsr.routing_table
+
+
+def run_flooding(G, seed, duration):
+    topo = SimulatedTopology(seed=seed)
+    topo.message_counts = Counter()
+    topo.floods = set()
+    topo.delivered = 0
+    topo.construct_from_graph(G, FloodingNode, GenericChannel)
+    topo.start()
+
+    def broadcast():
+        topo.nodes[0].flooding.trigger_event(Event(None, BroadcastingEventTypes.BROADCAST, "BROADCAST MESSAGE"))
+
+    topo.scheduler.call_every(1, broadcast)
+    topo.run(duration)
+    topo.exit()
+    return {**topo.message_counts, 'floods': len(topo.floods), 'convergence_time': None, 'delivery_ratio': None}
+
+
+def run_olsr(G, seed, duration, warm_up):
+    topo = SimulatedTopology(seed=seed)
+    topo.message_counts = Counter()
+    topo.floods = set()
+    topo.delivered = 0
+    # Detection only finds the links changed in O(1) on a VersionedGraph
+    topo.construct_from_graph(VersionedGraph(G), OLSRNode, GenericChannel)
+    topo.state_saver.detect_convergence = True
+    distances = dict(nx.all_pairs_shortest_path_length(G))
+    rng = topo.scheduler.random
+    sent = 0
+
+    def send_data():
+        nonlocal sent
+        for node in G.nodes:
+            destinations = [other for other in distances[node] if other != node]
+            if destinations:
+                message = Message(node, rng.choice(destinations), "DATA", sequencenumber=0)
+                topo.nodes[node].olsr.trigger_event(Event(None, EventTypes.MFRB, message))
+                sent += 1
+
+    topo.start()
+    topo.run(warm_up)
+    sender = topo.scheduler.call_every(1, send_data)
+    topo.run(duration - warm_up)
+    sender.cancel()
+    # Let the packets in flight arrive before counting the deliveries
+    topo.run(1)
+    topo.exit()
+    return {
+        **topo.message_counts,
+        'floods': len(topo.floods),
+        'convergence_time': topo.state_saver.detector.routing_time,
+        'delivery_ratio': topo.delivered / sent if sent else None,
+    }
+
+
+def run(protocol, number_of_nodes, radius, seed, duration, warm_up):
+    """
+    Runs one configuration and returns its metrics.
+    """
+    G = nx.random_geometric_graph(number_of_nodes, radius, seed=seed)
+    tracemalloc.start()
+    start = time.process_time()
+    if protocol == 'flooding':
+        metrics = run_flooding(G, seed, duration)
+    else:
+        metrics = run_olsr(G, seed, duration, warm_up)
+    cpu_time = time.process_time() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'control_messages': metrics.get('control_messages', 0),
+        'data_messages': metrics.get('data_messages', 0),
+        'convergence_time': metrics['convergence_time'],
+        'delivery_ratio': metrics['delivery_ratio'],
+        'cpu_time': cpu_time,
+        'peak_memory': peak_memory,
+        'flood_messages': metrics.get('flood_messages', 0),
+        'floods': metrics['floods'],
+    }
+
+
+def confidence_interval(values):
+    """
+    Returns the mean of the values and the half width of its 95% confidence interval.
+    """
+    values = [value for value in values if value is not None]
+    if not values:
+        return None, None
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, 0.0
+    quantile = T_QUANTILES[len(values) - 2] if len(values) - 2 < len(T_QUANTILES) else 1.96
+    return mean, quantile * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def sweep(protocols, node_counts, radii, seeds, duration, warm_up):
+    """
+    Runs every configuration for every seed and summarizes the metrics.
+
+    Returns:
+        list: One summary per protocol, node count and radius.
+    """
+    summaries = []
+    for protocol in protocols:
+        for number_of_nodes in node_counts:
+            for radius in radii:
+                runs = [run(protocol, number_of_nodes, radius, seed, duration, warm_up) for seed in seeds]
+                summary = {'protocol': protocol, 'nodes': number_of_nodes, 'radius': radius, 'runs': len(runs)}
+                for metric in METRICS:
+                    summary[metric], summary[metric + '_ci'] = confidence_interval([r[metric] for r in runs])
+                summaries.append(summary)
+                print(f"{protocol}, {number_of_nodes} nodes, radius {radius}: "
+                      f"{summary['control_messages']:.0f} control, {summary['data_messages']:.0f} data messages, "
+                      f"{summary['cpu_time']:.2f} s CPU", file=sys.stderr)
+    return summaries
+
+
+def compare(summaries, baseline, tolerance):
+    """
+    Compares summaries with a baseline.
+
+    Returns:
+        list: A description of every regression.
+    """
+    baseline = {(b['protocol'], b['nodes'], b['radius']): b for b in baseline}
+    regressions = []
+    for summary in summaries:
+        reference = baseline.get((summary['protocol'], summary['nodes'], summary['radius']))
+        if reference is None:
+            continue
+        for metric in COSTS + BENEFITS:
+            mean, ci = summary[metric], summary[metric + '_ci']
+            reference_mean, reference_ci = reference.get(metric), reference.get(metric + '_ci')
+            if mean is None or reference_mean is None:
+                continue
+            if metric in COSTS:
+                regressed = mean > reference_mean * (1 + tolerance) and mean - ci > reference_mean + reference_ci
+            else:
+                # A ratio already, so the tolerance is the drop tolerated
+                regressed = mean < reference_mean - tolerance
+            if regressed:
+                regressions.append(f"{summary['protocol']}, {summary['nodes']} nodes, radius {summary['radius']}: "
+                                   f"{metric} {reference_mean:.4g} -> {mean:.4g}")
+    return regressions
+
+
+def write_csv(summaries, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summaries[0]))
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+def write_flood_table(path, node_counts, radius=0.4, seed=42, duration=20.5):
+    """
+    Writes the messages per flood originated by node 0 with ControlledFlooding and with OLSR.
+
+    Both protocols run for the same seconds on the graphs of broadcast.txt, and both columns count the same thing:
+    the messages of the floods of node 0, where they cross the boundary of a node, divided by the number of these
+    floods. Node 0 floods a broadcast every second with ControlledFlooding and a TC every tc_interval with OLSR. The
+    run ends half a second after a whole second, so every flood started has ended.
+    """
+    with open(path, 'w') as f:
+        f.write("Number of nodes, Messages per broadcast of node 0 with flooding, Messages per TC of node 0 with OLSR\n")
+        for number_of_nodes in node_counts:
+            flooding = run('flooding', number_of_nodes, radius, seed, duration, duration)
+            olsr = run('olsr', number_of_nodes, radius, seed, duration, duration)
+            f.write(f"{number_of_nodes}, {flooding['flood_messages'] / flooding['floods']:.1f}, "
+                    f"{olsr['flood_messages'] / olsr['floods']:.1f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--protocols', nargs='+', choices=PROTOCOLS, default=list(PROTOCOLS))
+    parser.add_argument('--nodes', nargs='+', type=int, default=[10, 20, 30, 40, 50])
+    parser.add_argument('--radius', nargs='+', type=float, default=[0.4])
+    parser.add_argument('--seeds', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--duration', type=float, default=30, help="virtual seconds per run")
+    parser.add_argument('--warm-up', type=float, default=10, help="virtual seconds before OLSR data packets are sent")
+    parser.add_argument('--csv', help="write the summary as CSV")
+    parser.add_argument('--json', help="write the summary as JSON")
+    parser.add_argument('--baseline', help="compare with a JSON summary and exit with 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="relative growth of a cost, or drop of the delivery ratio, tolerated (default 0.1)")
+    parser.add_argument('--flood-table', help="write the messages per flood of node 0 at this path instead of sweeping")
+    args = parser.parse_args()
+
+    # Dropped packets and the end of every run are logged as errors, keep the output to the results
+    setAHCLogLevel(logging.CRITICAL + 1)
+    if args.flood_table:
+        write_flood_table(args.flood_table, args.nodes)
+        return 0
+
+    summaries = sweep(args.protocols, args.nodes, args.radius, args.seeds, args.duration, args.warm_up)
+    if args.csv:
+        write_csv(summaries, args.csv)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=2)
+    if not args.csv and not args.json:
+        write_csv(summaries, '/dev/stdout')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(summaries, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measures the memory held by TopologyStateSaver after recording the MPR flips of a 200-node topology.
+
+Nodes of a random geometric graph become MPR or stop being one at random, and every node that becomes an MPR saves a
+state, as the selected_as_mpr setter of OLSRComponent does. The previous saver, which stored a deep copy of the graph
+and a dict of every status at each state, is reproduced below for comparison.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from copy import deepcopy
+from types import SimpleNamespace
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+
+from OLSR.helpers import TopologyStateSaver
+from OLSR.versioned_graph import VersionedGraph
+
+
+class CopyingStateSaver:
+    def __init__(self):
+        self.states = []
+        self.graphs = []
+        self.steps = []
+
+    def save_state(self, topology, step=None, changes=None):
+        self.states.append({k: v.selected_as_mpr for k, v in topology.nodes.items()})
+        self.graphs.append(deepcopy(topology.G))
+        self.steps.append(step)
+
+    def update_state(self, changes):
+        pass
+
+
+def record(saver, number_of_nodes, number_of_flips, seed):
+    rng = random.Random(seed)
+    # A VersionedGraph tells the history in O(1) that it did not change
+    G = VersionedGraph(nx.random_geometric_graph(number_of_nodes, 0.15, seed=seed))
+    topology = SimpleNamespace(G=G, nodes={node: SimpleNamespace(selected_as_mpr=False) for node in G})
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for step in range(number_of_flips):
+        node = rng.randrange(number_of_nodes)
+        value = not topology.nodes[node].selected_as_mpr
+        topology.nodes[node].selected_as_mpr = value
+        if value:
+            saver.save_state(topology, step, {node: value})
+        else:
+            saver.update_state({node: value})
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(saver.states), memory, elapsed
+
+
+def main(number_of_nodes=200, number_of_flips=4000, seed=1):
+    print("Saver, states, retained memory (MB), recording time (s)")
+    for name, saver in (("Deep copies", CopyingStateSaver()), ("Delta history", TopologyStateSaver())):
+        states, memory, elapsed = record(saver, number_of_nodes, number_of_flips, seed)
+        print(f"{name}, {states}, {memory / 1e6:.2f}, {elapsed:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compares the packed wire format of HELLO and TC messages with the object payloads.
+
+Object payloads have no size of their own, so they are measured by their pickled size, which is also what it takes
+to move them between processes. Throughput compares packing and unpacking with pickling and unpickling.
+"""
+import os
+import sys
+import pickle
+import timeit
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.Generics import MessageDestinationIdentifiers
+
+from OLSR.enums import Willingness
+from OLSR.message_types import HelloMessage, TCMessage
+from OLSR.mpr import greedy_mpr
+from OLSR.wire_format import decode, encode
+
+
+def build_messages(number_of_nodes, radius, seed):
+    G = nx.random_geometric_graph(number_of_nodes, radius, seed=seed)
+    hellos = []
+    tcs = []
+    for node in G.nodes:
+        hellos.append(HelloMessage(
+            message_from=node,
+            message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+            payload={'neighbors': set(G.neighbors(node)), 'willingness': Willingness.WILL_DEFAULT, 'validity': 6},
+            nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+        ))
+        neighbor_set = {
+            neighbor: {'neighbors': set(G.neighbors(neighbor)), 'willingness': Willingness.WILL_DEFAULT}
+            for neighbor in G.neighbors(node)
+        }
+        tcs.append(TCMessage(
+            message_from=node,
+            payload={'mpr_selectors': greedy_mpr(node, neighbor_set), 'ansn': 12, 'validity': 15},
+            message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+            sequencenumber=345,
+            nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+        ))
+    return hellos, tcs
+
+
+def rate(function, messages, repeat=5):
+    seconds = min(timeit.repeat(lambda: [function(message) for message in messages], number=1, repeat=repeat))
+    return len(messages) / seconds
+
+
+def report(name, messages):
+    pickled = [pickle.dumps(message) for message in messages]
+    packed = [encode(message) for message in messages]
+    pickled_bytes = sum(len(data) for data in pickled) / len(messages)
+    packed_bytes = sum(len(data) for data in packed) / len(messages)
+    print(f"{name}, {pickled_bytes:.1f}, {packed_bytes:.1f}, {pickled_bytes / packed_bytes:.1f}x, "
+          f"{rate(pickle.dumps, messages):.0f}, {rate(encode, messages):.0f}, "
+          f"{rate(pickle.loads, pickled):.0f}, {rate(decode, packed):.0f}")
+
+
+def main(number_of_nodes=200, radius=0.15, seed=42):
+    hellos, tcs = build_messages(number_of_nodes, radius, seed)
+    print(f"Nodes: {number_of_nodes}, radius: {radius}")
+    print("Message, pickled bytes, packed bytes, size reduction, pickle msg/s, encode msg/s, unpickle msg/s, decode msg/s")
+    report("HELLO", hellos)
+    report("TC", tcs)
+
+
+if __name__ == "__main__":
+    main()
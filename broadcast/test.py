@@ -1,14 +1,18 @@
+import os
+import sys
 import networkx as nx
-import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from adhoccomputing.GenericModel import GenericModel
 from adhoccomputing.Generics import * #Event, setAHCLogLevel, ConnectorTypes, EventTypes, logger, AHCTimer, DEBUG
-from adhoccomputing.Experimentation.Topology import Topology
 from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
 from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
 from adhoccomputing.DistributedAlgorithms.Broadcasting.Broadcasting import ControlledFlooding,BroadcastingEventTypes
 import logging
 
+from OLSR.simulation import SimulatedTopology
+
 repeat_counter = 0
 
 class ApplicationLayer(GenericModel): 
@@ -51,23 +55,24 @@ class AdHocNode(GenericModel):
     self.linklayer.connect_me_to_component(ConnectorTypes.DOWN, self)
     self.connect_me_to_component(ConnectorTypes.UP, self.linklayer)
 
-topo = Topology()
+topo = None
 
 def send_broadcast_message_event():
   topo.nodes[0].broadcastservice.trigger_event(Event(None, BroadcastingEventTypes.BROADCAST, "BROADCAST MESSAGE"))
 
-def main(number_of_nodes=50):
-  global repeat_counter
+def main(number_of_nodes=50, seed=42):
+  global repeat_counter, topo
   repeat_counter = 0
+  # Runs in virtual time, so the run takes as long as its events take to process and is the same for a given seed
+  topo = SimulatedTopology(seed=seed)
   #A random geometric graph, undirected and without self-loops
   G = nx.random_geometric_graph(number_of_nodes, 0.4, seed=42)
     
   topo.construct_from_graph(G, AdHocNode, GenericChannel)
   topo.start()
-  t = AHCTimer(1, send_broadcast_message_event)
-  t.start()
+  t = topo.scheduler.call_every(1, send_broadcast_message_event)
 
-  time.sleep(5)
+  topo.run(5)
   t.cancel()
   topo.exit()
 
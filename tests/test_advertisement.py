@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import os
+import sys
+import random
+
+sys.path.insert(0, os.getcwd())
+
+from OLSR.advertisement import Advertiser, merge_advertisement
+from OLSR.enums import AdvertisementStatus
+
+
+def test_deltas_reconstruct_the_advertised_sets():
+    rng = random.Random(3)
+    advertiser = Advertiser('mpr_selectors', 'ansn', full_refresh_every=4)
+    stored_set, stored_version = None, None
+    current = set()
+    for step in range(300):
+        if rng.random() < 0.5:
+            current ^= {rng.randrange(30)}
+        payload = advertiser.advertise(current, delta=True)
+        if step % 7 == 3:
+            # Lost message, the next delta may not apply anymore
+            continue
+        status, merged, version = merge_advertisement(payload, 'mpr_selectors', 'ansn', stored_set, stored_version)
+        if status == AdvertisementStatus.GAP:
+            assert 'mpr_selectors' not in payload
+            advertiser.full_pending = True
+            continue
+        stored_set, stored_version = merged, version
+        assert stored_set == current and stored_version == advertiser.version
+
+
+def test_full_messages_and_refresh():
+    advertiser = Advertiser('neighbors', 'version', full_refresh_every=3)
+    assert advertiser.advertise({1, 2, 3}) == {'neighbors': {1, 2, 3}, 'version': 1}
+    assert advertiser.advertise({1, 2, 3}) == {'neighbors': {1, 2, 3}, 'version': 1}
+    assert advertiser.advertise({1, 2, 4}, delta=True) == {'added': {4}, 'removed': {3}, 'base_version': 1, 'version': 2}
+    assert advertiser.advertise({1, 2, 4}, delta=True) == {'added': set(), 'removed': set(), 'base_version': 2, 'version': 2}
+    assert 'neighbors' in advertiser.advertise({1, 2, 4}, delta=True)
+    assert advertiser.advertise({5, 6, 7}, delta=True) == {'neighbors': {5, 6, 7}, 'version': 3}
+
+    status, merged, version = merge_advertisement({'neighbors': {1, 3}, 'version': 2}, 'neighbors', 'version', {1, 3}, 2)
+    assert status == AdvertisementStatus.UNCHANGED and merged == {1, 3} and version == 2
+    status, merged, _ = merge_advertisement({'neighbors': {4}}, 'neighbors', 'version', {1, 3}, 2)
+    assert status == AdvertisementStatus.NEW and merged == {4}
+    delta = {'added': {5}, 'removed': set(), 'base_version': 1, 'version': 3}
+    assert merge_advertisement(delta, 'neighbors', 'version', None, None)[0] == AdvertisementStatus.GAP
+
+
+def test_full_payloads_are_cached():
+    advertiser = Advertiser('neighbors', 'version')
+    neighbors = frozenset({1, 2})
+    first = advertiser.advertise(neighbors)
+    assert first['neighbors'] is neighbors
+    assert advertiser.advertise(frozenset({2, 1})) is first
+    assert advertiser.advertise([1, 2]) is first
+    second = advertiser.advertise({1})
+    assert second is not first and second == {'neighbors': {1}, 'version': 2}
+    assert isinstance(second['neighbors'], frozenset)
+
+
+def main():
+    test_deltas_reconstruct_the_advertised_sets()
+    test_full_messages_and_refresh()
+    test_full_payloads_are_cached()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.compact_state import CompactNeighborSet, CompactRoutingTable, CompactTopologySet, NodeIndex
+from OLSR.enums import Willingness
+from OLSR.routing import networkx_routing_table
+from OLSR.simulation import SimulatedTopology
+
+
+class OLSRNode(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.olsr, self.link_layer])
+
+        self.olsr.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    @property
+    def selected_as_mpr(self):
+        return self.olsr.selected_as_mpr
+
+    def on_message_from_top(self, eventobj):
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj):
+        self.send_up(eventobj)
+
+
+def run(G, seed, compact_state, duration=20):
+    topo = SimulatedTopology(seed=seed)
+    topo.construct_from_graph(G, OLSRNode, GenericChannel)
+    for node in topo.nodes.values():
+        node.olsr.set_parameters(compact_state=compact_state)
+    topo.start()
+    topo.run(duration)
+    topo.exit()
+    return topo
+
+
+def test_neighbor_set():
+    node_index = NodeIndex()
+    neighbor_set = CompactNeighborSet(node_index, {
+        'a': {'neighbors': {'b', 'c'}, 'willingness': Willingness.WILL_HIGH, 'version': 3},
+    })
+    neighbor_set['b'] = {'neighbors': set(), 'willingness': Willingness.WILL_NEVER, 'version': None}
+    assert neighbor_set['a'] == {'neighbors': {'b', 'c'}, 'willingness': Willingness.WILL_HIGH, 'version': 3}
+    assert neighbor_set.get('b')['willingness'] == Willingness.WILL_NEVER
+    assert neighbor_set.get('c') is None
+    del neighbor_set['a']
+    neighbor_set['c'] = {'neighbors': {'a'}, 'willingness': Willingness.WILL_DEFAULT, 'version': 0}
+    # The slot of 'a' is reused
+    assert len(neighbor_set._neighbors) == 2
+    assert dict(neighbor_set) == {
+        'b': {'neighbors': frozenset(), 'willingness': Willingness.WILL_NEVER, 'version': None},
+        'c': {'neighbors': frozenset({'a'}), 'willingness': Willingness.WILL_DEFAULT, 'version': 0},
+    }
+
+
+def test_topology_set():
+    known_topology = CompactTopologySet(NodeIndex())
+    known_topology[1] = {'nexthop': 1, 'distance': 1}
+    known_topology[2] = {'mpr_selectors': {1, 3}, 'ansn': 5}
+    known_topology[3] = {'nexthop': 1, 'distance': 2, 'mpr_selectors': set(), 'ansn': None}
+    assert known_topology[1] == {'nexthop': 1, 'distance': 1}
+    assert known_topology[2] == {'mpr_selectors': {1, 3}, 'ansn': 5}
+    assert known_topology[3] == {'nexthop': 1, 'distance': 2, 'mpr_selectors': frozenset(), 'ansn': None}
+    known_topology[2] = {'nexthop': 2, 'distance': 1}
+    assert known_topology[2] == {'nexthop': 2, 'distance': 1}
+
+
+def test_routing_table():
+    node_index = NodeIndex()
+    routing_table = CompactRoutingTable(node_index, {'c': 'b', 'b': 'b'})
+    assert routing_table == {'b': 'b', 'c': 'b'}
+    assert routing_table['c'] == 'b' and routing_table.get('a') is None and 'a' not in routing_table
+    node_index.intern('z')
+    assert routing_table.get('z', 'default') == 'default'
+    assert len(routing_table) == 2
+
+
+def test_compact_runs_match_dict_runs():
+    G = nx.random_geometric_graph(15, 0.4, seed=42)
+    plain = run(G, seed=7, compact_state=False)
+    compact = run(G, seed=7, compact_state=True)
+    for node in G.nodes:
+        olsr = compact.nodes[node].olsr
+        assert isinstance(olsr.routing_table, CompactRoutingTable)
+        assert olsr.routing_table == plain.nodes[node].olsr.routing_table
+        assert olsr.routing_table == networkx_routing_table(node, dict(olsr.known_topology))
+        assert dict(olsr.neighbor_set) == plain.nodes[node].olsr.neighbor_set
+        assert olsr.counters == plain.nodes[node].olsr.counters
+    # Switching back keeps the state
+    olsr.set_parameters(compact_state=False)
+    assert type(olsr.routing_table) is dict and olsr.routing_table == plain.nodes[node].olsr.routing_table
+
+
+def main():
+    test_neighbor_set()
+    test_topology_set()
+    test_routing_table()
+    test_compact_runs_match_dict_runs()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.convergence import ConvergenceDetector, mpr_coverage, routes_follow_shortest_paths
+from OLSR.helpers import TopologyStateSaver
+from OLSR.simulation import SimulatedTopology
+from OLSR.versioned_graph import VersionedGraph
+
+
+class OLSRNode(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.olsr, self.link_layer])
+
+        self.olsr.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    @property
+    def selected_as_mpr(self):
+        return self.olsr.selected_as_mpr
+
+    @property
+    def routing_table(self):
+        return self.olsr.routing_table
+
+    def on_message_from_top(self, eventobj):
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj):
+        self.send_up(eventobj)
+
+
+def test_mpr_coverage():
+    G = nx.path_graph(5)
+    assert not mpr_coverage(G, {})
+    assert not mpr_coverage(G, {1: True})
+    assert mpr_coverage(G, {1: True, 3: True})
+
+
+def test_routes_follow_shortest_paths():
+    G = nx.cycle_graph(4)
+    routing_tables = {node: {other: nx.shortest_path(G, node, other)[1] for other in G if other != node} for node in G}
+    assert routes_follow_shortest_paths(G, routing_tables)
+    # 0 -> 1 is a link, but not on a shortest path to 3
+    routing_tables[0][3] = 1
+    assert not routes_follow_shortest_paths(G, routing_tables)
+    del routing_tables[0][3]
+    assert not routes_follow_shortest_paths(G, routing_tables)
+
+
+def test_detector_records_first_convergence():
+    G = nx.path_graph(3)
+    nodes = {node: SimpleNamespace(selected_as_mpr=False, routing_table={}) for node in G}
+    now = [0.0]
+    topology = SimpleNamespace(G=G, nodes=nodes)
+    detector = ConvergenceDetector(clock=lambda: now[0])
+
+    assert not detector.check(topology, step=1)
+    now[0] = 1.0
+    nodes[1].selected_as_mpr = True
+    assert not detector.check(topology, step=2)
+    assert (detector.coverage_step, detector.coverage_time) == (2, 1.0)
+    assert detector.routing_time is None
+
+    now[0] = 2.0
+    nodes[0].routing_table = {1: 1, 2: 1}
+    nodes[1].routing_table = {0: 0, 2: 2}
+    nodes[2].routing_table = {0: 1, 1: 1}
+    assert detector.check(topology, step=3)
+    assert (detector.routing_step, detector.routing_time) == (3, 2.0)
+    assert (detector.converged_step, detector.converged_time) == (3, 2.0)
+
+    # Losing convergence later keeps the first one recorded
+    now[0] = 3.0
+    nodes[1].selected_as_mpr = False
+    assert not detector.check(topology, step=4)
+    assert not detector.converged and detector.converged_time == 2.0
+
+
+def test_distances_follow_link_swaps():
+    G = VersionedGraph(nx.path_graph(4))
+    detector = ConvergenceDetector()
+    version = G.version
+    assert detector._shortest_path_lengths(G)[0][3] == 3
+    # Same number of nodes and links, other links
+    G.remove_edge(2, 3)
+    G.add_edge(0, 3)
+    assert G.version != version
+    assert detector._shortest_path_lengths(G)[0][3] == 1
+    assert detector._shortest_path_lengths(G) is detector._shortest_path_lengths(G)
+
+
+def test_saver_checks_only_when_enabled_and_until_converged():
+    G = nx.path_graph(3)
+    nodes = {node: SimpleNamespace(selected_as_mpr=node == 1, routing_table={}) for node in G}
+    topology = SimpleNamespace(G=G, nodes=nodes)
+    state_saver = TopologyStateSaver()
+    state_saver.save_state(topology, 1)
+    assert state_saver.detector.checks == 0 and state_saver.coverage_index is None
+
+    state_saver.detect_convergence = True
+    nodes[0].routing_table = {1: 1, 2: 1}
+    nodes[1].routing_table = {0: 0, 2: 2}
+    nodes[2].routing_table = {0: 1, 1: 1}
+    state_saver.save_state(topology, 2)
+    assert state_saver.detector.checks == 1 and state_saver.converged_step == 2
+    assert state_saver.coverage_index == 1
+    assert state_saver.check_convergence(topology, 3)
+    assert state_saver.detector.checks == 1
+
+
+def test_simulated_run_converges():
+    G = nx.random_geometric_graph(10, 0.6, seed=3)
+    topo = SimulatedTopology(seed=1)
+    topo.construct_from_graph(VersionedGraph(G), OLSRNode, GenericChannel)
+    topo.state_saver.detect_convergence = True
+    topo.start()
+    topo.run(20)
+    state_saver = topo.state_saver
+    detector = state_saver.detector
+    assert detector.converged_time is not None
+    assert 0 < detector.coverage_time <= detector.converged_time < 20
+    assert state_saver.converged_step == detector.converged_step
+    assert state_saver.coverage_index is not None
+    topo.exit()
+
+
+def main():
+    test_mpr_coverage()
+    test_routes_follow_shortest_paths()
+    test_detector_records_first_convergence()
+    test_distances_follow_link_swaps()
+    test_saver_checks_only_when_enabled_and_until_converged()
+    test_simulated_run_converges()
+
+
+if __name__ == "__main__":
+    exit(main())
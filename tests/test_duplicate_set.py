@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from adhoccomputing.Generics import Event, EventTypes
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.duplicate_set import DuplicateSet
+from OLSR.simulation import SimulatedTopology
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_duplicates_and_stale_messages_are_dropped():
+    duplicate_set = DuplicateSet(clock=Clock())
+    assert duplicate_set.register(1, 5)
+    assert not duplicate_set.register(1, 5)
+    # Stale
+    assert not duplicate_set.register(1, 4)
+    assert duplicate_set.register(1, 6)
+    # Originators are independent of each other
+    assert duplicate_set.register(2, 1)
+    assert len(duplicate_set) == 2
+
+
+def test_records_expire_after_the_hold_time():
+    clock = Clock()
+    duplicate_set = DuplicateSet(hold_time=30, clock=clock)
+    assert duplicate_set.register(1, 5)
+    clock.now = 29
+    assert not duplicate_set.register(1, 1)
+    # The originator restarted its counter, its old record is gone after the hold time
+    clock.now = 30
+    assert duplicate_set.register(1, 1)
+    assert not duplicate_set.register(1, 1)
+    clock.now = 100
+    assert duplicate_set.register(2, 1)
+    # The expired record of 1 was purged
+    assert len(duplicate_set) == 1
+
+
+def test_own_tc_relayed_back_is_dropped():
+    topo = SimulatedTopology()
+    olsr = OLSRComponent("OLSR", 0, topology=topo)
+    sent = []
+    olsr.send_down = sent.append
+    olsr.send_tc()
+    tc_message = sent[0].eventcontent
+
+    olsr.on_message_from_bottom(Event(None, EventTypes.MFRB, tc_message))
+    assert olsr.counters['tc_duplicates_dropped'] == 1
+    assert len(sent) == 1 and 0 not in olsr.known_topology
+
+
+def main():
+    test_duplicates_and_stale_messages_are_dropped()
+    test_records_expire_after_the_hold_time()
+    test_own_tc_relayed_back_is_dropped()
+
+
+if __name__ == "__main__":
+    exit(main())
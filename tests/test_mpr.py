@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import os
+import sys
+import random
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+
+from OLSR.compact_state import NodeIndex
+from OLSR.enums import Willingness
+from OLSR.mpr import MPRSelector, greedy_mpr
+
+
+def hello_payloads(G, node):
+    """Builds the neighbor set a node would have learned from HELLOs on G."""
+    return {
+        neighbor: {
+            'neighbors': set(G.neighbors(neighbor)),
+            'willingness': G.nodes[neighbor]['willingness'],
+        }
+        for neighbor in G.neighbors(node)
+    }
+
+
+def random_graph(number_of_nodes, radius, seed):
+    rng = random.Random(seed)
+    G = nx.random_geometric_graph(number_of_nodes, radius, seed=seed)
+    for node in G.nodes:
+        G.nodes[node]['willingness'] = rng.choice(list(Willingness))
+    return G
+
+
+def test_matches_greedy_on_random_graphs():
+    for seed in range(20):
+        G = random_graph(60, 0.25, seed)
+        for node in G.nodes:
+            neighbor_set = hello_payloads(G, node)
+            selector = MPRSelector(node)
+            for neighbor, data in neighbor_set.items():
+                selector.update_neighbor(neighbor, data['neighbors'], data['willingness'])
+            assert selector.select() == greedy_mpr(node, neighbor_set)
+
+
+def check_incremental_updates(node_set):
+    rng = random.Random(7)
+    for seed in range(10):
+        G = random_graph(40, 0.3, seed)
+        node = 0
+        neighbor_set = {}
+        selector = MPRSelector(node, node_set)
+        for _ in range(300):
+            neighbor = rng.randrange(1, 40)
+            action = rng.random()
+            if action < 0.15 and neighbor in neighbor_set:
+                del neighbor_set[neighbor]
+                selector.remove_neighbor(neighbor)
+            else:
+                if action < 0.5:
+                    # Perturb the advertised neighbors of the sender
+                    other = rng.randrange(40)
+                    if other != neighbor:
+                        if G.has_edge(neighbor, other):
+                            G.remove_edge(neighbor, other)
+                        else:
+                            G.add_edge(neighbor, other)
+                elif action < 0.6:
+                    G.nodes[neighbor]['willingness'] = rng.choice(list(Willingness))
+                neighbor_set[neighbor] = {
+                    'neighbors': set(G.neighbors(neighbor)),
+                    'willingness': G.nodes[neighbor]['willingness'],
+                }
+                selector.update_neighbor(neighbor, neighbor_set[neighbor]['neighbors'], neighbor_set[neighbor]['willingness'])
+            assert selector.select() == greedy_mpr(node, neighbor_set)
+
+
+def test_matches_greedy_under_incremental_updates():
+    check_incremental_updates(None)
+
+
+def test_bitsets_match_greedy_under_incremental_updates():
+    check_incremental_updates(NodeIndex().node_set)
+
+
+def test_unchanged_hello_is_a_noop():
+    selector = MPRSelector(0)
+    assert selector.update_neighbor(1, {0, 2}, Willingness.WILL_DEFAULT)
+    assert selector.select() == {1}
+    assert not selector.update_neighbor(1, {2, 0}, Willingness.WILL_DEFAULT)
+    assert selector.update_neighbor(1, {0, 2}, Willingness.WILL_HIGH)
+
+
+def main():
+    test_matches_greedy_on_random_graphs()
+    test_matches_greedy_under_incremental_updates()
+    test_bitsets_match_greedy_under_incremental_updates()
+    test_unchanged_hello_is_a_noop()
+
+
+if __name__ == "__main__":
+    exit(main())
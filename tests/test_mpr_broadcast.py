@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Generics import Event, EventTypes, MessageDestinationIdentifiers
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.broadcast import MPRBroadcastComponent
+from OLSR.message_types import BroadcastMessage
+from OLSR.simulation import SimulatedTopology
+
+
+class DataSink(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = []
+
+    def on_message_from_bottom(self, eventobj):
+        self.received.append(eventobj.eventcontent.payload['data'])
+
+
+class BroadcastNode(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.application = DataSink("DataSink", self.componentinstancenumber, topology=self.topology)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.broadcast = MPRBroadcastComponent("MPRBroadcast", self.componentinstancenumber, topology=self.topology,
+                                               olsr=self.olsr)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.application, self.olsr, self.broadcast, self.link_layer])
+
+        self.application.D(self.broadcast)
+        self.broadcast.U(self.application)
+        self.olsr.D(self.link_layer)
+        self.broadcast.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.U(self.broadcast)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    @property
+    def selected_as_mpr(self):
+        return self.olsr.selected_as_mpr
+
+    def on_message_from_top(self, eventobj):
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj):
+        self.send_up(eventobj)
+
+
+def test_broadcasts_reach_every_node_over_the_mprs():
+    G = nx.random_geometric_graph(25, 0.35, seed=2)
+    assert nx.is_connected(G)
+    topo = SimulatedTopology(seed=1)
+    topo.construct_from_graph(G, BroadcastNode, GenericChannel)
+    topo.start()
+    # Let OLSR select the MPRs first
+    topo.run(12)
+    for i in range(3):
+        source = topo.nodes[i]
+        source.broadcast.trigger_event(Event(None, EventTypes.MFRT, f"DATA {i}"))
+        topo.run(1)
+    topo.exit()
+
+    for node_id, node in topo.nodes.items():
+        expected = [f"DATA {i}" for i in range(3) if i != node_id]
+        assert node.application.received == expected
+        # Every copy but the first was dropped
+        assert node.broadcast.counters['delivered'] == len(expected)
+    relayed = sum(node.broadcast.counters['relayed'] for node in topo.nodes.values())
+    suppressed = sum(node.broadcast.counters['relays_suppressed'] for node in topo.nodes.values())
+    # Plain flooding would have every node relay every broadcast
+    assert 0 < relayed < 3 * (len(G) - 1) and relayed + suppressed == 3 * (len(G) - 1)
+
+
+def test_duplicates_are_remembered_within_max_seen():
+    broadcast = MPRBroadcastComponent("MPRBroadcast", 0)
+    broadcast.set_parameters(max_seen=2)
+    assert broadcast.register(1, 1) and broadcast.register(1, 2)
+    assert not broadcast.register(1, 1)
+    assert broadcast.register(2, 1)
+    # The oldest broadcast was forgotten
+    assert broadcast.register(1, 1) and len(broadcast.seen) == 2
+    assert not broadcast.selected_by(1)
+
+
+def test_copies_are_relayed_for_the_senders_that_selected_us():
+    olsr = SimpleNamespace(known_topology={1: {'mpr_selectors': {0, 2}, 'ansn': 1}, 2: {'nexthop': 2, 'distance': 1}})
+    broadcast = MPRBroadcastComponent("MPRBroadcast", 0, olsr=olsr)
+    sent = []
+    broadcast.send_down = sent.append
+    broadcast.send_up = lambda eventobj: None
+
+    def copy(originator, sequencenumber, sender):
+        message = BroadcastMessage(originator, MessageDestinationIdentifiers.NETWORKLAYERBROADCAST,
+                                   {'data': "DATA", 'sender': sender}, sequencenumber=sequencenumber)
+        broadcast.on_message_from_bottom(Event(None, EventTypes.MFRB, message))
+
+    # 2 did not advertise us in a TC, 1 did
+    copy(3, 1, sender=2)
+    assert not sent and broadcast.counters['relays_suppressed'] == 1
+    copy(3, 2, sender=1)
+    relayed = sent[0].eventcontent
+    assert (relayed.header.messagefrom, relayed.header.sequencenumber) == (3, 2)
+    assert relayed.payload == {'data': "DATA", 'sender': 0}
+
+
+def main():
+    test_broadcasts_reach_every_node_over_the_mprs()
+    test_duplicates_are_remembered_within_max_seen()
+    test_copies_are_relayed_for_the_senders_that_selected_us()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Generics import Event, EventTypes, MessageDestinationIdentifiers
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.enums import Willingness
+from OLSR.message_types import HelloMessage, Message, TCMessage
+from OLSR.simulation import SimulatedTopology
+
+
+class ApplicationLayer(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.received = []
+
+    def on_message_from_bottom(self, eventobj):
+        self.received.append(eventobj.eventcontent)
+
+
+class AdHocNode(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.application = ApplicationLayer("ApplicationLayer", self.componentinstancenumber, topology=self.topology)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.application, self.olsr, self.link_layer])
+
+        self.application.D(self.olsr)
+        self.olsr.U(self.application)
+        self.olsr.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    @property
+    def selected_as_mpr(self):
+        return self.olsr.selected_as_mpr
+
+    def on_message_from_top(self, eventobj):
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj):
+        self.send_up(eventobj)
+
+
+def olsr_component(node=0, **parameters):
+    """
+    Builds an OLSRComponent running in virtual time whose sent events are collected instead of sent down.
+    """
+    topo = SimulatedTopology()
+    olsr = OLSRComponent("OLSR", node, topology=topo)
+    olsr.set_parameters(**parameters)
+    topo.attach(olsr)
+    sent = []
+    olsr.send_down = sent.append
+    return topo, olsr, sent
+
+
+def hello(sender, neighbors, version=1):
+    message = HelloMessage(
+        message_from=sender,
+        message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+        payload={'neighbors': frozenset(neighbors), 'version': version, 'willingness': Willingness.WILL_DEFAULT,
+                 'validity': 6},
+        nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+    )
+    return Event(None, EventTypes.MFRB, message)
+
+
+def tc(originator, sequencenumber, mpr_selectors, ansn):
+    message = TCMessage(
+        message_from=originator,
+        message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+        payload={'mpr_selectors': frozenset(mpr_selectors), 'ansn': ansn, 'validity': 15},
+        sequencenumber=sequencenumber,
+        nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+    )
+    return Event(None, EventTypes.MFRB, message)
+
+
+def test_tc_with_unchanged_ansn_is_skipped():
+    _, olsr, _ = olsr_component(recompute_interval=0)
+    olsr.on_message_from_bottom(tc(5, 1, {6, 7}, ansn=1))
+    assert olsr.known_topology[5] == {'mpr_selectors': {6, 7}, 'ansn': 1}
+    assert olsr.counters['routing_recomputations'] == 1
+
+    # A new TC, but its ANSN did not advance, so its set is not applied
+    olsr.on_message_from_bottom(tc(5, 2, {8}, ansn=1))
+    assert olsr.known_topology[5] == {'mpr_selectors': {6, 7}, 'ansn': 1}
+    assert olsr.counters['routing_recomputations_skipped'] == 1
+    assert olsr.counters['routing_recomputations'] == 1
+
+    olsr.on_message_from_bottom(tc(5, 3, {8}, ansn=2))
+    assert olsr.known_topology[5] == {'mpr_selectors': {8}, 'ansn': 2}
+    assert olsr.counters['routing_recomputations_skipped'] == 1
+    assert olsr.counters['routing_recomputations'] == 2
+
+
+def test_routing_calculations_are_coalesced():
+    topo, olsr, _ = olsr_component(recompute_interval=0.5)
+    for originator in (5, 6, 7):
+        olsr.on_message_from_bottom(tc(originator, 1, {originator + 1}, ansn=1))
+    assert olsr.routing_dirty and olsr.counters['routing_recomputations'] == 0
+    topo.run(0)
+    assert not olsr.routing_dirty and olsr.counters['routing_recomputations'] == 1
+
+    # Within the recompute interval of the last calculation, the next one waits for its end
+    topo.run(0.1)
+    for originator in (5, 6, 7):
+        olsr.on_message_from_bottom(tc(originator, 2, {originator + 2}, ansn=2))
+    topo.run(0.3)
+    assert olsr.routing_dirty and olsr.counters['routing_recomputations'] == 1
+    topo.run(0.1)
+    assert not olsr.routing_dirty and olsr.counters['routing_recomputations'] == 2
+    assert olsr.counters['topology_updates'] == 6
+
+
+def test_data_packets_recalculate_a_dirty_routing_table():
+    topo, olsr, sent = olsr_component(recompute_interval=0.5)
+    olsr.on_message_from_bottom(hello(1, {0}))
+    assert olsr.routing_dirty and 1 not in olsr.routing_table
+
+    olsr.on_message_from_bottom(Event(None, EventTypes.MFRB, Message(0, 1, "payload", sequencenumber=1)))
+    assert not olsr.routing_dirty and olsr.counters['routing_recomputations'] == 1
+    assert len(sent) == 1 and sent[0].eventcontent.header.nexthop == 1
+    # The scheduled calculation finds the table up to date
+    topo.run(1)
+    assert olsr.counters['routing_recomputations'] == 1
+
+
+def test_entries_expire_after_their_hold_time():
+    topo, olsr, _ = olsr_component()
+    olsr.on_init(None)
+    olsr.on_message_from_bottom(hello(1, {0}))
+    olsr.on_message_from_bottom(hello(2, {0}))
+    olsr.on_message_from_bottom(tc(5, 1, {1, 2}, ansn=1))
+    topo.run(4)
+    # Only neighbor 2 refreshes its entry, until 10
+    olsr.on_message_from_bottom(hello(2, {0}, version=2))
+    topo.run(3)
+    assert set(olsr.neighbor_set) == {2} and olsr.counters['neighbors_expired'] == 1
+    # 1 is still advertised by 5, but reached through 2 now
+    assert 1 not in olsr.known_topology and olsr.routing_table == {1: 2, 2: 2, 5: 2}
+
+    olsr.on_message_from_bottom(tc(5, 2, {1, 2}, ansn=1))
+    topo.run(9)
+    assert olsr.counters['neighbors_expired'] == 2 and olsr.counters['topology_expired'] == 0
+    assert olsr.known_topology == {5: {'mpr_selectors': {1, 2}, 'ansn': 1}}
+    # The TC refreshed at 7 expires at 22
+    topo.run(6)
+    assert olsr.counters['topology_expired'] == 1
+    assert olsr.known_topology == {} and olsr.routing_table == {}
+    olsr.on_exit(None)
+
+
+def test_packets_are_forwarded_along_multi_hop_paths():
+    topo = SimulatedTopology(seed=1)
+    topo.construct_from_graph(nx.path_graph(5), AdHocNode, GenericChannel)
+    topo.start()
+    topo.run(12)
+    packets = [Message(0, 3, "first", sequencenumber=1), Message(0, 3, "second", sequencenumber=1),
+               Message(4, 1, "third", sequencenumber=1)]
+    for packet in packets:
+        source = topo.nodes[packet.header.messagefrom]
+        source.olsr.trigger_event(Event(None, EventTypes.MFRB, packet))
+    topo.run(1)
+    topo.exit()
+
+    # Every packet reached its destination alone, with its own header
+    assert [message.payload for message in topo.nodes[3].application.received] == ["first", "second"]
+    assert [message.payload for message in topo.nodes[1].application.received] == ["third"]
+    assert not any(topo.nodes[node].application.received for node in (0, 2, 4))
+    # Three hops each
+    assert [(packet.header.nexthop, packet.header.sequencenumber) for packet in packets] == [(3, 4), (3, 4), (1, 4)]
+    assert len({id(packet.header) for packet in packets}) == 3
+
+
+def test_packets_not_unicast_to_us_are_copied():
+    _, olsr, sent = olsr_component(recompute_interval=0)
+    olsr.on_message_from_bottom(hello(1, {0}))
+    # Every receiver of a broadcast is handed the same packet
+    packet = Message(2, 1, "payload", sequencenumber=1, nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST)
+    olsr.on_message_from_bottom(Event(None, EventTypes.MFRB, packet))
+    forwarded = sent[0].eventcontent
+    assert forwarded is not packet and forwarded.header is not packet.header
+    assert (forwarded.header.nexthop, forwarded.header.sequencenumber) == (1, 2)
+    assert (packet.header.nexthop, packet.header.sequencenumber) == (MessageDestinationIdentifiers.LINKLAYERBROADCAST, 1)
+
+    # A packet unicast to us is forwarded in place
+    packet = Message(2, 1, "payload", sequencenumber=1, nexthop=0)
+    olsr.on_message_from_bottom(Event(None, EventTypes.MFRB, packet))
+    assert sent[1].eventcontent is packet and packet.header.nexthop == 1
+
+
+def main():
+    test_tc_with_unchanged_ansn_is_skipped()
+    test_routing_calculations_are_coalesced()
+    test_data_packets_recalculate_a_dirty_routing_table()
+    test_entries_expire_after_their_hold_time()
+    test_packets_are_forwarded_along_multi_hop_paths()
+    test_packets_not_unicast_to_us_are_copied()
+
+
+if __name__ == "__main__":
+    exit(main())
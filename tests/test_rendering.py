@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from PIL import Image, ImageSequence
+
+from OLSR.rendering import BLUE, GREEN, RED, Layout, iter_frames, render_frames, write_gif
+
+
+def test_colors():
+    G = nx.path_graph(5)
+    layout = Layout(G, pos={node: (node, 0) for node in G})
+    assert list(layout.colors({})) == [RED] * 5
+    assert list(layout.colors({1: True})) == [GREEN, BLUE, GREEN, RED, RED]
+    assert list(layout.colors({1: True, 4: True})) == [GREEN, BLUE, GREEN, GREEN, BLUE]
+
+
+def test_render_frames():
+    G = nx.cycle_graph(6)
+    layout = Layout(G, pos=nx.circular_layout(G))
+    frame_colors = [layout.colors({}), layout.colors({0: True})]
+    pngs = render_frames(None, layout.positions, layout.edges, layout.labels, frame_colors, 'PNG')
+    gifs = render_frames(('test', 0), layout.positions, layout.edges, layout.labels, frame_colors)
+    assert len(pngs) == len(gifs) == 2
+    assert pngs[0] != pngs[1]
+    assert Image.open(io.BytesIO(pngs[0])).size == gifs[0].size
+    assert gifs[0].mode == 'P'
+
+
+def frames_on_four_graphs():
+    # Single nodes need no layout computation, their labels tell the graphs apart
+    graphs = [graph for node in range(4) for graph in [nx.empty_graph([node])] * 3]
+    # Consecutive states differ, so the GIF keeps every frame
+    states = [{node: i % 2 == 0} for node in range(4) for i in range(3)]
+    return graphs, states
+
+
+def gif_frames(path):
+    with Image.open(path) as gif:
+        return [frame.convert('RGB').tobytes() for frame in ImageSequence.Iterator(gif)]
+
+
+def test_frames_come_back_in_order_from_the_pool():
+    graphs, states = frames_on_four_graphs()
+    expected = list(iter_frames(graphs, states, processes=1, chunk_size=2, image_format='PNG'))
+    # Eight tasks, more than the pool keeps in flight
+    assert list(iter_frames(graphs, states, processes=2, chunk_size=2, image_format='PNG')) == expected
+    assert len(expected) == 12 and len(set(expected)) == 8
+
+    with tempfile.TemporaryDirectory() as directory:
+        pooled, single = os.path.join(directory, 'pooled.gif'), os.path.join(directory, 'single.gif')
+        assert write_gif(pooled, graphs, states, processes=2) == 12
+        assert write_gif(single, graphs, states, processes=1) == 12
+        frames = gif_frames(pooled)
+        assert len(frames) == 12 and frames == gif_frames(single)
+
+
+def main():
+    test_colors()
+    test_render_frames()
+    test_frames_come_back_in_order_from_the_pool()
+
+
+if __name__ == "__main__":
+    exit(main())
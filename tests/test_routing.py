@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import os
+import sys
+import random
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+
+from OLSR.compact_state import CompactRoutingEngine, NodeIndex
+from OLSR.routing import RoutingEngine, networkx_routing_table
+
+
+def random_known_topology_updates(G, source, rng, number_of_updates):
+    """
+    Yields known_topology updates as on_hello and on_tc would apply them on G.
+    """
+    nodes = list(G.nodes)
+    for _ in range(number_of_updates):
+        node = rng.choice(nodes)
+        action = rng.random()
+        if action < 0.3 and G.has_edge(source, node):
+            # HELLO replaces the whole entry
+            yield node, {"nexthop": node, "distance": 1}
+        elif action < 0.4:
+            yield node, None
+        else:
+            neighbors = list(G.neighbors(node))
+            mpr_selectors = set(rng.sample(neighbors, rng.randint(0, len(neighbors))))
+            yield node, {"mpr_selectors": mpr_selectors}
+
+
+def check_random_graphs(new_engine):
+    for seed in range(30):
+        rng = random.Random(seed)
+        G = nx.random_geometric_graph(rng.randint(5, 60), rng.uniform(0.15, 0.5), seed=seed)
+        source = rng.choice(list(G.nodes))
+
+        engine = new_engine(source)
+        known_topology = {}
+        for node, node_data in random_known_topology_updates(G, source, rng, 200):
+            if node_data is None:
+                known_topology.pop(node, None)
+                engine.remove_entry(node)
+            else:
+                if node not in known_topology:
+                    known_topology[node] = {}
+                if "nexthop" in node_data:
+                    known_topology[node] = node_data
+                else:
+                    known_topology[node].update(node_data)
+                engine.update_entry(node, known_topology[node])
+            assert engine.compute() == networkx_routing_table(source, known_topology)
+
+
+def test_matches_networkx_on_random_graphs():
+    check_random_graphs(RoutingEngine)
+
+
+def test_compact_engine_matches_networkx_on_random_graphs():
+    check_random_graphs(lambda source: CompactRoutingEngine(source, NodeIndex()))
+
+
+def test_full_topology_gives_shortest_paths():
+    G = nx.random_geometric_graph(80, 0.2, seed=3)
+    engine = RoutingEngine(0)
+    for node in G.nodes:
+        node_data = {"mpr_selectors": set(G.neighbors(node))}
+        if G.has_edge(0, node):
+            node_data.update({"nexthop": node, "distance": 1})
+        engine.update_entry(node, node_data)
+    routing_table = engine.compute()
+
+    lengths = nx.single_source_shortest_path_length(G, 0)
+    assert set(routing_table) == set(lengths) - {0}
+    assert engine.distances == lengths
+    for dest, next_hop in routing_table.items():
+        assert G.has_edge(0, next_hop)
+        assert nx.shortest_path_length(G, next_hop, dest) == lengths[dest] - 1
+
+
+def test_unchanged_entry_keeps_routing_table():
+    engine = RoutingEngine(0)
+    engine.update_entry(1, {"nexthop": 1, "distance": 1})
+    engine.update_entry(1, {"nexthop": 1, "distance": 1, "mpr_selectors": {2}})
+    routing_table = engine.compute()
+    assert routing_table == {1: 1, 2: 1}
+    assert not engine.update_entry(1, {"nexthop": 1, "distance": 1, "mpr_selectors": {2}})
+    assert engine.compute() is routing_table
+
+
+def test_iteration_order_of_mpr_selectors_is_mirrored():
+    engine = RoutingEngine(0)
+    known_topology = {node: {"nexthop": node, "distance": 1} for node in (1, 9, 17)}
+    for node, node_data in known_topology.items():
+        engine.update_entry(node, node_data)
+    known_topology[5] = {"mpr_selectors": frozenset([17, 1, 9])}
+    engine.update_entry(5, known_topology[5])
+    assert engine.compute() == networkx_routing_table(0, known_topology)
+
+    # The same set, iterating in another order, adds its edges to the NetworkX graph in that order
+    known_topology[5] = {"mpr_selectors": frozenset([1, 17, 9])}
+    assert list(known_topology[5]["mpr_selectors"]) != [17, 1, 9]
+    assert engine.update_entry(5, known_topology[5])
+    assert engine.compute() == networkx_routing_table(0, known_topology)
+    assert not engine.update_entry(5, {"mpr_selectors": frozenset([1, 17, 9])})
+
+
+def main():
+    test_matches_networkx_on_random_graphs()
+    test_compact_engine_matches_networkx_on_random_graphs()
+    test_full_topology_gives_shortest_paths()
+    test_unchanged_entry_keeps_routing_table()
+    test_iteration_order_of_mpr_selectors_is_mirrored()
+
+
+if __name__ == "__main__":
+    exit(main())
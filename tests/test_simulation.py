@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericModel
+from adhoccomputing.Networking.LinkLayer.GenericLinkLayer import GenericLinkLayer
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.OLSR import OLSRComponent
+from OLSR.routing import networkx_routing_table
+from OLSR.simulation import SimulatedTopology, VirtualTimeScheduler
+
+
+class OLSRNode(GenericModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.olsr = OLSRComponent("OLSR", self.componentinstancenumber, topology=self.topology)
+        self.link_layer = GenericLinkLayer("GenericLinkLayer", self.componentinstancenumber, topology=self.topology)
+        self.components.extend([self.olsr, self.link_layer])
+
+        self.olsr.D(self.link_layer)
+        self.link_layer.U(self.olsr)
+        self.link_layer.D(self)
+        self.U(self.link_layer)
+
+    @property
+    def selected_as_mpr(self):
+        return self.olsr.selected_as_mpr
+
+    def on_message_from_top(self, eventobj):
+        self.send_down(eventobj)
+
+    def on_message_from_bottom(self, eventobj):
+        self.send_up(eventobj)
+
+
+def run(G, seed, duration=20):
+    topo = SimulatedTopology(seed=seed)
+    topo.construct_from_graph(G, OLSRNode, GenericChannel)
+    topo.start()
+    topo.run(duration)
+    topo.exit()
+    return topo
+
+
+def test_scheduler_order():
+    scheduler = VirtualTimeScheduler()
+    calls = []
+    periodic = scheduler.call_every(2, lambda: calls.append(('tick', scheduler.now)))
+    scheduler.call_later(3, calls.append, 'a')
+    scheduler.call_later(3, calls.append, 'b')
+    scheduler.call_later(7, periodic.cancel)
+    scheduler.run(10)
+    assert calls == [('tick', 2), 'a', 'b', ('tick', 4), ('tick', 6)]
+    assert scheduler.now == 10 and len(scheduler) == 0
+
+
+def test_simulated_runs_are_reproducible():
+    G = nx.random_geometric_graph(15, 0.4, seed=42)
+    first = run(G, seed=7)
+    second = run(G, seed=7)
+    assert first.now == second.now == 20
+    for node in G.nodes:
+        olsr = first.nodes[node].olsr
+        assert olsr.routing_table == second.nodes[node].olsr.routing_table
+        assert olsr.counters == second.nodes[node].olsr.counters
+        assert olsr.routing_table == networkx_routing_table(node, olsr.known_topology)
+        assert set(olsr.neighbor_set) == set(G.neighbors(node))
+
+
+def test_hello_payloads_are_shared():
+    G = nx.random_geometric_graph(15, 0.4, seed=42)
+    topo = run(G, seed=7)
+    for node in G.nodes:
+        olsr = topo.nodes[node].olsr
+        assert olsr.hello_payload() is olsr.hello_payload()
+        assert olsr.hello_neighbors() == set(olsr.neighbor_set)
+        # Receivers keep the frozenset of the last HELLO of their neighbors instead of a copy
+        for neighbor in G.neighbors(node):
+            assert topo.nodes[neighbor].olsr.neighbor_set[node]['neighbors'] is olsr.hello_neighbors()
+
+
+def main():
+    test_scheduler_order()
+    test_simulated_runs_are_reproducible()
+    test_hello_payloads_are_shared()
+
+
+if __name__ == "__main__":
+    exit(main())
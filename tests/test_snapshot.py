@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+from adhoccomputing.GenericModel import GenericMessage, GenericMessageHeader
+from adhoccomputing.Generics import Event, EventTypes
+from adhoccomputing.Networking.LogicalChannels.GenericChannel import GenericChannel
+
+from OLSR.simulation import SimulatedTopology
+from Snapshot.ChandyLamportSnapshot import ChandyLamportComponentModel
+from Snapshot.LaiYangSnapshot import LaiYangComponentModel, LaiYangCountingComponentModel
+from Snapshot.Snapshot import SnapshotEventTypes, SnapshotMessageTypes
+from Snapshot.event_log import EventLog
+from Snapshot.persistence import SnapshotReader, SnapshotWriter, encode_global_state
+
+
+def run_snapshot(G, nodetype, rounds=3, step=0.01, seed=1, parameters=None, on_channel=None):
+    topo = SimulatedTopology(seed=seed)
+    topo.construct_from_graph(G, nodetype, GenericChannel)
+    for node in topo.nodes.values():
+        node.set_parameters(**(parameters or {}))
+    if on_channel is not None:
+        for channel in topo.channels.values():
+            channel.trigger_event = (lambda trigger: lambda eventobj: (on_channel(eventobj), trigger(eventobj)))(
+                channel.trigger_event)
+    topo.start()
+    for i in range(rounds):
+        for node_id, node in topo.nodes.items():
+            node.send_msg(Event(node, EventTypes.MFRT, GenericMessage(GenericMessageHeader("APP", node_id, None), i)))
+        topo.run(step)
+    initiator = topo.nodes[0]
+    initiator.send_self(Event(initiator, SnapshotEventTypes.TAKESNAPSHOT, None))
+    topo.run(1)
+    return topo
+
+
+def test_event_log_views():
+    log = EventLog(segment_size=4)
+    for event in range(10):
+        log.append(event)
+    view = log.view()
+    assert list(view) == list(range(10)) and view[5] == 5 and view[-1] == 9 and view[2:4] == [2, 3]
+    assert list(log.view(3, 9)) == list(range(3, 9)) and log.view(3, 9)[4] == 7
+
+    log.truncate(6)
+    assert log.start == 6 and len(log) == 4 and log.segments == 2
+    assert list(log) == [6, 7, 8, 9]
+    # Views taken before keep their events
+    assert list(view) == list(range(10))
+    for event in range(10, 14):
+        log.append(event)
+    assert list(log.view(7, 12)) == [7, 8, 9, 10, 11]
+    try:
+        log.view(2)
+    except ValueError:
+        pass
+    else:
+        assert False
+    log.truncate(14)
+    assert len(log) == 0 and list(log.view()) == []
+
+
+def test_chandy_lamport_records_log_views():
+    G = nx.cycle_graph(5)
+    topo = run_snapshot(G, ChandyLamportComponentModel)
+    for node in topo.nodes.values():
+        record = node.snapshots[(0, 0)]
+        assert record.mark_recv_chnls == node.chnls and len(node.chnls) == 2
+        assert record.gsu_redirected_comps == set(G.nodes)
+        assert record.state.end == record.watermark <= node.recv_events.watermark
+        assert list(record.state) == list(node.recv_events.view(end=record.state.end))
+
+    state = topo.nodes[1].snapshots[(0, 0)].state
+    recorded = list(state)
+    topo.nodes[1].reset_state()
+    assert topo.nodes[1].recv_events.start == state.end and not topo.nodes[1].snapshots
+    assert list(state) == recorded
+    topo.exit()
+
+
+def test_counting_lai_yang_matches_lai_yang():
+    G = nx.random_geometric_graph(12, 0.4, seed=3)
+    # Short rounds leave messages in transit when the snapshot starts
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "snapshots")
+        with SnapshotWriter(path) as writer:
+            recorded = run_snapshot(G, LaiYangComponentModel, rounds=5, step=0.001,
+                                    parameters={"snapshot_writer": writer})
+        counted = run_snapshot(G, LaiYangCountingComponentModel, rounds=5, step=0.001)
+        recorded_state, counted_state = recorded.nodes[0].global_state, counted.nodes[0].global_state
+        with SnapshotReader(path) as reader:
+            assert len(reader) == 1 and reader[0] == encode_global_state(recorded_state)
+    assert set(recorded_state) >= set(G.nodes) and set(counted_state) >= set(G.nodes)
+    for node in G.nodes:
+        assert len(counted_state[node]) == len(recorded_state[node])
+    in_transit = {key: len(messages) for key, messages in counted_state.items() if isinstance(key, tuple) and messages}
+    assert in_transit
+    assert in_transit == {key: len(messages) for key, messages in recorded_state.items()
+                          if isinstance(key, tuple) and messages}
+    # The color travels in the eventid, messages reach the receiver untouched
+    assert all(isinstance(message, GenericMessage) for key, messages in counted_state.items() if isinstance(key, tuple)
+               for message in messages)
+    for node in counted.nodes.values():
+        assert not node.sent_log and not node.chnl_recv
+        assert node.local_state_sent and set(node.expected) == node.chnls
+    recorded.exit()
+    counted.exit()
+
+
+def test_lai_yang_releases_messages_received_before_the_snapshot():
+    G = nx.random_geometric_graph(12, 0.4, seed=3)
+    topo = run_snapshot(G, LaiYangComponentModel, rounds=5, step=0.001)
+    for node in topo.nodes.values():
+        neighbors = [topo.nodes[n] for n in G.neighbors(node.componentinstancenumber)]
+        # Every neighbor received the messages below the start of the log before its snapshot
+        assert 0 < node.sent_log.start == min(n.state.received[c].next for n in neighbors
+                                               for c in n.chnls & node.chnls)
+        assert node.state.sent and all(sent.start == 0 for sent in node.state.sent.values())
+    first = dict(topo.nodes[0].global_state)
+
+    for node in topo.nodes.values():
+        node.reset_state()
+    for i in range(5):
+        for node_id, node in topo.nodes.items():
+            node.send_msg(Event(node, EventTypes.MFRT, GenericMessage(GenericMessageHeader("APP", node_id, None),
+                                                                      ("second", i))))
+        topo.run(0.001)
+    initiator = topo.nodes[0]
+    initiator.send_self(Event(initiator, SnapshotEventTypes.TAKESNAPSHOT, None))
+    topo.run(1)
+    second = initiator.global_state
+    assert set(second) == set(first)
+    # The channel states only hold messages of the second snapshot, taken from the truncated logs
+    in_transit = [message.payload for key, messages in second.items() if isinstance(key, tuple)
+                  for message in messages if isinstance(message, GenericMessage)]
+    assert in_transit and all(payload[0] == "second" for payload in in_transit)
+    for node in topo.nodes.values():
+        assert all(sent.start > 0 for sent in node.state.sent.values())
+    topo.exit()
+
+
+def test_convergecast_gathers_states_along_a_tree():
+    G = nx.random_geometric_graph(15, 0.45, seed=2)
+    assert nx.is_connected(G)
+    gsu_messages = {}
+    finished = {}
+
+    class FinishingComponentModel(ChandyLamportComponentModel):
+        def finish_snapshot(self, snapshot_id):
+            finished[self.componentinstancenumber] = self.snapshots.get(snapshot_id)
+            super().finish_snapshot(snapshot_id)
+
+    def count(mode):
+        def on_channel(eventobj):
+            content = eventobj.eventcontent
+            # Messages enter a channel from the top, then cross its pipes
+            if eventobj.event == EventTypes.MFRT and isinstance(content, GenericMessage) and \
+                    content.header.messagetype == SnapshotMessageTypes.GLOBALSNAPSHOT:
+                gsu_messages[mode] = gsu_messages.get(mode, 0) + 1
+        return on_channel
+
+    flooded = run_snapshot(G, ChandyLamportComponentModel, on_channel=count('flood'))
+    gathered = run_snapshot(G, FinishingComponentModel, parameters={'convergecast': True},
+                            on_channel=count('tree'))
+    flooded_state = flooded.nodes[0].snapshots[(0, 0)].global_state
+    gathered_state = gathered.nodes[0].snapshots[(0, 0)].global_state
+    assert set(flooded_state) == set(gathered_state) == set(G.nodes)
+    for node_id, state in gathered_state.items():
+        assert len(state.component_state) == len(flooded_state[node_id].component_state)
+    # One message per tree edge instead of one per component and edge direction
+    assert gsu_messages['tree'] == len(G) - 1
+    assert gsu_messages['flood'] == 2 * len(G) * len(G.edges)
+    # Every component but the initiator finished the snapshot once it sent its subtree, and truncated its log
+    assert set(finished) == set(G.nodes) - {0}
+    for node_id, record in finished.items():
+        node = gathered.nodes[node_id]
+        assert not node.snapshots and node.is_finished((0, 0))
+        assert node.recv_events.start == record.watermark
+    records = [gathered.nodes[0].snapshots[(0, 0)]] + list(finished.values())
+    parents = {record.parent_chnl for record in records}
+    children = [chnl for record in records for chnl in record.child_chnls]
+    assert gathered.nodes[0].snapshots[(0, 0)].parent_chnl is None
+    assert len(children) == len(G) - 1 and set(children) == parents - {None}
+    flooded.exit()
+    gathered.exit()
+
+
+def test_concurrent_chandy_lamport_snapshots():
+    G = nx.random_regular_graph(3, 8, seed=4)
+    topo = run_snapshot(G, ChandyLamportComponentModel, parameters={"max_snapshots": 3})
+    completed = []
+    for node in topo.nodes.values():
+        node.on_global_snapshot = completed.append
+    # Messages sent just before are in transit when the snapshots start
+    for node_id, node in topo.nodes.items():
+        node.send_msg(Event(node, EventTypes.MFRT, GenericMessage(GenericMessageHeader("APP", node_id, None), "late")))
+    # Two components initiate at once, then the first one again
+    for node_id in (0, 5, 0):
+        initiator = topo.nodes[node_id]
+        initiator.send_self(Event(initiator, SnapshotEventTypes.TAKESNAPSHOT, None))
+    topo.run(1)
+
+    assert sorted(record.snapshot_id for record in completed) == [(0, 1), (0, 2), (5, 0)]
+    for record in completed:
+        assert set(record.global_state) == set(G.nodes)
+        assert all(state.snapshot_id == record.snapshot_id for state in record.global_state.values())
+        in_transit = [event.eventcontent.payload for state in record.global_state.values()
+                      for events in state.chnl_states.values() for event in events]
+        assert in_transit and set(in_transit) == {"late"}
+    # The snapshot table is bounded, the oldest snapshots were finished
+    for node in topo.nodes.values():
+        assert len(node.snapshots) == 3 and (0, 0) not in node.snapshots
+        # No snapshot waits for a marker anymore, the channel logs are released
+        assert not any(node.chnl_waiting.values()) and not any(node.chnl_logs.values())
+        # Late messages of a finished snapshot do not bring it back
+        assert node.snapshot((0, 0)) is None
+    topo.exit()
+
+
+def test_finishing_a_snapshot_leaves_earlier_ones():
+    component = ChandyLamportComponentModel("ChandyLamport", 0)
+    component.set_parameters(max_snapshots=1)
+    assert component.snapshot((1, 1)) is not None
+    # Evicts (1, 1)
+    assert component.snapshot((1, 2)) is not None
+    assert component.is_finished((1, 1)) and component.snapshot((1, 1)) is None
+    # An earlier snapshot of the same initiator that had not reached the component yet
+    assert not component.is_finished((1, 0)) and component.snapshot((1, 0)) is not None
+    assert component.is_finished((1, 2)) and not component.is_finished((1, 3))
+    component.finish_snapshot((1, 0))
+    assert all(component.is_finished((1, number)) for number in range(3))
+    assert not component.is_finished((2, 0))
+
+
+def test_snapshots_persisted_as_deltas():
+    G = nx.random_regular_graph(3, 8, seed=4)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "snapshots")
+        writer = SnapshotWriter(path, checkpoint_every=3)
+        completed = []
+        topo = run_snapshot(G, ChandyLamportComponentModel, rounds=0, parameters={"snapshot_writer": writer})
+        for node in topo.nodes.values():
+            node.on_global_snapshot = completed.append
+        initiator = topo.nodes[0]
+        for i in range(6):
+            for node_id, node in topo.nodes.items():
+                node.send_msg(Event(node, EventTypes.MFRT, GenericMessage(GenericMessageHeader("APP", node_id, None), i)))
+            topo.run(0.01)
+            initiator.send_self(Event(initiator, SnapshotEventTypes.TAKESNAPSHOT, None))
+            topo.run(0.5)
+        writer.close()
+        topo.exit()
+
+        # The same snapshots, all written in full
+        full_path = os.path.join(directory, "full")
+        with SnapshotWriter(full_path, checkpoint_every=1) as full:
+            for record in completed:
+                full.write(record.snapshot_id, record.global_state)
+
+        with SnapshotReader(path) as reader:
+            expected = [encode_global_state(record.global_state) for record in completed]
+            assert len(reader) == 7 and len(completed) == 6
+            assert [reader.snapshot_id(i) for i in range(1, 7)] == [record.snapshot_id for record in completed]
+            assert reader[1:] == expected and set(expected[-1]) > set(G.nodes)
+            # Random access rebuilds the same snapshots from the closest full one
+            assert reader[-1] == expected[-1] and reader[4] == expected[3] and reader[2] == expected[1]
+        # The logs are never truncated, later snapshots only add to the entries of earlier ones
+        assert os.path.getsize(path) < os.path.getsize(full_path)
+
+def main():
+    test_event_log_views()
+    test_chandy_lamport_records_log_views()
+    test_counting_lai_yang_matches_lai_yang()
+    test_lai_yang_releases_messages_received_before_the_snapshot()
+    test_convergecast_gathers_states_along_a_tree()
+    test_concurrent_chandy_lamport_snapshots()
+    test_finishing_a_snapshot_leaves_earlier_ones()
+    test_snapshots_persisted_as_deltas()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import os
+import random
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.getcwd())
+
+import networkx as nx
+
+from OLSR.helpers import TopologyStateSaver
+from OLSR.state_history import StateHistory
+from OLSR.versioned_graph import VersionedGraph
+
+
+def test_states_are_rebuilt():
+    rng = random.Random(3)
+    G = nx.random_geometric_graph(30, 0.3, seed=3)
+    history = StateHistory(checkpoint_every=4)
+    status = {node: False for node in G}
+    expected = []
+    for step in range(50):
+        changes = {node: rng.random() < 0.5 for node in rng.sample(list(G), 3)}
+        status.update(changes)
+        history.update(changes)
+        if step % 3:
+            history.append(G, step, G.nodes)
+            expected.append((dict(status), step))
+
+    assert len(history) == len(expected)
+    assert list(history.states) == [state for state, _ in expected]
+    assert [history.states[i] for i in range(len(history))] == [state for state, _ in expected]
+    assert history.states[-1] == expected[-1][0]
+    assert list(history.steps) == [step for _, step in expected]
+
+
+def test_graph_is_copied_only_when_it_changes():
+    G = nx.path_graph(4)
+    history = StateHistory()
+    history.update({0: True})
+    history.append(G, 1, G.nodes)
+    history.append(G)
+    G.add_edge(0, 3)
+    history.append(G, 2, G.nodes)
+    assert history.graphs[0] is history.graphs[1]
+    assert history.graphs[0] is not G and not history.graphs[0].has_edge(0, 3)
+    assert history.graphs[2].has_edge(0, 3)
+    assert history.steps[1] is None
+    assert history.states[1] == {0: True, 1: False, 2: False, 3: False}
+
+    # Another link in place of one, same numbers of nodes and links
+    G.remove_edge(0, 1)
+    G.add_edge(1, 3)
+    history.append(G, 3, G.nodes)
+    assert history.graphs[3] is not history.graphs[2]
+    assert history.graphs[3].has_edge(1, 3) and not history.graphs[3].has_edge(0, 1)
+
+
+def test_versioned_graph_is_copied_only_when_it_changes():
+    G = VersionedGraph(nx.path_graph(4))
+    history = StateHistory()
+    history.append(G)
+    history.append(G)
+    G.remove_edge(0, 1)
+    G.add_edge(0, 2)
+    history.append(G)
+    assert history.graphs[0] is history.graphs[1]
+    assert history.graphs[2] is not history.graphs[1] and history.graphs[2].has_edge(0, 2)
+
+
+def test_capacity_drops_oldest_states():
+    G = nx.path_graph(8)
+    history = StateHistory(checkpoint_every=4, capacity=10)
+    expected = []
+    status = {node: False for node in G}
+    for step in range(30):
+        changes = {step % 8: step % 3 == 0}
+        status.update(changes)
+        history.update(changes)
+        if step == 15:
+            G = nx.path_graph(8)
+        history.append(G, step, G.nodes)
+        expected.append(dict(status))
+    assert len(history) <= 10
+    assert history.dropped + len(history) == 30
+    assert list(history.states) == expected[history.dropped:]
+    assert history.states[0] == expected[history.dropped]
+    assert list(history.steps) == list(range(history.dropped, 30))
+    # The graph replaced at step 15 was only used by dropped states
+    assert history.graphs[0] is history.graphs[-1]
+
+
+def test_saver_merges_thread_buffers():
+    G = nx.empty_graph(40)
+    topology = SimpleNamespace(G=G, nodes={node: SimpleNamespace(selected_as_mpr=False) for node in G})
+    saver = TopologyStateSaver.for_topology(topology)
+    saver.merge_every = 16
+    assert TopologyStateSaver.for_topology(topology) is saver
+    assert TopologyStateSaver.for_topology(SimpleNamespace()) is not saver
+
+    def flip(nodes):
+        for node in nodes:
+            topology.nodes[node].selected_as_mpr = True
+            saver.save_state(topology, node, {node: True})
+
+    threads = [threading.Thread(target=flip, args=(range(start, 40, 4),)) for start in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(saver.states) == 40
+    assert saver.states[-1] == {node: True for node in G}
+    assert sorted(saver.steps) == list(range(40))
+    assert [sum(state.values()) for state in saver.states] == list(range(1, 41))
+    # The threads exited, their buffers were dropped after the merge
+    assert saver._buffers == []
+
+
+def test_saver_applies_records_in_sequence_order():
+    G = nx.empty_graph(3)
+    topology = SimpleNamespace(G=G, nodes={node: SimpleNamespace(selected_as_mpr=False) for node in G})
+    saver = TopologyStateSaver(merge_every=2)
+    # A number taken by a thread that did not buffer its record yet
+    late = next(saver._sequence)
+    saver.save_state(topology, 1, {1: True})
+    saver.save_state(topology, 2, {2: True})
+    assert len(saver.history) == 0
+
+    saver._buffer().append((late, {0: True}, None, None, None, False))
+    assert list(saver.steps) == [1, 2]
+    assert list(saver.states) == [{0: True, 1: True, 2: False}, {0: True, 1: True, 2: True}]
+
+
+def test_saver_copies_the_graph_when_its_links_change():
+    G = nx.path_graph(3)
+    topology = SimpleNamespace(G=G, nodes={node: SimpleNamespace(selected_as_mpr=False) for node in G})
+    saver = TopologyStateSaver()
+    saver.save_state(topology, 1, {0: True})
+    G.remove_edge(1, 2)
+    G.add_edge(0, 2)
+    saver.save_state(topology, 2, {1: True})
+    assert saver.graphs[0].has_edge(1, 2) and saver.graphs[1].has_edge(0, 2)
+
+
+def main():
+    test_states_are_rebuilt()
+    test_graph_is_copied_only_when_it_changes()
+    test_versioned_graph_is_copied_only_when_it_changes()
+    test_capacity_drops_oldest_states()
+    test_saver_merges_thread_buffers()
+    test_saver_applies_records_in_sequence_order()
+    test_saver_copies_the_graph_when_its_links_change()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from OLSR.timer_wheel import TimerWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def advance_to(wheel, clock, moment):
+    expired = []
+    while clock.now < moment:
+        clock.now += wheel.tick
+        expired.extend(wheel.advance())
+    return expired
+
+
+def test_keys_expire_across_revolutions():
+    clock = Clock()
+    wheel = TimerWheel(tick=1, slots=4, clock=clock)
+    wheel.schedule('a', 2)
+    # More than one revolution ahead, in the same slot as a
+    wheel.schedule('b', 6)
+    wheel.schedule('c', 13)
+    assert advance_to(wheel, clock, 1) == []
+    assert advance_to(wheel, clock, 2) == ['a']
+    assert advance_to(wheel, clock, 5) == []
+    assert advance_to(wheel, clock, 6) == ['b']
+    # A deadline that wraps around to a slot already passed in this revolution
+    wheel.schedule('d', 3)
+    assert advance_to(wheel, clock, 9) == ['d']
+    assert 'c' in wheel and len(wheel) == 1
+    assert advance_to(wheel, clock, 13) == ['c']
+    assert len(wheel) == 0
+
+
+def test_advancing_several_revolutions_at_once():
+    clock = Clock()
+    wheel = TimerWheel(tick=0.5, slots=4, clock=clock)
+    wheel.schedule('late', 20)
+    wheel.schedule('early', 1)
+    wheel.schedule('middle', 3)
+    clock.now = 10
+    # Expired keys come in order of their deadlines, later ones stay
+    assert wheel.advance() == ['early', 'middle']
+    assert wheel.advance() == []
+    clock.now = 25
+    assert wheel.advance() == ['late']
+
+
+def test_rescheduled_and_cancelled_keys():
+    clock = Clock()
+    wheel = TimerWheel(tick=1, slots=8, clock=clock)
+    wheel.schedule('a', 2)
+    wheel.schedule('b', 2)
+    assert wheel.cancel('b')
+    assert not wheel.cancel('b')
+    assert advance_to(wheel, clock, 1) == []
+    # Refreshing a key moves its deadline
+    wheel.schedule('a', 4)
+    assert advance_to(wheel, clock, 4) == []
+    assert advance_to(wheel, clock, 5) == ['a']
+    assert len(wheel) == 0 and 'b' not in wheel
+
+
+def main():
+    test_keys_expire_across_revolutions()
+    test_advancing_several_revolutions_at_once()
+    test_rescheduled_and_cancelled_keys()
+
+
+if __name__ == "__main__":
+    exit(main())
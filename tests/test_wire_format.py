@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+import os
+import sys
+import random
+
+sys.path.insert(0, os.getcwd())
+
+from adhoccomputing.Generics import MessageDestinationIdentifiers
+
+from OLSR.enums import Willingness
+from OLSR.message_types import HelloMessage, TCMessage
+from OLSR.wire_format import PackedMessage, WireFormatError, decode, encode
+
+
+def assert_same_message(message, decoded):
+    assert type(decoded) is type(message)
+    for field in ('messagetype', 'messagefrom', 'messageto', 'nexthop', 'interfaceid', 'sequencenumber'):
+        assert getattr(decoded.header, field) == getattr(message.header, field)
+    assert decoded.payload == message.payload
+
+
+def test_round_trip():
+    rng = random.Random(1)
+    for _ in range(500):
+        population = range(rng.choice([50, 300, 100000]))
+        nodes = set(rng.sample(population, rng.randint(0, 40)))
+        sender = rng.randrange(1000)
+        hello = HelloMessage(
+            message_from=sender,
+            message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+            payload={'neighbors': nodes, 'willingness': rng.choice(list(Willingness)), 'validity': 6},
+            nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+        )
+        assert_same_message(hello, decode(encode(hello)))
+
+        tc = TCMessage(
+            message_from=sender,
+            payload={'mpr_selectors': nodes, 'ansn': rng.randrange(70000), 'validity': 15},
+            message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+            sequencenumber=rng.randrange(1 << 20),
+            nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+        )
+        assert_same_message(tc, decode(encode(tc)))
+
+
+def test_delta_round_trip():
+    rng = random.Random(2)
+    for _ in range(200):
+        population = range(rng.choice([50, 300, 100000]))
+        added = set(rng.sample(population, rng.randint(0, 10)))
+        removed = set(rng.sample(population, rng.randint(0, 10))) - added
+        hello = HelloMessage(
+            message_from=rng.randrange(1000),
+            message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+            payload={'added': added, 'removed': removed, 'willingness': Willingness.WILL_DEFAULT,
+                     'base_version': 3, 'version': 4, 'validity': 6},
+            nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+        )
+        assert_same_message(hello, decode(encode(hello)))
+
+        tc = TCMessage(
+            message_from=rng.randrange(1000),
+            payload={'added': added, 'removed': removed, 'base_ansn': rng.randrange(100), 'ansn': 1000},
+            message_to=MessageDestinationIdentifiers.LINKLAYERBROADCAST,
+            sequencenumber=rng.randrange(1 << 20),
+            nexthop=MessageDestinationIdentifiers.LINKLAYERBROADCAST
+        )
+        assert_same_message(tc, decode(encode(tc)))
+
+
+def test_optional_fields_and_packed_message():
+    tc = TCMessage(message_from=4, message_to=7, payload={'mpr_selectors': {1, 2, 3}})
+    packed = PackedMessage.pack(tc)
+    assert packed.header.messageto == 7 and packed.header.sequencenumber == -1
+    assert len(packed) == len(packed.payload)
+    assert_same_message(tc, packed.unpack())
+    assert_same_message(tc, PackedMessage(packed.payload).unpack())
+
+
+def test_rejects_malformed_data():
+    hello = HelloMessage(message_from=1, message_to=2, payload={'neighbors': {'a'}, 'willingness': Willingness.WILL_LOW})
+    for data in (b'', b'\x09', encode(TCMessage(1, 2, payload={'mpr_selectors': {5}}))[:-1]):
+        try:
+            decode(data)
+        except WireFormatError:
+            pass
+        else:
+            assert False, data
+    try:
+        encode(hello)
+    except WireFormatError:
+        pass
+    else:
+        assert False
+
+
+def main():
+    test_round_trip()
+    test_delta_round_trip()
+    test_optional_fields_and_packed_message()
+    test_rejects_malformed_data()
+
+
+if __name__ == "__main__":
+    exit(main())